@@ -0,0 +1,172 @@
+import os
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+from anthropic import AsyncAnthropic
+from .llm_scheduler import llm_scheduler
+from .logging_utils import get_logger
+
+try:
+    # Newer SDK releases are built on httpx2; the client we pass must match.
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+log = get_logger("llm_pool")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class AnthropicPoolConfig:
+    """Connection pool settings for the shared upstream Anthropic client"""
+
+    max_connections: int = 200
+    max_keepalive_connections: int = 100
+    keepalive_expiry: float = 60.0
+    http2: bool = True
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    total_timeout: float = 60.0
+    max_retries: int = 2
+    prewarm: bool = True
+    prewarm_connections: int = 2
+
+    @classmethod
+    def from_env(cls) -> "AnthropicPoolConfig":
+        return cls(
+            max_connections=int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", cls.max_keepalive_connections)),
+            keepalive_expiry=float(os.environ.get("LLM_POOL_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+            http2=_env_bool("LLM_HTTP2", cls.http2),
+            connect_timeout=float(os.environ.get("LLM_CONNECT_TIMEOUT", cls.connect_timeout)),
+            read_timeout=float(os.environ.get("LLM_READ_TIMEOUT", cls.read_timeout)),
+            total_timeout=float(os.environ.get("LLM_TIMEOUT", cls.total_timeout)),
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES", cls.max_retries)),
+            prewarm=_env_bool("LLM_PREWARM", cls.prewarm),
+            prewarm_connections=int(os.environ.get("LLM_PREWARM_CONNECTIONS", cls.prewarm_connections)),
+        )
+
+
+class AnthropicClientPool:
+    """Owns the process-wide AsyncAnthropic client shared by every call"""
+
+    def __init__(self, config: Optional[AnthropicPoolConfig] = None):
+        self.config = config
+        self._client: Optional[AsyncAnthropic] = None
+        self._http_client = None
+
+    @property
+    def client(self) -> AsyncAnthropic:
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    def _create_client(self) -> AsyncAnthropic:
+        if self.config is None:
+            self.config = AnthropicPoolConfig.from_env()
+        config = self.config
+
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        # Never log any part of the key itself.
+        log.info("client.init", api_key_set=bool(api_key and api_key.strip()))
+
+        if not api_key or api_key.strip() == "":
+            raise ValueError(
+                "ANTHROPIC_API_KEY environment variable is empty or not set. "
+                "Please add it to Heroku Config Vars (Settings → Reveal Config Vars) "
+                "and restart the dyno."
+            )
+
+        http2 = config.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                log.warning("client.http2_unavailable", reason="h2 not installed")
+                http2 = False
+
+        try:
+            self._http_client = httpx.AsyncClient(
+                http2=http2,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                    keepalive_expiry=config.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    config.total_timeout,
+                    connect=config.connect_timeout,
+                    read=config.read_timeout,
+                ),
+            )
+            client = AsyncAnthropic(
+                api_key=api_key,
+                http_client=self._http_client,
+                # The scheduler retries 429/529 itself, after a shared cool-down
+                max_retries=0 if llm_scheduler.enabled else config.max_retries,
+            )
+        except Exception as e:
+            log.exception("client.create_failed", error=str(e))
+            raise
+
+        log.info(
+            "client.created",
+            max_connections=config.max_connections,
+            keepalive=config.max_keepalive_connections,
+            http2=http2,
+        )
+        return client
+
+    async def start(self):
+        """Create the shared client at app startup and pre-warm its pool"""
+        try:
+            client = self.client
+        except ValueError as e:
+            # Keep the app bootable; calls will surface the error as before.
+            log.error("client.not_started", error=str(e))
+            return
+        # An injected client (tests, benchmarks) comes without a config
+        if self.config is not None and self.config.prewarm:
+            await self.warm(client)
+
+    async def warm(self, client: AsyncAnthropic):
+        """Open pooled connections (DNS + TLS) before the first call needs them.
+
+        One request first, to learn the negotiated protocol: over HTTP/2 that
+        one connection is multiplexed, over HTTP/1.1 the rest are opened too.
+        """
+        if self._http_client is None:
+            return
+        url = str(client.base_url)
+
+        async def _touch() -> Optional[str]:
+            try:
+                response = await self._http_client.head(url)
+                return response.http_version
+            except Exception as e:
+                log.warning("pool.prewarm_failed", error=str(e))
+                return None
+
+        http_version = await _touch()
+        connections = 1
+        if http_version != "HTTP/2" and self.config.prewarm_connections > 1:
+            extra = self.config.prewarm_connections - 1
+            await asyncio.gather(*(_touch() for _ in range(extra)))
+            connections += extra
+        log.info("pool.prewarmed", connections=connections, http_version=http_version)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._http_client = None
+
+
+anthropic_pool = AnthropicClientPool()
@@ -0,0 +1,90 @@
+import json
+import codecs
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+METADATA_FIELDS = (
+    "provider_name",
+    "npi_number",
+    "tax_id",
+    "specialty",
+    "scenario_type",
+    "line_of_business",
+    "payer",
+    "organization_name",
+)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def metadata_from_entry(data: Dict[str, Any]) -> Dict[str, str]:
+    """The stored metadata for one /redis-store entry; unknown keys are dropped"""
+    return {field: data.get(field, "") for field in METADATA_FIELDS}
+
+
+def validate_entry(entry: Any, allow_strings: bool = False) -> Tuple[Optional[str], Optional[str]]:
+    """(phone_number, error) for one bulk entry; bulk deletes may pass bare phone numbers"""
+    if allow_strings and isinstance(entry, str):
+        phone_number = entry
+    elif isinstance(entry, dict):
+        phone_number = entry.get("phone_number")
+    else:
+        return None, "entry must be an object"
+    if not isinstance(phone_number, str) or not phone_number.strip():
+        return None, "phone_number is required"
+    if not any(c.isdigit() for c in phone_number):
+        return phone_number, "phone_number has no digits"
+    return phone_number, None
+
+
+async def iter_entries(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Any, Optional[str]]]:
+    """Yield (entry, error) from a JSON array or NDJSON body as it streams in.
+
+    Entries are decoded one at a time, so a 10k-entry body is never parsed
+    (or held) as a whole. A malformed NDJSON line only fails that entry; a
+    malformed array element ends the array, since it can't be resynced.
+    """
+    buffer = ""
+    mode = None
+    # Chunks may split a multi-byte character
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    async for chunk in chunks:
+        buffer += decode(chunk)
+        if mode is None:
+            stripped = buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                continue
+            mode = "array" if stripped[0] == "[" else "ndjson"
+            buffer = stripped[1:] if mode == "array" else stripped
+
+        if mode == "ndjson":
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                if line.strip():
+                    yield _decode_line(line)
+            continue
+
+        while True:
+            buffer = buffer.lstrip(_WHITESPACE + ",")
+            if not buffer or buffer[0] == "]":
+                break
+            try:
+                entry, end = _decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break  # incomplete; wait for more of the body
+            buffer = buffer[end:]
+            yield entry, None
+
+    if mode == "ndjson" and buffer.strip():
+        yield _decode_line(buffer)
+    elif mode == "array":
+        rest = buffer.strip(_WHITESPACE + ",")
+        if rest and rest != "]":
+            yield None, "invalid JSON in array"
+
+
+def _decode_line(line: str) -> Tuple[Any, Optional[str]]:
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return None, f"invalid JSON: {e.msg}"
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Dict, Optional, Set
+from .logging_utils import get_logger
+from .redis_utils import MetadataUnavailable, metadata_key
+
+log = get_logger("session")
+
+
+class CallSession:
+    """Connection-scoped state for one call; metadata is loaded once and reused per turn"""
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.from_number: Optional[str] = None
+        self.to_number: Optional[str] = None
+        self.metadata: Dict = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def set_numbers(self, from_number: Optional[str], to_number: Optional[str]):
+        self.from_number = from_number
+        self.to_number = to_number
+        self._loaded = False
+
+    def invalidate(self):
+        """Force the next get_metadata() to re-read the store"""
+        self._loaded = False
+
+    async def get_metadata(self, store) -> Dict:
+        """Return cached provider metadata, loading it from the store if stale.
+
+        A failed lookup keeps what was there before and stays unloaded, so
+        the next turn tries the store again.
+        """
+        if self._loaded:
+            return self.metadata
+        async with self._load_lock:
+            if not self._loaded:
+                metadata = None
+                if self.to_number:
+                    try:
+                        metadata = await store.retrieve_metadata(self.to_number)
+                    except MetadataUnavailable:
+                        log.warning("session.metadata_unavailable", call_id=self.call_id)
+                        return self.metadata
+                self.metadata = metadata or {}
+                self._loaded = True
+        return self.metadata
+
+
+class CallSessionRegistry:
+    """Tracks live call sessions so HTTP endpoints can invalidate their caches"""
+
+    def __init__(self):
+        self._sessions: Dict[str, CallSession] = {}
+        self._by_phone: Dict[str, Set[str]] = {}
+
+    def open(self, call_id: str) -> CallSession:
+        replaced = self._sessions.get(call_id)
+        if replaced is not None:
+            # A reconnect: the old socket's session must not stay indexed
+            self._unindex(replaced)
+        session = CallSession(call_id)
+        self._sessions[call_id] = session
+        return session
+
+    def bind_phone(self, session: CallSession, from_number: Optional[str], to_number: Optional[str]):
+        self._unindex(session)
+        session.set_numbers(from_number, to_number)
+        if to_number:
+            self._by_phone.setdefault(metadata_key(to_number), set()).add(session.call_id)
+
+    def get(self, call_id: str) -> Optional[CallSession]:
+        return self._sessions.get(call_id)
+
+    def close(self, call_id: str, session: Optional[CallSession] = None):
+        """Drop a session; pass `session` to avoid closing a newer reconnect's session"""
+        current = self._sessions.get(call_id)
+        if current is None or (session is not None and current is not session):
+            return
+        del self._sessions[call_id]
+        self._unindex(current)
+
+    def invalidate_phone(self, phone_number: str) -> int:
+        """Mark every session dialing this number stale; returns how many were hit"""
+        call_ids = self._by_phone.get(metadata_key(phone_number), ())
+        hit = 0
+        for call_id in call_ids:
+            session = self._sessions.get(call_id)
+            if session is not None:
+                session.invalidate()
+                hit += 1
+        return hit
+
+    def _unindex(self, session: CallSession):
+        if not session.to_number:
+            return
+        key = metadata_key(session.to_number)
+        call_ids = self._by_phone.get(key)
+        if call_ids is not None:
+            call_ids.discard(session.call_id)
+            if not call_ids:
+                del self._by_phone[key]
+
+
+call_sessions = CallSessionRegistry()
@@ -0,0 +1,167 @@
+import os
+import json
+import asyncio
+from typing import Any, Callable, Dict, Optional
+from .redis_utils import MEMORY_STORE_MAX_ENTRIES, redis_store
+from .ttl_cache import TTLCache
+from .logging_utils import get_logger
+
+log = get_logger("call_state")
+
+CALL_STATE_TTL_SECONDS = int(os.environ.get("CALL_STATE_TTL", 4 * 3600))
+EVENTS_CHANNEL = "call_state:events"
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+def call_state_key(call_id: str) -> str:
+    return f"call_state:{call_id}"
+
+
+class LocalCallState:
+    """Single-process call state: only correct with one worker"""
+
+    shared = False
+
+    def __init__(self):
+        # Expires like the Redis hash, in case call_ended never arrives
+        self._calls = TTLCache(maxsize=MEMORY_STORE_MAX_ENTRIES, ttl=CALL_STATE_TTL_SECONDS)
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    async def close(self):
+        self._handler = None
+
+    async def bind(self, call_id: str, fields: Dict[str, str]):
+        self._calls.set(call_id, dict(fields))
+
+    async def get(self, call_id: str) -> Optional[Dict[str, str]]:
+        return self._calls.get(call_id)
+
+    async def pop(self, call_id: str) -> Optional[Dict[str, str]]:
+        return self._calls.pop(call_id)
+
+    async def publish(self, event: Dict[str, Any]):
+        if self._handler is not None:
+            self._handler(event)
+
+
+class RedisCallState:
+    """Call state in Redis, plus a pub/sub channel so every worker sees call events"""
+
+    shared = True
+
+    def __init__(self, store=None):
+        self.store = store or redis_store
+        self._handler: Optional[Handler] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def bind(self, call_id: str, fields: Dict[str, str]):
+        key = call_state_key(call_id)
+        async with self.store.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, CALL_STATE_TTL_SECONDS)
+            await pipe.execute()
+
+    async def get(self, call_id: str) -> Optional[Dict[str, str]]:
+        return await self.store.client.hgetall(call_state_key(call_id)) or None
+
+    async def pop(self, call_id: str) -> Optional[Dict[str, str]]:
+        """Read and delete atomically, so only one worker acts on call_ended"""
+        key = call_state_key(call_id)
+        async with self.store.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.delete(key)
+            fields, _ = await pipe.execute()
+        return fields or None
+
+    async def publish(self, event: Dict[str, Any]):
+        await self.store.client.publish(EVENTS_CHANNEL, json.dumps(event))
+
+    async def _listen(self):
+        while True:
+            pubsub = self.store.client.pubsub()
+            try:
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        self._handler(json.loads(message["data"]))
+                    except Exception as e:
+                        log.exception("call_state.event_failed", error=str(e))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("call_state.listen_failed", error=str(e))
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+
+class CallStateStore:
+    """Per-call state (phone numbers) and cross-worker call events.
+
+    Uses Redis when the metadata store is connected to it, so the websocket
+    and the call_ended webhook may land on different workers or dynos;
+    otherwise falls back to process-local state.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or redis_store
+        self.backend = LocalCallState()
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.shared
+
+    async def start(self, handler: Handler):
+        await self.store.connect()
+        if self.store.enabled and self.store.client is not None:
+            self.backend = RedisCallState(self.store)
+        else:
+            workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+            if workers > 1:
+                log.warning("call_state.local_only", workers=workers)
+            self.backend = LocalCallState()
+        log.info("call_state.started", backend="redis" if self.backend.shared else "memory")
+        await self.backend.start(handler)
+
+    async def close(self):
+        await self.backend.close()
+
+    async def bind(self, call_id: str, from_number: Optional[str], to_number: Optional[str]):
+        fields = {name: value for name, value in (("from", from_number), ("to", to_number)) if value}
+        if not fields:
+            return
+        try:
+            await self.backend.bind(call_id, fields)
+        except Exception as e:
+            log.warning("call_state.bind_failed", call_id=call_id, error=str(e))
+
+    async def get(self, call_id: str) -> Optional[Dict[str, str]]:
+        return await self.backend.get(call_id)
+
+    async def pop(self, call_id: str) -> Optional[Dict[str, str]]:
+        return await self.backend.pop(call_id)
+
+    async def publish(self, event: Dict[str, Any]):
+        try:
+            await self.backend.publish(event)
+        except Exception as e:
+            log.warning("call_state.publish_failed", event_type=event.get("type"), error=str(e))
+
+
+call_state = CallStateStore()
@@ -1,18 +1,27 @@
 import os
 import random
+import asyncio
 import datetime
 import json
-from custom_types import (
+from .custom_types import (
     ResponseRequiredRequest,
     ResponseResponse,
     Utterance,
 )
+from .transcript_buffer import TranscriptBuffer
+from .logging_utils import get_logger
+from .tool_executor import tool_executor
 from anthropic import AsyncAnthropic
 from typing import List
 from dotenv import load_dotenv
 
 load_dotenv()
 
+log = get_logger("llm_tools")
+
+# Model round trips per turn that may end in tool calls; the next one has no tools
+MAX_TOOL_HOPS = int(os.environ.get("LLM_TOOL_MAX_HOPS", "3"))
+
 ################################PROMPT########################################
 
 begin_sentence = "Hey there, I'm your personal AI therapist, how can I help you?"
@@ -103,12 +112,52 @@ system_prompt = """
 
 
 ########################################################################
+transcript_prefix = [
+    {"role": "user", "content": 
+     """
+     ...
+     """},
+]
+
+
+# Step 5: Other functions here. Arguments are the tool's input_schema properties
+# minus SPOKEN_ARGUMENTS; blocking tools are run in the executor's thread pool.
+SPOKEN_ARGUMENTS = ("message", "reason")
+
+
+@tool_executor.tool(kind="thread")
+def record_appointment(date_time=None):
+    return "Appointment successfully recorded for " + date_time + "." + "Proceed to confirm the appointment details."
+
+
+def append_merged_utterance(messages, role, content):
+    # Claude wants alternating turns: merge consecutive user utterances and
+    # stand in "..." for empty ones. Replace the last dict, never mutate it.
+    if role == "agent":
+        messages.append({"role": "assistant", "content": content})
+    elif content.strip():
+        if messages and messages[-1]["role"] == "user":
+            messages[-1] = {"role": "user", "content": messages[-1]["content"] + " " + content}
+        else:
+            messages.append({"role": "user", "content": content})
+    else:
+        if messages and messages[-1]["role"] == "user":
+            messages[-1] = {"role": "user", "content": messages[-1]["content"] + " ..."}
+        else:
+            messages.append({"role": "user", "content": "..."})
+
+
 class LlmClient:
+    tools_enabled = os.environ.get("LLM_TOOLS", "false").lower() == "true"
+
     def __init__(self):
         # self.client = AsyncOpenAI(
         #     api_key=os.environ["OPENAI_API_KEY"],
         # )
         self.client = AsyncAnthropic() 
+        self.transcript = TranscriptBuffer(
+            append=append_merged_utterance, initial_messages=transcript_prefix
+        )
 
     def draft_begin_message(self):
         response = ResponseResponse(
@@ -121,70 +170,15 @@ class LlmClient:
 
 
     def convert_transcript_to_anthropic_messages(self, transcript: List[Utterance]):
-        messages = [
-            {"role": "user", "content": 
-             """
-             ...
-             """},
-
-        ]
+        messages = list(transcript_prefix)
         for utterance in transcript:
-            if utterance.role == "agent":
-                messages.append({"role": "assistant", "content": utterance.content})
-            else:
-                if utterance.content.strip():
-                    if messages and messages[-1]["role"] == "user":
-                        messages[-1]["content"] += " " + utterance.content
-                    else:
-                        messages.append({"role": "user", "content": utterance.content})
-                else:
-                    if messages and messages[-1]["role"] == "user":
-                        messages[-1]["content"] += " ..."
-                    else:
-                        messages.append({"role": "user", "content": "..."})
-
+            append_merged_utterance(messages, utterance.role, utterance.content)
         return messages
 
 
-    def prepare_prompt(self, request: ResponseRequiredRequest, func_result=None):
-        prompt = []
-        # print(f"Request transcript: {request.transcript}")
-        transcript_messages = self.convert_transcript_to_anthropic_messages(
-            request.transcript
-        )
-        # print(f"Transcript messages: {transcript_messages}")
-
-        for message in transcript_messages:
-            prompt.append(message)
-
-        if func_result:
-            # add function call to prompt
-            prompt.append({
-                "role": "assistant",
-                "content": [
-                    {
-                        "id": func_result["id"],
-                        "input": func_result["arguments"],
-                        "name": func_result["func_name"],
-                        "type": "tool_use"
-                    }
-                ]
-            })
-
-            # add function call result to prompt
-            tool_result_content = {
-                "type": "tool_result",
-                "tool_use_id": func_result["id"],
-                "content": func_result["result"] or ''
-            }
-            
-            if "is_error" in func_result:
-                tool_result_content["is_error"] = func_result["is_error"]
-            
-            prompt.append({
-                "role": "user",
-                "content": [tool_result_content]
-            })
+    def prepare_prompt(self, request: ResponseRequiredRequest):
+        # Private copy: tool hops append to it, the buffer's list is shared
+        prompt = list(self.transcript.update(request.transcript))
 
         # if request.interaction_type == "reminder_required":
         #     prompt.append(
@@ -194,7 +188,6 @@ class LlmClient:
         #         }
         #     )
 
-        # print(f"Prompt: {prompt}")
         return prompt
 
     # Step 1: Prepare the function calling definition to the prompt
@@ -249,135 +242,151 @@ class LlmClient:
         ]
         return functions
 
-    async def draft_response(self, request, func_result=None):
-        prompt = self.prepare_prompt(request, func_result)
-        print(f"request.response_id: {request.response_id}")
-
-
-        func_call = {}
-        func_arguments = ""
-        last_func_name = None  # Track the last called function name
-        last_func_args = None  # Track the last function arguments
-
-        stream = await self.client.messages.create(
-            max_tokens=256,
-            messages=prompt,
-            model="claude-3-haiku-20240307",
-            # model="claude-3-5-sonnet-20240620",
-            # model="claude-3-opus-20240229",
-            stream=True,
-            temperature=0.0,
-            # top_k= 35,
-            # top_p=0.9, 
-            # tools=self.prepare_functions(),
-            # tool_choice={"type": "auto"},
-            system=system_prompt,
-        )
+    async def run_tool(self, call: dict) -> dict:
+        """Run a tool call through the executor; always returns a tool_result block"""
+        result = {"type": "tool_result", "tool_use_id": call["id"]}
+        if call["name"] not in tool_executor.tools:
+            log.warning("tool.unknown", tool=call["name"])
+            result["content"] = f"Error: unknown tool {call['name']}."
+            result["is_error"] = True
+            return result
+        try:
+            arguments = {k: v for k, v in call["input"].items() if k not in SPOKEN_ARGUMENTS}
+            content = await tool_executor.run(call["name"], arguments)
+            result["content"] = str(content) if content is not None else ""
+        except asyncio.TimeoutError:
+            log.warning("tool.timeout", tool=call["name"])
+            result["content"] = "Error: the tool timed out."
+            result["is_error"] = True
+        except Exception as e:
+            log.warning("tool.failed", tool=call["name"], error=str(e))
+            result["content"] = f"Error: {str(e)}"
+            result["is_error"] = True
+        return result
+
+    async def draft_response(self, request):
+        prompt = self.prepare_prompt(request)
+        # Results by (name, arguments): a repeated identical call is not run twice
+        results = {}
+        pending = {}
+
+        try:
+            for hop in range(MAX_TOOL_HOPS + 1):
+                log.debug("request.start", response_id=request.response_id, hop=hop)
+                options = {}
+                # Out of hops: no tools offered, so the model has to answer in words
+                if self.tools_enabled and hop < MAX_TOOL_HOPS:
+                    options = {"tools": self.prepare_functions(), "tool_choice": {"type": "auto"}}
+
+                stream = await self.client.messages.create(
+                    max_tokens=256,
+                    messages=prompt,
+                    model="claude-3-haiku-20240307",
+                    # model="claude-3-5-sonnet-20240620",
+                    # model="claude-3-opus-20240229",
+                    stream=True,
+                    temperature=0.0,
+                    # top_k= 35,
+                    # top_p=0.9,
+                    system=system_prompt,
+                    **options,
+                )
 
-        async for event in stream:
-            event_type = event.type
-
-            # Step 3: Extract the functions
-            if event_type == "content_block_start":
-                content_block = event.content_block
-                if content_block.type == "tool_use":
-                    tool_use = content_block
-                    if tool_use.id:
-                        if func_call:
-                            # Another function received, old function complete, can break here.
-                            break
-                        func_call = {
-                            "id": tool_use.id,
-                            "func_name": tool_use.name or "",
-                            "arguments": {},
-                        }
-                    else:
-                        # Reset func_arguments for a new function
-                        func_arguments = ""
-
-            # Parse transcripts and function arguments
-            elif event_type == "content_block_delta":
-                delta_type = event.delta.type
-                if delta_type == "text_delta":
-                    response = ResponseResponse(
-                        response_id=request.response_id,
-                        content=event.delta.text,
-                        content_complete=False,
-                        end_call=False,
-                    )
-                    yield response
-                elif delta_type == "input_json_delta":
-                    # Append partial JSON to func_arguments
-                    func_arguments += event.delta.partial_json or ""
-
-            elif event_type == "message_delta":
-                stop_reason = event.delta.stop_reason
-                print(f"Stop reason: {stop_reason}")
-                if stop_reason == "tool_use":
-                    # The model invoked one or more tools
-                    # Step 4: Call the functions
-                    if func_call:
-                        func_call["arguments"] = json.loads(func_arguments)
-                        if func_call["func_name"] == last_func_name and func_call["arguments"] == last_func_args:
-                            # Same function with the same arguments called again, skip it
-                            continue
-                        last_func_name = func_call["func_name"]
-                        last_func_args = func_call["arguments"]
+                # Step 3: Extract the functions; each block is keyed by its index
+                blocks = {}
+                stop_reason = None
+                async for event in stream:
+                    event_type = event.type
+
+                    if event_type == "content_block_start":
+                        content_block = event.content_block
+                        if content_block.type == "tool_use":
+                            blocks[event.index] = {
+                                "type": "tool_use", "id": content_block.id, "name": content_block.name, "json": "",
+                            }
+                        else:
+                            blocks[event.index] = {"type": "text", "text": ""}
+
+                    # Parse transcripts and function arguments
+                    elif event_type == "content_block_delta":
+                        delta_type = event.delta.type
+                        if delta_type == "text_delta":
+                            blocks[event.index]["text"] += event.delta.text
+                            response = ResponseResponse(
+                                response_id=request.response_id,
+                                content=event.delta.text,
+                                content_complete=False,
+                                end_call=False,
+                            )
+                            yield response
+                        elif delta_type == "input_json_delta":
+                            blocks[event.index]["json"] += event.delta.partial_json or ""
 
-                        if func_call["func_name"] == "end_call":
-                            print(f"Calling end_call function")
-                            print(f"Function arguments: {func_call['arguments']}")
+                    elif event_type == "content_block_stop":
+                        call = blocks.get(event.index)
+                        if call is None or call["type"] != "tool_use":
+                            continue
+                        call["input"] = json.loads(call.pop("json") or "{}")
+                        log.info("tool.call", tool=call["name"], response_id=request.response_id, hop=hop)
 
+                        if call["name"] == "end_call":
                             response = ResponseResponse(
                                 response_id=request.response_id,
-                                content=func_call["arguments"]["message"],
+                                content=call["input"].get("message", ""),
                                 content_complete=True,
                                 end_call=True,
                             )
                             yield response
-                        # Step 5: Other functions here
-                        elif func_call["func_name"] == "record_appointment":
-                            print(f"Calling record_appointment function")
-                            func_call["arguments"] = json.loads(func_arguments)
-                            print(f"Function arguments: {func_call['arguments']}")
-
-                            try:
-                                # Send a response with the message while setting up the appointment
-                                response = ResponseResponse(
-                                    response_id=request.response_id,
-                                    content=func_call["arguments"]["message"],
-                                    content_complete=False,
-                                    end_call=False,
-                                )
-                                yield response
-
-                                # Create the tool_result message
-                                func_result = {
-                                    "id": func_call["id"],
-                                    "arguments": func_call["arguments"],
-                                    "func_name": func_call["func_name"],
-                                    "result": "Appointment successfully recorded for " + func_call["arguments"]["date_time"] + "." + 
-                                    "Proceed to confirm the appointment details.",
-                                }
-
-                            except Exception as e:
-                                func_result = {
-                                    "id": func_call["id"],
-                                    "arguments": func_call["arguments"], 
-                                    "func_name": func_call["func_name"],
-                                    "result": f"Error: {str(e)}",
-                                    "is_error": True
-                                }
-
-                            # continue drafting the response after booking the appointment
-                            async for response in self.draft_response(request, func_result):
-                                yield response     
-
-            elif event_type == "message_stop":
-                response = ResponseResponse(
-                    response_id=request.response_id,
-                    content="",
-                    content_complete=True,
-                    end_call=False,
-                )
-                yield response
+                            return
+
+                        # Step 4: Call the functions. Start it now, and keep
+                        # speaking its filler message while it runs.
+                        key = (call["name"], json.dumps(call["input"], sort_keys=True))
+                        if key not in results:
+                            results[key] = asyncio.ensure_future(self.run_tool(call))
+                        pending[call["id"]] = results[key]
+                        if call["input"].get("message"):
+                            response = ResponseResponse(
+                                response_id=request.response_id,
+                                content=call["input"]["message"] + " ",
+                                content_complete=False,
+                                end_call=False,
+                            )
+                            yield response
+
+                    elif event_type == "message_delta":
+                        stop_reason = event.delta.stop_reason
+                        log.debug("request.stop", response_id=request.response_id, stop_reason=stop_reason)
+
+                calls = [block for block in blocks.values() if block["type"] == "tool_use"]
+                if stop_reason != "tool_use" or not calls:
+                    break
+
+                # Feed every result back in one follow-up request
+                tool_results = []
+                for call in calls:
+                    result = dict(await pending.pop(call["id"]))
+                    result["tool_use_id"] = call["id"]
+                    tool_results.append(result)
+                prompt.append({
+                    "role": "assistant",
+                    "content": [
+                        {"type": "text", "text": block["text"]} if block["type"] == "text"
+                        else {"type": "tool_use", "id": block["id"], "name": block["name"], "input": block["input"]}
+                        for block in blocks.values()
+                        if block["type"] == "tool_use" or block["text"]
+                    ],
+                })
+                prompt.append({"role": "user", "content": tool_results})
+
+            response = ResponseResponse(
+                response_id=request.response_id,
+                content="",
+                content_complete=True,
+                end_call=False,
+            )
+            yield response
+        finally:
+            # Superseded turn (or end_call): don't leave tools running
+            for task in pending.values():
+                task.cancel()
@@ -0,0 +1,169 @@
+import os
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Coroutine, Deque, Optional, Set, Tuple
+from .logging_utils import get_logger
+from . import metrics
+
+log = get_logger("ws")
+
+
+@dataclass
+class ConnectionPolicy:
+    """Bounds on one websocket's work.
+
+    max_inflight: inbound events handled concurrently; reading pauses past it
+    send_queue:   response frames buffered for the writer; senders wait past it
+    """
+
+    max_inflight: int = 32
+    send_queue: int = 64
+
+    @classmethod
+    def from_env(cls) -> "ConnectionPolicy":
+        return cls(
+            max_inflight=int(os.environ.get("WS_MAX_INFLIGHT", cls.max_inflight)),
+            send_queue=int(os.environ.get("WS_SEND_QUEUE", cls.send_queue)),
+        )
+
+
+class ConnectionSupervisor:
+    """Owns the event-handler tasks for one websocket and is its only writer.
+
+    Inbound events run as tracked tasks, at most `max_inflight` at a time.
+    Outbound frames go through one writer task: control frames (ping_pong)
+    jump ahead of queued response frames, so a heartbeat waits for at most
+    the one frame being written. Response frames of a superseded turn
+    (per `is_current`) are dropped, both when queued and when their turn to
+    be written comes. close() cancels everything. Response streams
+    themselves are owned by the call's TurnManager.
+    """
+
+    def __init__(
+        self,
+        call_id: str,
+        send_text: Callable[[str], Awaitable[None]],
+        policy: Optional[ConnectionPolicy] = None,
+        is_current: Optional[Callable[[int], bool]] = None,
+    ):
+        self.call_id = call_id
+        self.policy = policy or ConnectionPolicy.from_env()
+        self._send_text = send_text
+        self._is_current = is_current
+        self._slots = asyncio.Semaphore(self.policy.max_inflight)
+        self._tasks: Set[asyncio.Task] = set()
+        self._control: Deque[Tuple[str, Optional[float]]] = deque()
+        self._data: Deque[Tuple[str, Optional[int]]] = deque()
+        self._wake = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._closed = False
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def submit(self, coro: Coroutine):
+        """Run an event handler as a task owned by this connection.
+
+        Waits (so the caller stops reading the socket) while `max_inflight`
+        handlers are already running.
+        """
+        if self._closed:
+            coro.close()
+            return
+        if self._slots.locked():
+            metrics.ws_backpressure_waits.inc()
+        await self._slots.acquire()
+        if self._closed:
+            self._slots.release()
+            coro.close()
+            return
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        metrics.ws_handler_tasks.inc()
+        task.add_done_callback(self._on_done)
+
+    def send_control(self, text: str, received_at: Optional[float] = None):
+        """Queue a control frame ahead of any response frames"""
+        if self._closed:
+            return
+        self._control.append((text, received_at))
+        self._wake.set()
+
+    async def send(self, text: str, response_id: Optional[int] = None):
+        """Queue a response frame; waits while the send queue is full.
+
+        Frames are written in the order they were queued. Frames for a
+        superseded `response_id`, and any after close(), are dropped.
+        """
+        while not self._closed and len(self._data) >= self.policy.send_queue:
+            self._drained.clear()
+            await self._drained.wait()
+        if self._closed:
+            return
+        if self._stale(response_id):
+            metrics.ws_stale_frames_dropped.inc()
+            return
+        self._data.append((text, response_id))
+        metrics.ws_send_queue_depth.inc()
+        self._wake.set()
+
+    async def close(self):
+        """Cancel the handlers, then stop the writer; pending frames are dropped"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._stop()
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+
+    def _stop(self):
+        self._closed = True
+        metrics.ws_send_queue_depth.dec(len(self._data))
+        self._data.clear()
+        self._control.clear()
+        self._drained.set()
+
+    async def _write_loop(self):
+        try:
+            while True:
+                if self._control:
+                    text, received_at = self._control.popleft()
+                    await self._send_text(text)
+                    if received_at is not None:
+                        metrics.ws_heartbeat_latency.observe(time.perf_counter() - received_at)
+                elif self._data:
+                    text, response_id = self._data.popleft()
+                    metrics.ws_send_queue_depth.dec()
+                    self._drained.set()
+                    if self._stale(response_id):
+                        metrics.ws_stale_frames_dropped.inc()
+                        continue
+                    await self._send_text(text)
+                else:
+                    self._wake.clear()
+                    await self._wake.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The socket is gone; the read loop sees the disconnect too
+            log.debug("ws.send_failed", call_id=self.call_id, error=str(e))
+            self._stop()
+
+    def _stale(self, response_id: Optional[int]) -> bool:
+        return response_id is not None and self._is_current is not None and not self._is_current(response_id)
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._slots.release()
+        metrics.ws_handler_tasks.dec()
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None and not self._closed:
+            log.error("ws.handler_failed", exc_info=exc, call_id=self.call_id)
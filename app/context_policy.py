@@ -0,0 +1,256 @@
+import os
+import re
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from .llm_scheduler import llm_scheduler
+from .logging_utils import get_logger
+
+log = get_logger("context")
+
+Message = Dict[str, Any]
+
+# Per-message framing overhead Anthropic adds around role/content.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def estimate_message_tokens(message: Message) -> int:
+    content = message["content"]
+    if isinstance(content, str):
+        return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    for block in content:
+        text = block.get("text") if isinstance(block, dict) else None
+        if text:
+            tokens += estimate_tokens(text)
+    return tokens
+
+
+def estimate_request_tokens(system_blocks: List[Message], messages: List[Message], max_tokens: int) -> int:
+    """Tokens a request counts against rate limits: estimated input plus max output"""
+    system = sum(estimate_tokens(block.get("text", "")) for block in system_blocks)
+    return system + sum(estimate_message_tokens(m) for m in messages) + max_tokens
+
+
+def message_text(message: Message) -> str:
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+@dataclass
+class ContextPolicy:
+    """How much of a long call's transcript is sent verbatim to the model.
+
+    Off by default: summarizing costs an extra model call per batch of turns.
+    Pinned facts are only added while turns are summarized or dropped.
+    """
+
+    enabled: bool = False
+    max_verbatim_turns: int = 24
+    max_input_tokens: Optional[int] = 6000
+    summarize_batch: int = 8
+    summary_model: str = "claude-3-5-haiku-latest"
+    summary_max_tokens: int = 300
+
+    @classmethod
+    def from_env(cls) -> "ContextPolicy":
+        max_input_tokens = int(os.environ.get("LLM_CONTEXT_MAX_TOKENS", cls.max_input_tokens or 0))
+        max_verbatim_turns = int(os.environ.get("LLM_CONTEXT_VERBATIM_TURNS", cls.max_verbatim_turns))
+        return cls(
+            enabled=os.environ.get("LLM_CONTEXT_SUMMARY", "false").lower() == "true" and max_verbatim_turns > 0,
+            max_verbatim_turns=max_verbatim_turns,
+            max_input_tokens=max_input_tokens or None,
+            summarize_batch=int(os.environ.get("LLM_CONTEXT_SUMMARIZE_BATCH", cls.summarize_batch)),
+            summary_model=os.environ.get("LLM_SUMMARY_MODEL", cls.summary_model),
+            summary_max_tokens=int(os.environ.get("LLM_SUMMARY_MAX_TOKENS", cls.summary_max_tokens)),
+        )
+
+
+_PANEL_STATUS = re.compile(
+    r"\b(?:panel|network)\b[^.?!]{0,40}?\b(not open|open|closed|frozen|waitlist(?:ed)?|wait list)\b"
+    r"|\b(not accepting|accepting|no longer accepting)\b[^.?!]{0,30}?\bproviders?\b",
+    re.IGNORECASE,
+)
+# One token: "REF-20931", not "12345 and the effective"
+_REFERENCE_NUMBER = re.compile(
+    r"\b(?:reference|ref|confirmation|ticket|case|call)\s*(?:number|no\.?|#|id)?\s*(?:is|:)?\s*"
+    r"([A-Z0-9][A-Z0-9\-]{3,24}[A-Z0-9])\b",
+    re.IGNORECASE,
+)
+_SENTENCE = re.compile(r"[^.?!]+[.?!]?")
+# Questions and hedged statements are not facts
+_QUESTION = re.compile(
+    r"\?\s*$|^\W*(?:(?:ok(?:ay)?|so|and|um|uh)\W+)*(?:is|are|was|were|does|do|did|has|have|can|could|"
+    r"will|would|should|what|which|when|where|who|how)\b",
+    re.IGNORECASE,
+)
+_HEDGE = re.compile(
+    r"\b(?:i think|i believe|maybe|might|may be|probably|possibly|not sure|i'?m not certain|should be|"
+    r"supposed to be|if|let me check|i'?ll (?:check|find out)|unless|assum\w*)\b",
+    re.IGNORECASE,
+)
+# Opening hours, not panel status: "our network is open Monday through Friday"
+_HOURS = re.compile(
+    r"\b(?:open|closed)\s+(?:on\s+)?(?:(?:mon|tues|wednes|thurs|fri|satur|sun)days?|weekends?|weekdays|"
+    r"today|tomorrow|from|until|till|at|between|daily|\d)",
+    re.IGNORECASE,
+)
+# The lead-in in any case ("This is Dana."), the name itself capitalized
+_REP_NAME = re.compile(r"\b(?i:my name is|this is|you(?:'re| are) speaking with)\s+([A-Z][a-z]+)")
+
+
+class PinnedFacts:
+    """Facts collected during the call that must survive summarization"""
+
+    def __init__(self):
+        self.facts: Dict[str, str] = {}
+        self._scanned = 0
+
+    def scan(self, messages: List[Message]):
+        # Re-read the last scanned message too: it may have been merged/extended.
+        start = max(0, min(self._scanned, len(messages)) - 1)
+        for message in messages[start:]:
+            if message["role"] == "user":
+                self._extract(message_text(message))
+        self._scanned = len(messages)
+
+    def _extract(self, text: str):
+        for sentence in _SENTENCE.findall(text):
+            sentence = sentence.strip()
+            if sentence and not _QUESTION.search(sentence) and not _HEDGE.search(sentence):
+                self._extract_sentence(sentence)
+
+    def _extract_sentence(self, text: str):
+        match = _PANEL_STATUS.search(text)
+        if match and not _HOURS.search(text):
+            status = (match.group(1) or match.group(2)).lower()
+            if status in ("accepting",):
+                status = "open"
+            elif status in ("not accepting", "no longer accepting", "frozen", "not open"):
+                status = "closed"
+            elif status.startswith("wait"):
+                status = "waitlist"
+            self.facts["Panel status"] = status.upper()
+        match = _REFERENCE_NUMBER.search(text)
+        if match and any(c.isdigit() for c in match.group(1)):
+            self.facts["Reference number"] = match.group(1).strip()
+        match = _REP_NAME.search(text)
+        if match:
+            self.facts["Representative"] = match.group(1)
+
+    def render(self) -> str:
+        if not self.facts:
+            return ""
+        lines = [f"- {key}: {value}" for key, value in self.facts.items()]
+        return "## FACTS ALREADY COLLECTED (authoritative)\n" + "\n".join(lines)
+
+
+class RollingContext:
+    """Keeps the last K turns verbatim and folds older turns into a running summary.
+
+    Summaries are produced by a background task, never on the response path;
+    until one lands, older turns stay verbatim and the token budget is enforced
+    by dropping the oldest of them.
+    """
+
+    def __init__(self, policy: ContextPolicy, client):
+        self.policy = policy
+        self.client = client
+        self.summary = ""
+        self.summarized_upto = 0
+        self.pinned = PinnedFacts()
+        self._task: Optional[asyncio.Task] = None
+        self._retry_at = 0
+
+    def apply(self, messages: List[Message]) -> Tuple[str, List[Message]]:
+        """Return (context text for the system prompt, messages to send verbatim)"""
+        if not self.policy.enabled:
+            return "", messages
+        self.pinned.scan(messages)
+
+        if self.summarized_upto > len(messages):
+            # Transcript was rolled back past the summary; start over.
+            self.summary = ""
+            self.summarized_upto = 0
+
+        window = messages[self.summarized_upto:]
+        cut = len(messages) - self.policy.max_verbatim_turns
+        if (
+            cut - self.summarized_upto >= self.policy.summarize_batch
+            and cut >= self._retry_at
+            and self._task is None
+        ):
+            self._task = asyncio.create_task(self._summarize(messages[self.summarized_upto:cut], cut))
+
+        if self.policy.max_input_tokens:
+            window = self._fit_budget(window)
+
+        # Facts still in the verbatim window need no restating
+        pinned = self.pinned.render() if len(window) < len(messages) else ""
+        parts = [part for part in (self.render_summary(), pinned) if part]
+        return "\n\n".join(parts), window
+
+    def render_summary(self) -> str:
+        if not self.summary:
+            return ""
+        return f"## EARLIER IN THIS CALL (summary)\n{self.summary}"
+
+    def _fit_budget(self, window: List[Message]) -> List[Message]:
+        budget = self.policy.max_input_tokens - estimate_tokens(self.summary) - estimate_tokens(self.pinned.render())
+        total = 0
+        keep = 0
+        # Walk back from the newest message; always keep at least the last one.
+        for message in reversed(window):
+            cost = estimate_message_tokens(message)
+            if keep and total + cost > budget:
+                break
+            total += cost
+            keep += 1
+        return window[len(window) - keep:]
+
+    async def _summarize(self, messages: List[Message], upto: int):
+        try:
+            transcript = "\n".join(
+                f"{'Agent' if m['role'] == 'assistant' else 'Rep'}: {message_text(m)}" for m in messages
+            )
+            prompt = (
+                "Summarize this part of an outbound credentialing call in a few short bullet points. "
+                "Keep every concrete fact: panel status, dates, reference numbers, names, phone numbers "
+                "and next steps.\n\n"
+            )
+            if self.summary:
+                prompt += f"Summary so far:\n{self.summary}\n\n"
+            prompt += f"New transcript:\n{transcript}"
+            # Background work: queued behind every live turn
+            async with llm_scheduler.slot(estimate_tokens(prompt) + self.policy.summary_max_tokens):
+                response = await self.client.messages.create(
+                    model=self.policy.summary_model,
+                    max_tokens=self.policy.summary_max_tokens,
+                    messages=[{"role": "user", "content": prompt}],
+                )
+            summary = "".join(getattr(block, "text", "") for block in response.content).strip()
+            if summary:
+                self.summary = summary
+                self.summarized_upto = upto
+                log.info("context.summarized", upto=upto, tokens=estimate_tokens(summary))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("context.summarize_failed", error=str(e))
+            # Don't retry on every turn; wait for another batch of turns.
+            self._retry_at = upto + self.policy.summarize_batch
+        finally:
+            self._task = None
+
+    async def close(self):
+        task = self._task
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
@@ -1,5 +1,5 @@
-from typing import Any, List, Optional, Literal, Union, Dict
-from pydantic import BaseModel
+from typing import Annotated, Any, List, Optional, Literal, Union, Dict, NamedTuple
+from pydantic import BaseModel, Field
 from typing import Literal, Dict, Optional
 
 
@@ -22,6 +22,7 @@ class CallDetailsRequest(BaseModel):
 class UpdateOnlyRequest(BaseModel):
     interaction_type: Literal["update_only"]
     transcript: List[Utterance]
+    turntaking: Optional[str] = None
 
 
 class ResponseRequiredRequest(BaseModel):
@@ -31,8 +32,9 @@ class ResponseRequiredRequest(BaseModel):
     retell_llm_dynamic_variables: Optional[Dict[str, Any]] = None  # ADD THIS
 
 
-CustomLlmRequest = Union[
-    ResponseRequiredRequest | UpdateOnlyRequest | CallDetailsRequest | PingPongRequest
+CustomLlmRequest = Annotated[
+    Union[ResponseRequiredRequest, UpdateOnlyRequest, CallDetailsRequest, PingPongRequest],
+    Field(discriminator="interaction_type"),
 ]
 
 
@@ -59,4 +61,13 @@ class ResponseResponse(BaseModel):
     transfer_number: Optional[str] = None
 
 
+class ResponseChunk(NamedTuple):
+    """Same fields as ResponseResponse, without pydantic cost; used per streamed token"""
+    response_id: int
+    content: str
+    content_complete: bool = False
+    end_call: Optional[bool] = False
+    transfer_number: Optional[str] = None
+
+
 CustomLlmResponse = Union[ConfigResponse | PingPongResponse | ResponseResponse]
@@ -0,0 +1,76 @@
+import re
+from typing import Optional, Union
+from pydantic import TypeAdapter, ValidationError
+from .custom_types import (
+    CallDetailsRequest,
+    CustomLlmRequest,
+    PingPongRequest,
+    ResponseRequiredRequest,
+    UpdateOnlyRequest,
+)
+from .logging_utils import get_logger
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
+
+    loads = json.loads
+
+log = get_logger("events")
+
+# Retell sends interaction_type first; search the head before the whole frame.
+_INTERACTION_TYPE = re.compile(r'"interaction_type"\s*:\s*"([a-z_]+)"')
+_PEEK_CHARS = 256
+
+# Precompiled discriminated-union validator for full validation
+request_adapter = TypeAdapter(CustomLlmRequest)
+
+# Events whose transcript is consumed: decoded without re-validating every
+# utterance (TranscriptBuffer validates new utterances incrementally).
+_TRANSCRIPT_EVENTS = {
+    "response_required": (ResponseRequiredRequest, ("response_id", "transcript")),
+    "reminder_required": (ResponseRequiredRequest, ("response_id", "transcript")),
+    "update_only": (UpdateOnlyRequest, ("transcript",)),
+}
+
+Event = Union[ResponseRequiredRequest, UpdateOnlyRequest, CallDetailsRequest, PingPongRequest]
+
+
+def peek_interaction_type(raw: str) -> Optional[str]:
+    """interaction_type of a raw frame, without parsing it"""
+    match = _INTERACTION_TYPE.search(raw, 0, _PEEK_CHARS) or _INTERACTION_TYPE.search(raw)
+    return match.group(1) if match else None
+
+
+def decode_event(raw: Union[str, bytes]) -> Optional[Event]:
+    """Decode one inbound Retell frame; None for frames we ignore or can't read.
+
+    Transcript events are parsed without re-validating every utterance;
+    unknown interaction types are dropped without parsing their transcript.
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    interaction_type = peek_interaction_type(raw)
+
+    if interaction_type in _TRANSCRIPT_EVENTS:
+        model, required = _TRANSCRIPT_EVENTS[interaction_type]
+        try:
+            data = loads(raw)
+        except ValueError as e:
+            log.warning("ws.bad_frame", interaction_type=interaction_type, error=str(e))
+            return None
+        if isinstance(data, dict) and all(key in data for key in required):
+            return model.model_construct(**data)
+    elif interaction_type not in ("ping_pong", "call_details"):
+        log.debug("ws.ignored", interaction_type=interaction_type)
+        return None
+
+    # Small (ping_pong, call_details) or malformed frames: full validation
+    try:
+        return request_adapter.validate_json(raw)
+    except ValidationError as e:
+        log.warning("ws.bad_frame", interaction_type=interaction_type, error=str(e))
+        return None
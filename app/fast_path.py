@@ -0,0 +1,123 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence
+from .transcript_buffer import utterance_parts
+
+# Each intent is one piece of provider metadata the rep may ask us to read back.
+_INTENTS = (
+    ("npi", re.compile(r"\b(npi|national provider (?:id|identifier|number))\b")),
+    ("tax_id", re.compile(r"\b(tax ?id|tin|ein|tax identification(?: number)?|federal tax (?:id|number))\b")),
+    ("identifier", re.compile(r"\b(provider (?:number|id)|identifier|id number|verification number)\b")),
+    ("provider_name", re.compile(
+        r"\b(provider'?s? name|name of the (?:provider|practice|group|organization|doctor)|"
+        r"(?:group|practice|organization) name|who is the provider)\b"
+    )),
+    ("specialty", re.compile(
+        r"\b(specialt(?:y|ies)|speciality|what (?:kind|type) of (?:provider|practice|doctor))\b"
+    )),
+)
+# The rep has to actually be asking for it...
+_REQUEST = re.compile(
+    r"\?|\b(what(?:'s| is| was)?|which|can|could|may|give|provide|need|have|read|repeat|say|tell|confirm|get|please)\b"
+)
+# ...and not be disputing it, reading one back, asking about the panel, or
+# offering a choice ("the group or the individual NPI?").
+_AMBIGUOUS = re.compile(
+    r"\d|\b(not|wrong|match\w*|different|incorrect|invalid|another|other|also|and the|or|"
+    r"panel|network|status|credential\w*|spell)\b"
+)
+# Yes/no questions ("Is that NPI registered in Texas?") need an answer, not a
+# read-back; "Can you give me the NPI?" and "Do you have the tax ID?" are requests.
+_POLAR = re.compile(
+    r"^(?:(?:ok(?:ay)?|so|and|um|uh|alright|sure)\W+)*"
+    r"(?:is|are|was|were|does|do|did|has|have|had|will|would|should|can|could|may)\b"
+    r"(?!\s+(?:you|i|we)\s+(?:please\s+)?(?:give|provide|read|repeat|say|tell|confirm|get|have|send|verify)\b)"
+)
+
+
+def speak_digits(value: str, groups: Sequence[int]) -> Optional[str]:
+    """Digit by digit, with a pause (comma) between groups, e.g. "1 2 3, 4 5 6".
+
+    Digits past the last group are read as one final group. None if `value`
+    has no digits.
+    """
+    digits = re.sub(r"\D", "", str(value))
+    if not digits:
+        return None
+    spoken = []
+    start = 0
+    for size in groups:
+        if start >= len(digits):
+            break
+        spoken.append(" ".join(digits[start:start + size]))
+        start += size
+    if start < len(digits):
+        spoken.append(" ".join(digits[start:]))
+    return ", ".join(spoken)
+
+
+@dataclass
+class FastPathPolicy:
+    """Which identifier questions are answered locally instead of by the model"""
+
+    enabled: bool = False
+    max_words: int = 16
+
+    @classmethod
+    def from_env(cls) -> "FastPathPolicy":
+        return cls(
+            enabled=os.environ.get("LLM_FAST_PATH", "false").lower() == "true",
+            max_words=int(os.environ.get("LLM_FAST_PATH_MAX_WORDS", cls.max_words)),
+        )
+
+
+class FastPath:
+    """Answers "what's the NPI / tax ID / provider name / specialty" from call metadata.
+
+    Only a short rep question with exactly one intent is answered; anything
+    ambiguous returns None and the turn goes to the model as usual.
+    """
+
+    def __init__(self, policy: Optional[FastPathPolicy] = None):
+        self.policy = policy or FastPathPolicy.from_env()
+
+    def intent(self, text: str) -> Optional[str]:
+        text = text.strip().lower()
+        if not text or len(text.split()) > self.policy.max_words:
+            return None
+        if _AMBIGUOUS.search(text) or _POLAR.search(text) or not _REQUEST.search(text):
+            return None
+        matched = [name for name, pattern in _INTENTS if pattern.search(text)]
+        if len(matched) != 1:
+            return None
+        return matched[0]
+
+    def answer(self, transcript: Sequence[Any], variables: Dict[str, Any]) -> Optional[str]:
+        if not self.policy.enabled or not transcript:
+            return None
+        role, content = utterance_parts(transcript[-1])
+        if role != "user" or not content:
+            return None
+        intent = self.intent(content)
+        if intent is None:
+            return None
+        if intent == "identifier":
+            # Same rule as the system prompt: existing-state orgs verify by tax ID.
+            intent = "tax_id" if variables.get("scenario_type") == "Existing State" else "npi"
+        return self._render(intent, variables)
+
+    def _render(self, intent: str, variables: Dict[str, Any]) -> Optional[str]:
+        if intent == "npi":
+            spoken = speak_digits(variables.get("npi_number") or "", (3, 3, 4))
+            return f"Sure. The NPI is {spoken}." if spoken else None
+        if intent == "tax_id":
+            spoken = speak_digits(variables.get("tax_id") or "", (2, 3, 4))
+            return f"Sure. The tax ID is {spoken}." if spoken else None
+        if intent == "provider_name":
+            name = variables.get("provider_name") or variables.get("organization_name")
+            return f"The provider is {name}." if name else None
+        if intent == "specialty":
+            specialty = variables.get("specialty")
+            return f"The specialty is {specialty}." if specialty else None
+        return None
@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from . import metrics
+
+try:
+    import orjson
+
+    def encode_frame(frame: Dict[str, Any]) -> str:
+        return orjson.dumps(frame).decode()
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
+
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def encode_frame(frame: Dict[str, Any]) -> str:
+        return _encoder.encode(frame)
+
+
+def encode_response(
+    response_id: int,
+    content: str,
+    content_complete: bool,
+    end_call: Optional[bool] = False,
+    transfer_number: Optional[str] = None,
+) -> str:
+    """Serialize a `response` frame without building a ResponseResponse"""
+    return encode_frame({
+        "response_type": "response",
+        "response_id": response_id,
+        "content": content,
+        "content_complete": content_complete,
+        "end_call": end_call,
+        "transfer_number": transfer_number,
+    })
+
+
+_PHRASE_END = re.compile(r"[,.;:?!]\s*$")
+
+
+@dataclass
+class FlushPolicy:
+    """When buffered response text is written to the websocket.
+
+    token:  one frame per model delta (previous behaviour)
+    time:   at most one frame per `window_ms`
+    phrase: at phrase/sentence punctuation, or after `window_ms` at the latest
+    The first chunk of a response and the final frame are always sent at once.
+    """
+
+    mode: str = "token"
+    window_ms: float = 20.0
+    max_chars: int = 200
+
+    @classmethod
+    def from_env(cls) -> "FlushPolicy":
+        return cls(
+            mode=os.environ.get("WS_FLUSH_MODE", cls.mode),
+            window_ms=float(os.environ.get("WS_FLUSH_WINDOW_MS", cls.window_ms)),
+            max_chars=int(os.environ.get("WS_FLUSH_MAX_CHARS", cls.max_chars)),
+        )
+
+
+class FrameCoalescer:
+    """Streams response events to the websocket, merging deltas per FlushPolicy.
+
+    Events only need ResponseResponse's attributes (see ResponseChunk).
+    `send_text(frame, response_id)` writes one frame. Sends go through one
+    lock so a window-timer flush can never reorder frames.
+    """
+
+    def __init__(self, send_text: Callable[[str, int], Awaitable[None]], policy: Optional[FlushPolicy] = None):
+        self.send_text = send_text
+        self.policy = policy or FlushPolicy.from_env()
+        self.frames_sent = 0
+        self._send_lock = asyncio.Lock()
+        self._first_frame_from: Optional[float] = None
+
+    async def stream(
+        self,
+        events: AsyncIterator,
+        response_id: int,
+        is_current: Callable[[int], bool],
+        started_at: Optional[float] = None,
+    ):
+        """Send every event for `response_id`; stops as soon as it is superseded.
+
+        `started_at` (a perf_counter() timestamp) enables the turn latency metrics.
+        """
+        iterator = events.__aiter__()
+        self._first_frame_from = started_at
+        try:
+            if self.policy.mode == "token":
+                async for event in iterator:
+                    if not is_current(response_id):
+                        break
+                    await self._send(event.content, event.content_complete, event.end_call, event.transfer_number, response_id)
+            else:
+                await self._coalesce(iterator, response_id, is_current)
+            if started_at is not None and is_current(response_id):
+                metrics.turn_duration.observe(time.perf_counter() - started_at)
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _coalesce(self, iterator, response_id: int, is_current: Callable[[int], bool]):
+        loop = asyncio.get_running_loop()
+        window = self.policy.window_ms / 1000.0
+        phrase = self.policy.mode == "phrase"
+        buffer = []
+        state = {"chars": 0, "last_flush": time.perf_counter()}
+        timer: Optional[asyncio.TimerHandle] = None
+        timer_flush: Optional[asyncio.Task] = None
+
+        async def flush(content_complete=False, end_call=False, transfer_number=None, tail=""):
+            async with self._send_lock:
+                # Snapshot under the lock so whichever flush runs first takes the text.
+                if tail:
+                    buffer.append(tail)
+                if not buffer and not content_complete and not end_call and not transfer_number:
+                    return
+                text = "".join(buffer)
+                buffer.clear()
+                state["chars"] = 0
+                state["last_flush"] = time.perf_counter()
+                if is_current(response_id):
+                    await self._send_unlocked(text, content_complete, end_call, transfer_number, response_id)
+
+        def on_timer():
+            nonlocal timer, timer_flush
+            timer = None
+            timer_flush = loop.create_task(flush())
+
+        first = True
+        try:
+            async for event in iterator:
+                if not is_current(response_id):
+                    return
+                if event.content_complete or event.end_call or event.transfer_number:
+                    if timer is not None:
+                        timer.cancel()
+                        timer = None
+                    await flush(event.content_complete, event.end_call, event.transfer_number, event.content)
+                    continue
+                if not event.content:
+                    continue
+
+                buffer.append(event.content)
+                state["chars"] += len(event.content)
+                elapsed = time.perf_counter() - state["last_flush"]
+                if (
+                    first
+                    or elapsed >= window
+                    or state["chars"] >= self.policy.max_chars
+                    or (phrase and _PHRASE_END.search(event.content))
+                ):
+                    first = False
+                    if timer is not None:
+                        timer.cancel()
+                        timer = None
+                    await flush()
+                elif timer is None:
+                    # Don't hold buffered text past the window if the model stalls.
+                    timer = loop.call_later(window - elapsed, on_timer)
+
+            if timer is not None:
+                timer.cancel()
+                timer = None
+            await flush()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if timer_flush is not None and not timer_flush.done():
+                timer_flush.cancel()
+
+    async def _send(self, content, content_complete, end_call, transfer_number, response_id):
+        async with self._send_lock:
+            await self._send_unlocked(content, content_complete, end_call, transfer_number, response_id)
+
+    async def _send_unlocked(self, content, content_complete, end_call, transfer_number, response_id):
+        self.frames_sent += 1
+        if self._first_frame_from is not None:
+            metrics.turn_first_frame.observe(time.perf_counter() - self._first_frame_from)
+            self._first_frame_from = None
+        await self.send_text(encode_response(response_id, content, content_complete, end_call, transfer_number), response_id)
@@ -0,0 +1,198 @@
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+from .custom_types import ResponseChunk, ResponseResponse
+from .logging_utils import get_logger
+from .transcript_buffer import utterance_parts
+from . import metrics
+
+log = get_logger("hold")
+
+# A person picking the call back up
+_RETURN = re.compile(
+    r"\b(thanks? (?:you )?for (?:holding|waiting|your patience)|sorry (?:about|for) the (?:wait|hold)|"
+    r"are you still (?:there|on the line)|still there|i'?m back|appreciate you holding)\b"
+)
+# Hold queue / IVR announcements
+_ANNOUNCEMENT = re.compile(
+    r"\b(your call is (?:very )?important|please (?:continue to )?hold|please stay on the line|"
+    r"all (?:of )?our (?:representatives|agents|associates)|(?:calls?|conversations?) (?:may|will) be "
+    r"(?:recorded|monitored)|estimated (?:wait|hold) time|in the order (?:it was|they were) received|"
+    r"next available (?:representative|agent)|remain on the line)\b"
+)
+# The rep asking us to wait
+_HOLD_REQUEST = re.compile(
+    r"\b(hold on|(?:put|place) you on (?:a brief |a quick )?hold|can you hold|one moment|bear with me|"
+    r"give me (?:a|one) (?:second|sec|minute|moment)|let me (?:check|pull|look|see))\b"
+)
+# Words that can surround a hold request without adding anything to it
+_FILLER = frozenset(
+    "ok okay sure yes yeah yep alright all right um uh so well hmm please just "
+    "real quick a the for you that this it on up in into while here there "
+    "second sec minute moment".split()
+)
+# A question to us ("Can you please hold?") needs an answer, never silence
+_QUESTION = re.compile(r"\?|^\W*(?:can|could|would|will|may) (?:you|i|we)\b")
+# What speech-to-text makes of hold music
+_NOISE = re.compile(r"^\W*$|\[(?:music|noise|silence|inaudible)\]|♪")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+CHECK_INS = (
+    "I'm still on the line.",
+    "Still here, whenever you're ready.",
+    "I'm still holding.",
+)
+
+
+@dataclass
+class HoldPolicy:
+    """When a call counts as on hold, and what we say while it is"""
+
+    enabled: bool = False
+    silent_reminders: int = 2
+    check_in_every: int = 4
+    repeat_window: int = 6
+    min_repeat_words: int = 5
+
+    @classmethod
+    def from_env(cls) -> "HoldPolicy":
+        return cls(
+            enabled=os.environ.get("LLM_HOLD_DETECTION", "false").lower() == "true",
+            silent_reminders=int(os.environ.get("LLM_HOLD_SILENT_REMINDERS", cls.silent_reminders)),
+            check_in_every=int(os.environ.get("LLM_HOLD_CHECK_IN_EVERY", cls.check_in_every)),
+            repeat_window=int(os.environ.get("LLM_HOLD_REPEAT_WINDOW", cls.repeat_window)),
+            min_repeat_words=int(os.environ.get("LLM_HOLD_MIN_REPEAT_WORDS", cls.min_repeat_words)),
+        )
+
+
+class HoldDetector:
+    """Per-call hold state from transcript patterns and reminder frequency.
+
+    `check()` returns None when the turn should be drafted normally, or the
+    canned text to send instead ("" to say nothing) while on hold.
+    """
+
+    def __init__(self, call_id: str = "", policy: Optional[HoldPolicy] = None):
+        self.call_id = call_id
+        self.policy = policy or HoldPolicy.from_env()
+        self.on_hold = False
+        self.reason = ""
+        self._since = 0.0
+        self._seen = 0
+        self._reminders = 0
+        self._replies = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy.enabled
+
+    def check(self, transcript: Sequence[Any], interaction_type: str) -> Optional[str]:
+        if not self.policy.enabled:
+            return None
+        text = self._new_user_text(transcript)
+        if text is not None:
+            self._reminders = 0
+            reply = self._on_utterance(text, transcript)
+        elif interaction_type == "reminder_required":
+            self._reminders += 1
+            reply = self._on_reminder()
+        else:
+            reply = "" if self.on_hold else None
+        if reply is not None:
+            metrics.hold_skipped_turns.inc()
+        return reply
+
+    def _new_user_text(self, transcript: Sequence[Any]) -> Optional[str]:
+        """The latest user utterance if it arrived since the last check"""
+        count = len(transcript)
+        if count <= self._seen:
+            return None
+        start = self._seen
+        self._seen = count
+        for index in range(count - 1, start - 1, -1):
+            role, content = utterance_parts(transcript[index])
+            if role == "user":
+                return content.strip().lower()
+        return None
+
+    def _on_utterance(self, text: str, transcript: Sequence[Any]) -> Optional[str]:
+        if _RETURN.search(text):
+            self._exit("returned")
+            return None
+        if _NOISE.search(text) and self.on_hold:
+            return ""
+        if _QUESTION.search(text):
+            self._exit("speech")
+            return None
+        if not self.on_hold and self._is_hold_request(text):
+            self._enter("requested")
+            return "Sure, take your time."
+        if _ANNOUNCEMENT.search(text) or self._repeats(text, transcript):
+            self._enter("announcement")
+            return ""
+        self._exit("speech")
+        return None
+
+    @staticmethod
+    def _is_hold_request(text: str) -> bool:
+        """The whole utterance asks us to wait: "One moment, please", but
+        not "One moment. Okay, yes the panel is open."
+        """
+        if not _HOLD_REQUEST.search(text):
+            return False
+        rest = _NON_WORD.sub(" ", _HOLD_REQUEST.sub(" ", text)).split()
+        return all(word in _FILLER for word in rest)
+
+    def _on_reminder(self) -> Optional[str]:
+        if not self.on_hold:
+            if self._reminders < self.policy.silent_reminders:
+                return None
+            self._enter("silence")
+        every = self.policy.check_in_every
+        if every <= 0 or self._reminders % every:
+            return ""
+        self._replies += 1
+        return CHECK_INS[(self._replies - 1) % len(CHECK_INS)]
+
+    def _repeats(self, text: str, transcript: Sequence[Any]) -> bool:
+        """A looping recording: the same long user utterance heard again"""
+        normalized = _NON_WORD.sub(" ", text).strip()
+        if len(normalized.split()) < self.policy.min_repeat_words:
+            return False
+        earlier = transcript[-self.policy.repeat_window - 1:-1]
+        for raw in earlier:
+            role, content = utterance_parts(raw)
+            if role == "user" and _NON_WORD.sub(" ", content.lower()).strip() == normalized:
+                return True
+        return False
+
+    def _enter(self, reason: str):
+        if self.on_hold:
+            return
+        self.on_hold = True
+        self.reason = reason
+        self._since = time.monotonic()
+        metrics.holds_entered.inc()
+        log.info("hold.entered", call_id=self.call_id, reason=reason)
+
+    def _exit(self, reason: str):
+        if not self.on_hold:
+            return
+        self.on_hold = False
+        held = time.monotonic() - self._since
+        metrics.hold_duration.observe(held)
+        log.info("hold.exited", call_id=self.call_id, reason=reason, held_s=round(held, 1))
+
+
+async def canned_response(response_id: int, text: str):
+    """Response events for a locally chosen reply; empty `text` sends nothing audible"""
+    if text:
+        yield ResponseChunk(response_id=response_id, content=text)
+    yield ResponseResponse(
+        response_id=response_id,
+        content="",
+        content_complete=True,
+        end_call=False,
+    )
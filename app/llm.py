@@ -1,52 +1,69 @@
 from anthropic import AsyncAnthropic
 import os
-from typing import List, Optional, Dict, Any
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
 from .custom_types import (
     ResponseRequiredRequest,
     ResponseResponse,
+    ResponseChunk,
     Utterance,
 )
+from .anthropic_pool import anthropic_pool
+from .transcript_buffer import TranscriptBuffer, append_utterance
+from .context_policy import ContextPolicy, RollingContext, estimate_request_tokens
+from .model_router import ModelRouter, Route, RoutingPolicy, estimate_cost
+from .fast_path import FastPath, FastPathPolicy
+from .response_cache import ResponseCache, response_cache as shared_response_cache
+from .providers import AnthropicProvider, HedgePolicy, build_provider, hedged_stream
+from .llm_scheduler import SchedulerRejected, llm_scheduler
+from . import metrics
+from .logging_utils import get_logger
+
+log = get_logger("llm")
 
 # ========== IMPROVED: Better begin message for panel status inquiry ==========
 begin_sentence = "Hi there. I'm calling to check if you're accepting new providers on your panel. Could you help me with that?"
 
 class LlmClient:
-    def __init__(self):
-        # ========== FIX: Get API key from environment with detailed debugging ==========
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
-        
-        # Debug info
-        print(f"\n{'='*70}")
-        print(f"🔍 LLM CLIENT INITIALIZATION")
-        print(f"{'='*70}")
-        print(f"DEBUG: Checking ANTHROPIC_API_KEY environment variable")
-        print(f"  Value exists: {bool(api_key)}")
-        print(f"  Value length: {len(api_key) if api_key else 0}")
-        if api_key:
-            print(f"  First 30 chars: {api_key[:30]}...")
-            print(f"  ✅ API Key found and accessible")
-        else:
-            print(f"  ❌ Value is NONE/EMPTY")
-        print(f"{'='*70}\n")
-        
-        # Validate API key
-        if not api_key or api_key.strip() == "":
-            raise ValueError(
-                "ANTHROPIC_API_KEY environment variable is empty or not set. "
-                "Please add it to Heroku Config Vars (Settings → Reveal Config Vars) "
-                "and restart the dyno."
+    """Per-call session; all calls share the pooled upstream client"""
+
+    prompt_caching = os.environ.get("LLM_PROMPT_CACHE", "true").lower() == "true"
+    max_tokens = 150
+
+    def __init__(
+        self,
+        client: Optional[AsyncAnthropic] = None,
+        context_policy: Optional[ContextPolicy] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        backup=None,
+        routing_policy: Optional[RoutingPolicy] = None,
+        response_cache: Optional[ResponseCache] = None,
+        fast_path_policy: Optional[FastPathPolicy] = None,
+    ):
+        self.client = client or anthropic_pool.client
+        self.context = RollingContext(context_policy or ContextPolicy.from_env(), self.client)
+        self.router = ModelRouter(routing_policy)
+        self.response_cache = response_cache or shared_response_cache
+        self.fast_path = FastPath(fast_path_policy)
+        self.providers = {
+            "heavy": AnthropicProvider(self.client, self.router.policy.heavy_model, self.max_tokens, self.record_cache_usage),
+            "fast": AnthropicProvider(self.client, self.router.policy.fast_model, self.max_tokens, self.record_cache_usage),
+        }
+        self._usage = (0, 0, 0)
+        self.hedge = hedge_policy or HedgePolicy.from_env()
+        if backup is None and self.hedge.enabled:
+            backup = build_provider(
+                self.hedge.backup_provider,
+                self.hedge.backup_model,
+                self.client,
+                self.max_tokens,
+                self.record_cache_usage,
             )
-        
-        print(f"✅ API Key initialized successfully")
-        
-        # Initialize AsyncAnthropic client
-        try:
-            self.client = AsyncAnthropic(api_key=api_key)
-            print(f"✅ AsyncAnthropic client created successfully\n")
-        except Exception as e:
-            print(f"❌ ERROR creating AsyncAnthropic client: {str(e)}")
-            print(f"This may indicate the API key is invalid or Anthropic API is unreachable")
-            raise
+        self.backup = backup if self.hedge.enabled else None
+        self._system_blocks: Optional[List[Dict[str, Any]]] = None
+        self._system_variables: Dict[str, Any] = {}
+        self.transcript = TranscriptBuffer()
 
     def draft_begin_message(self):
         response = ResponseResponse(
@@ -60,28 +77,28 @@ class LlmClient:
     def convert_transcript_to_anthropic_messages(self, transcript: List[Utterance]):
         messages = []
         for utterance in transcript:
-            if utterance.role == "agent":
-                messages.append({"role": "assistant", "content": utterance.content})
-            else:
-                messages.append({"role": "user", "content": utterance.content})
+            append_utterance(messages, utterance.role, utterance.content)
         return messages
 
-    def prepare_prompt(self, request: ResponseRequiredRequest):
+    def compile_system_prompt(self, variables: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build the system prompt once per call; reused (and cached upstream) every turn"""
+        variables = variables or {}
+        if self._system_blocks is not None and variables == self._system_variables:
+            return self._system_blocks
+
         # Build metadata context from dynamic variables
         metadata_context = ""
-        if request.retell_llm_dynamic_variables:
-            print(f"✅ Dynamic variables received: {len(request.retell_llm_dynamic_variables)} items")
+        provider_name = variables.get('provider_name', 'Not provided')
+        payer = variables.get('payer', 'Not provided')
+        if variables:
+            log.debug("prompt.variables", count=len(variables))
             
             metadata_context = "\n## PROVIDER & PLAN INFORMATION:\n"
-            variables = request.retell_llm_dynamic_variables
-            provider_name = variables.get('provider_name', 'Not provided')
             npi_number = variables.get('npi_number', 'Not provided')
             tax_id = variables.get('tax_id', 'Not provided')
             specialty = variables.get('specialty', 'Not provided')
             line_of_business = variables.get('line_of_business', 'Not provided')
             scenario_type = variables.get('scenario_type', 'Not provided')
-            payer = variables.get('payer', 'Not provided')
-            organization_name = variables.get('organization_name', 'Not provided')
             
             metadata_context += f"Provider/Organization Name: {provider_name}\n"
             metadata_context += f"NPI Number: {npi_number}\n"
@@ -99,7 +116,7 @@ class LlmClient:
                 metadata_context += f"  ACTION: Provide the NPI when asked for verification.\n"
                 metadata_context += f"  NPI: {npi_number}\n"
         else:
-            print("⚠️  No dynamic variables received from call_details")
+            log.warning("prompt.no_variables")
 
         # ========== IMPROVED: Better system prompt for panel status verification ==========
         system_prompt = f'''## OBJECTIVE
@@ -156,9 +173,42 @@ Get a clear answer: Is the {payer if variables.get('payer') else 'insurance'} pa
 - Do NOT accept vague answers - push for clarity on OPEN vs CLOSED
 - Do accept that sometimes they need to transfer you or call you back'''
 
-        transcript_messages = self.convert_transcript_to_anthropic_messages(
-            request.transcript
-        )
+        block = {"type": "text", "text": system_prompt}
+        if self.prompt_caching:
+            block["cache_control"] = {"type": "ephemeral"}
+        self._system_blocks = [block]
+        self._system_variables = dict(variables)
+        return self._system_blocks
+
+    def mark_cache_breakpoint(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cache the transcript prefix: flag the last non-empty message as a breakpoint.
+
+        The flagged message is replaced, not mutated, since message dicts are
+        shared with the call's TranscriptBuffer.
+        """
+        for index in range(len(messages) - 1, -1, -1):
+            content = messages[index]["content"]
+            if isinstance(content, str) and content.strip():
+                messages[index] = {
+                    "role": messages[index]["role"],
+                    "content": [
+                        {"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}
+                    ],
+                }
+                break
+        return messages
+
+    def prepare_prompt(self, request: ResponseRequiredRequest):
+        system_blocks = self.compile_system_prompt(request.retell_llm_dynamic_variables)
+
+        # Private copy of the incrementally built list; only new utterances are converted
+        transcript_messages = list(self.transcript.update(request.transcript))
+        context_text, transcript_messages = self.context.apply(transcript_messages)
+        if context_text:
+            # Kept after the cached block so summary/fact updates leave that cache intact
+            system_blocks = system_blocks + [{"type": "text", "text": context_text}]
+        if self.prompt_caching:
+            transcript_messages = self.mark_cache_breakpoint(transcript_messages)
 
         if request.interaction_type == "reminder_required":
             transcript_messages.append(
@@ -168,39 +218,144 @@ Get a clear answer: Is the {payer if variables.get('payer') else 'insurance'} pa
                 }
             )
 
-        return system_prompt, transcript_messages
+        return system_blocks, transcript_messages
+
+    async def close(self):
+        await self.context.close()
+
+    def record_cache_usage(self, usage):
+        """Report prompt-cache hit/miss input tokens for this turn"""
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        uncached = getattr(usage, "input_tokens", None) or 0
+        metrics.llm_cache_read_input_tokens.inc(cache_read)
+        metrics.llm_cache_creation_input_tokens.inc(cache_write)
+        metrics.llm_uncached_input_tokens.inc(uncached)
+        log.debug("prompt_cache.usage", read=cache_read, written=cache_write, uncached=uncached)
+        self._usage = (uncached, cache_read, cache_write)
+
+    def log_route(self, route, request_start: float, first_token_at: Optional[float], output_chars: int):
+        """Per-route latency and estimated cost, for tuning the routing policy (debug: once per turn)"""
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+        uncached, cache_read, cache_write = self._usage
+        output_tokens = (output_chars + 3) // 4  # same ~4 chars/token estimate as context_policy
+        cost = estimate_cost(route.model, uncached, cache_read, cache_write, output_tokens)
+        log.debug(
+            "route.turn",
+            route=route.name,
+            reason=route.reason,
+            model=route.model,
+            ttft_ms=round((first_token_at - request_start) * 1000, 1) if first_token_at else None,
+            total_ms=round((time.perf_counter() - request_start) * 1000, 1),
+            input_tokens=uncached + cache_read + cache_write,
+            output_tokens=output_tokens,
+            cost_usd=round(cost, 6) if cost is not None else None,
+        )
+
+    async def draft_response(
+        self,
+        request: ResponseRequiredRequest,
+        waiting_since: Optional[float] = None,
+        on_route: Optional[Callable[[Route], None]] = None,
+    ):
+        """Stream the response events for `request`.
 
-    async def draft_response(self, request: ResponseRequiredRequest):
+        `waiting_since` (perf_counter() time Retell asked for the turn) orders
+        the upstream request in the scheduler; None marks background drafts.
+        The chosen route is counted right away unless `on_route` takes it
+        (speculative drafts count theirs only if they are used).
+        """
         try:
-            system_prompt, messages = self.prepare_prompt(request)
-            
-            print(f"\n📞 CALLING CLAUDE API")
-            print(f"Model: claude-opus-4-1")
-            print(f"Max tokens: 150")
-            print(f"System prompt length: {len(system_prompt)} chars")
-            print(f"Messages: {len(messages)} turns")
+            variables = request.retell_llm_dynamic_variables or {}
+            cache_key = None
+            if request.interaction_type == "response_required":
+                # Identifier read-backs come straight from the call metadata
+                answered = self.fast_path.answer(request.transcript, variables)
+                if answered is not None:
+                    metrics.fast_path_answers.inc()
+                    log.debug("fast_path.answer", response_id=request.response_id)
+                    yield ResponseChunk(response_id=request.response_id, content=answered)
+                    yield ResponseResponse(
+                        response_id=request.response_id,
+                        content="",
+                        content_complete=True,
+                        end_call=False,
+                    )
+                    return
+                cache_key = self.response_cache.key(request.transcript, variables)
+            if cache_key is not None:
+                cached = await self.response_cache.get(cache_key, variables)
+                if cached is not None:
+                    log.debug("response_cache.hit", response_id=request.response_id)
+                    yield ResponseChunk(response_id=request.response_id, content=cached)
+                    yield ResponseResponse(
+                        response_id=request.response_id,
+                        content="",
+                        content_complete=True,
+                        end_call=False,
+                    )
+                    return
+            answer: List[str] = []
+
+            build_start = time.perf_counter()
+            system_blocks, messages = self.prepare_prompt(request)
+            request_start = time.perf_counter()
+            metrics.llm_prompt_build.observe(request_start - build_start)
             
-            # ========== UPDATED: Using claude-opus-4-1 instead of 20241022 ==========
-            stream = await self.client.messages.create(
-                model="claude-opus-4-1",
-                max_tokens=150,
-                system=system_prompt,
-                messages=messages,
-                stream=True,
+            route = self.router.route(request.transcript, request.interaction_type)
+            (on_route or self.router.count)(route)
+            # Usage arrives with message_start; never report the previous turn's
+            self._usage = (0, 0, 0)
+            provider = self.providers[route.name]
+            log.debug(
+                "request.start",
+                response_id=request.response_id,
+                route=route.name,
+                model=route.model,
+                system_chars=len(system_blocks[0]["text"]),
+                messages=len(messages),
             )
             
-            print(f"✅ Claude API stream started successfully\n")
+            if self.backup is not None:
+                start = lambda: hedged_stream(
+                    provider, self.backup, self.hedge.hedge_after_ms / 1000.0, system_blocks, messages
+                )
+            else:
+                start = lambda: provider.stream(system_blocks, messages)
+            # A hedged turn's backup runs under the same admission
+            stream = llm_scheduler.stream(
+                start, lambda: estimate_request_tokens(system_blocks, messages, self.max_tokens), waiting_since
+            )
             
-            async for event in stream:
-                if event.type == "content_block_delta":
-                    if hasattr(event.delta, "text"):
-                        response = ResponseResponse(
-                            response_id=request.response_id,
-                            content=event.delta.text,
-                            content_complete=False,
-                            end_call=False,
-                        )
-                        yield response
+            first_token_at = None
+            output_chars = 0
+            completed = False
+            try:
+                async for text in stream:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        metrics.llm_time_to_first_token.observe(first_token_at - request_start)
+                    output_chars += len(text)
+                    if cache_key is not None:
+                        answer.append(text)
+                    # Hot path: no pydantic model per token
+                    response = ResponseChunk(
+                        response_id=request.response_id,
+                        content=text,
+                        content_complete=False,
+                        end_call=False,
+                    )
+                    yield response
+                completed = True
+            finally:
+                # Superseded turns are closed mid-stream; the provider aborts the upstream request.
+                if not completed:
+                    await stream.aclose()
+
+            self.log_route(route, request_start, first_token_at, output_chars)
+            if cache_key is not None:
+                self.response_cache.put(cache_key, "".join(answer), variables)
 
             # Send final response signaling completion
             response = ResponseResponse(
@@ -212,10 +367,10 @@ Get a clear answer: Is the {payer if variables.get('payer') else 'insurance'} pa
             yield response
             
         except Exception as e:
-            print(f"\n❌ ERROR in draft_response: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            import traceback
-            print(f"Traceback:\n{traceback.format_exc()}")
+            if isinstance(e, SchedulerRejected):
+                log.warning("request.rejected", response_id=request.response_id)
+            else:
+                log.exception("request.error", response_id=request.response_id, error_type=type(e).__name__)
             
             # Send error fallback response
             response = ResponseResponse(
@@ -0,0 +1,285 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+import anthropic
+from .logging_utils import get_logger
+from . import metrics
+
+log = get_logger("scheduler")
+
+# Anthropic: 429 rate limited, 529 overloaded
+RATE_LIMIT_STATUSES = (429, 529)
+
+
+class SchedulerRejected(Exception):
+    """An upstream request waited longer than LLM_QUEUE_MAX_WAIT for admission"""
+
+
+@dataclass
+class SchedulerPolicy:
+    """Process-wide admission control for upstream LLM requests.
+
+    A limit of 0 means unlimited. Requests that can't be admitted within
+    `max_wait` seconds of the caller starting to wait are rejected.
+    """
+
+    enabled: bool = False
+    max_concurrent: int = 0
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_wait: float = 8.0
+    max_retries: int = 2
+    backoff: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "SchedulerPolicy":
+        return cls(
+            enabled=os.environ.get("LLM_SCHEDULER", "false").lower() == "true",
+            max_concurrent=int(os.environ.get("LLM_MAX_CONCURRENT", cls.max_concurrent)),
+            requests_per_minute=int(os.environ.get("LLM_RPM", cls.requests_per_minute)),
+            tokens_per_minute=int(os.environ.get("LLM_TPM", cls.tokens_per_minute)),
+            max_wait=float(os.environ.get("LLM_QUEUE_MAX_WAIT", cls.max_wait)),
+            max_retries=int(os.environ.get("LLM_RATE_LIMIT_RETRIES", cls.max_retries)),
+            backoff=float(os.environ.get("LLM_RATE_LIMIT_BACKOFF", cls.backoff)),
+        )
+
+
+class TokenBucket:
+    """`per_minute` units, refilled continuously; 0 means unlimited"""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float]):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` is available (an amount over capacity waits for a full bucket)"""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(self._clock())
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        if self.capacity > 0:
+            self.level -= min(amount, self.capacity)
+
+
+def rate_limit_delay(error: BaseException) -> Optional[float]:
+    """retry-after (seconds) of a rate-limit/overload error; 0 if it gave none, None for other errors"""
+    if getattr(error, "status_code", None) not in RATE_LIMIT_STATUSES:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue  # HTTP-date form: fall back to our own backoff
+    return 0.0
+
+
+def is_transient(error: BaseException) -> bool:
+    """Connection failures and 5xx: worth retrying, but not a reason to slow everyone down"""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and status >= 500 and status not in RATE_LIMIT_STATUSES
+
+
+class LlmScheduler:
+    """Admits upstream requests under a concurrency cap and RPM/TPM budgets.
+
+    Waiting requests are served in order of how long the caller has been
+    waiting (response_required turns by when Retell asked, background work
+    such as speculative drafts and summaries after every live turn). A 429
+    or overload error pauses all admissions for its retry-after, and the
+    request is queued again with its original priority.
+    """
+
+    def __init__(self, policy: Optional[SchedulerPolicy] = None, clock: Callable[[], float] = time.perf_counter):
+        self.policy = policy or SchedulerPolicy.from_env()
+        self._clock = clock
+        self._requests = TokenBucket(self.policy.requests_per_minute, clock)
+        self._tokens = TokenBucket(self.policy.tokens_per_minute, clock)
+        # (background, waiting_since, seq, future, tokens, enqueued_at)
+        self._queue: List[Tuple[int, float, int, asyncio.Future, int, float]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._paused_until = 0.0
+        self.running = 0
+        self.waiting = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy.enabled
+
+    async def acquire(self, tokens: int, waiting_since: Optional[float] = None):
+        """Wait for admission; release() when the request is done.
+
+        `waiting_since` is the perf_counter() time the caller started waiting;
+        None marks background work. Raises SchedulerRejected past max_wait.
+        """
+        now = self._clock()
+        background = waiting_since is None
+        since = now if background else waiting_since
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(background), since, next(self._seq), future, tokens, now))
+        self.waiting += 1
+        self._dispatch()
+        if future.done():
+            return
+        try:
+            await asyncio.wait((future,), timeout=max(0.0, since + self.policy.max_wait - now))
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+        if not future.done():
+            self._abandon(future)
+            metrics.llm_scheduler_rejections.inc()
+            log.warning("scheduler.rejected", waited=round(self._clock() - since, 3), background=background)
+            raise SchedulerRejected(f"not admitted within {self.policy.max_wait}s")
+
+    def release(self):
+        self.running -= 1
+        self._dispatch()
+
+    def _abandon(self, future: asyncio.Future):
+        if future.done():
+            # Admitted just as the caller gave up
+            self.release()
+        else:
+            future.cancel()
+            self.waiting -= 1
+
+    def cool_down(self, delay: float):
+        """Hold every admission for `delay` seconds (a 429's retry-after)"""
+        self._paused_until = max(self._paused_until, self._clock() + delay)
+        metrics.llm_rate_limited.inc()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            _, _, _, future, tokens, enqueued_at = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.policy.max_concurrent and self.running >= self.policy.max_concurrent:
+                return  # the next release() dispatches again
+            now = self._clock()
+            delay = max(self._paused_until - now, self._requests.delay(1), self._tokens.delay(tokens))
+            if delay > 0:
+                # The head of the queue waits; nothing overtakes it
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self.running += 1
+            self.waiting -= 1
+            metrics.llm_scheduler_wait.observe(now - enqueued_at)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int, waiting_since: Optional[float] = None):
+        """Hold an admission for a non-streaming request"""
+        if not self.enabled:
+            yield
+            return
+        await self.acquire(tokens, waiting_since)
+        try:
+            yield
+        except Exception as e:
+            delay = rate_limit_delay(e)
+            if delay is not None:
+                self.cool_down(delay or self.policy.backoff)
+            raise
+        finally:
+            self.release()
+
+    def stream(
+        self,
+        start: Callable[[], AsyncIterator[Any]],
+        tokens: Callable[[], int],
+        waiting_since: Optional[float] = None,
+    ) -> AsyncIterator[Any]:
+        """Run the stream from `start()` once admitted, holding the admission
+        until it ends. Rate-limit and transient errors before the first item
+        are retried up to max_retries times (the SDK's own retries are off
+        while the scheduler is enabled).
+        """
+        if not self.enabled:
+            return start()
+        return self._scheduled(start, tokens(), waiting_since)
+
+    async def _scheduled(self, start, tokens: int, waiting_since: Optional[float]):
+        attempt = 0
+        backoff = 0.0
+        while True:
+            if backoff:
+                # Only this request backs off; other admissions carry on
+                await asyncio.sleep(backoff)
+                backoff = 0.0
+            await self.acquire(tokens, waiting_since)
+            iterator = start()
+            try:
+                try:
+                    first = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    delay = rate_limit_delay(e)
+                    transient = delay is None and is_transient(e)
+                    if delay is None and not transient:
+                        raise
+                    delay = delay or self.policy.backoff * 2 ** attempt
+                    if transient:
+                        backoff = delay
+                    else:
+                        self.cool_down(delay)
+                    if attempt >= self.policy.max_retries:
+                        raise
+                    attempt += 1
+                    log.warning(
+                        "scheduler.retry",
+                        status=getattr(e, "status_code", None),
+                        error_type=type(e).__name__,
+                        delay=delay,
+                        attempt=attempt,
+                    )
+                    continue
+                yield first
+                async for item in iterator:
+                    yield item
+                return
+            finally:
+                await iterator.aclose()
+                self.release()
+
+
+llm_scheduler = LlmScheduler()
+metrics.gauge(
+    "llm_scheduler_queue_depth",
+    "Upstream LLM requests waiting for admission",
+    fn=lambda: llm_scheduler.waiting,
+)
+metrics.gauge(
+    "llm_scheduler_running",
+    "Upstream LLM requests admitted and not yet finished",
+    fn=lambda: llm_scheduler.running,
+)
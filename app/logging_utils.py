@@ -0,0 +1,176 @@
+import os
+import sys
+import copy
+import time
+import atexit
+import queue
+import random
+import logging
+import logging.handlers
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+
+    def _dumps(value: Dict[str, Any]) -> str:
+        return orjson.dumps(value, default=str).decode()
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
+
+    def _dumps(value: Dict[str, Any]) -> str:
+        return json.dumps(value, default=str)
+
+
+ROOT_LOGGER = "app"
+# High-frequency events are sampled unless LOG_SAMPLE overrides them.
+DEFAULT_SAMPLE = "ws.update_only=0.05"
+
+
+def _parse_pairs(spec: str) -> Dict[str, str]:
+    pairs = {}
+    for item in spec.split(","):
+        name, sep, value = item.strip().partition("=")
+        if sep and name:
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+class StructuredFormatter(logging.Formatter):
+    """`ts level logger event key=value ...`, or one JSON object per line"""
+
+    def __init__(self, as_json: bool = False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if self.as_json:
+            payload = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "event": record.getMessage(),
+            }
+            payload.update(fields)
+            exc = self._exception_text(record)
+            if exc:
+                payload["exc"] = exc
+            return _dumps(payload)
+
+        parts = [
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)),
+            record.levelname,
+            record.name,
+            record.getMessage(),
+        ]
+        parts.extend(f"{key}={value}" for key, value in fields.items())
+        line = " ".join(parts)
+        exc = self._exception_text(record)
+        if exc:
+            line += "\n" + exc
+        return line
+
+    def _exception_text(self, record: logging.LogRecord) -> Optional[str]:
+        if record.exc_text:
+            return record.exc_text
+        if record.exc_info:
+            return self.formatException(record.exc_info)
+        return None
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Like QueueHandler, but keeps the traceback out of the message text"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class StructuredLogger:
+    """Level-gated structured logger: `log.debug("event", key=value)`.
+
+    Nothing is formatted (and no LogRecord is built) unless the level is
+    enabled, so disabled hot-path logging costs one level check. Events listed
+    in LOG_SAMPLE (e.g. `ws.update_only=0.05`) are only emitted at that rate.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_rates: Dict[str, float]):
+        self.logger = logger
+        self.sample_rates = sample_rates
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, fields: Dict[str, Any], exc_info=None):
+        if not self.logger.isEnabledFor(level):
+            return
+        rate = self.sample_rates.get(event)
+        if rate is not None and random.random() >= rate:
+            return
+        self.logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, exc_info=None, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=exc_info)
+
+    def exception(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_sample_rates: Dict[str, float] = {}
+
+
+def setup_logging():
+    """Route `app.*` loggers through a background queue thread; idempotent.
+
+    LOG_LEVEL sets the default level, LOG_LEVELS per subsystem
+    (`server=DEBUG,redis=WARNING`), LOG_FORMAT=json switches to JSON lines and
+    LOG_SAMPLE sets per-event sampling rates.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_pairs(os.environ.get("LOG_LEVELS", "")).items():
+        logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(level.upper())
+    for event, rate in _parse_pairs(os.environ.get("LOG_SAMPLE", DEFAULT_SAMPLE)).items():
+        _sample_rates[event] = float(rate)
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(StructuredFormatter(as_json=os.environ.get("LOG_FORMAT", "text") == "json"))
+
+    # Handlers run on the listener thread; the event loop only enqueues.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(_QueueHandler(log_queue))
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(subsystem: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{subsystem}"), _sample_rates)
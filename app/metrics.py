@@ -0,0 +1,297 @@
+import asyncio
+import bisect
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions"""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets: List[float] = sorted(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Gauge:
+    """Value that goes up and down; `fn`, if given, is read at scrape time instead"""
+
+    def __init__(self, name: str, description: str, fn: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.description = description
+        self.fn = fn
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self._value -= amount
+
+    def set(self, value: float):
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        if self.fn is not None:
+            return self.fn()
+        return self._value
+
+
+registry: Dict[str, object] = {}
+
+
+def counter(name: str, description: str) -> Counter:
+    metric = registry.get(name)
+    if metric is None:
+        metric = registry[name] = Counter(name, description)
+    return metric
+
+
+def gauge(name: str, description: str, fn: Optional[Callable[[], float]] = None) -> Gauge:
+    metric = registry.get(name)
+    if metric is None:
+        metric = registry[name] = Gauge(name, description, fn)
+    return metric
+
+
+def histogram(name: str, description: str, buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+    metric = registry.get(name)
+    if metric is None:
+        metric = registry[name] = Histogram(name, description, buckets)
+    return metric
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def render() -> str:
+    """Prometheus text exposition (format 0.0.4) of every registered metric"""
+    lines = []
+    for metric in registry.values():
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        if isinstance(metric, Histogram):
+            lines.append(f"# TYPE {metric.name} histogram")
+            cumulative = 0
+            for bound, count in zip(list(metric.buckets) + [float("inf")], metric.counts):
+                cumulative += count
+                lines.append(f'{metric.name}_bucket{{le="{_format(bound)}"}} {cumulative}')
+            lines.append(f"{metric.name}_sum {_format(metric.sum)}")
+            lines.append(f"{metric.name}_count {metric.count}")
+        else:
+            kind = "counter" if isinstance(metric, Counter) else "gauge"
+            lines.append(f"# TYPE {metric.name} {kind}")
+            lines.append(f"{metric.name} {_format(metric.value)}")
+    return "\n".join(lines) + "\n"
+
+
+turns_cancelled = counter(
+    "turns_cancelled_total",
+    "In-flight responses cancelled because a newer turn superseded them",
+)
+turn_cancel_latency = histogram(
+    "turn_cancel_latency_seconds",
+    "Time from cancelling a superseded response to its task (and upstream stream) being torn down",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+llm_wasted_output_tokens = counter(
+    "llm_wasted_output_tokens_total",
+    "Estimated output tokens streamed from the LLM for responses that were cancelled",
+)
+llm_cache_read_input_tokens = counter(
+    "llm_cache_read_input_tokens_total",
+    "Input tokens served from the Anthropic prompt cache",
+)
+llm_cache_creation_input_tokens = counter(
+    "llm_cache_creation_input_tokens_total",
+    "Input tokens written to the Anthropic prompt cache",
+)
+llm_uncached_input_tokens = counter(
+    "llm_uncached_input_tokens_total",
+    "Input tokens billed without prompt caching",
+)
+speculation_started = counter(
+    "speculation_started_total",
+    "Speculative drafts started from update_only events",
+)
+speculation_hits = counter(
+    "speculation_hits_total",
+    "Speculative drafts reused for the matching response_required",
+)
+speculation_misses = counter(
+    "speculation_misses_total",
+    "Speculative drafts discarded because the transcript moved on",
+)
+speculation_wasted_output_tokens = counter(
+    "speculation_wasted_output_tokens_total",
+    "Estimated output tokens generated by discarded speculative drafts",
+)
+
+
+# Per-turn latency, all measured with time.perf_counter().
+ws_messages_received = counter(
+    "ws_messages_received_total",
+    "Messages received from Retell over the LLM websocket",
+)
+metadata_lookup = histogram(
+    "metadata_lookup_seconds",
+    "Provider metadata lookups in the Redis (or memory) store",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+llm_prompt_build = histogram(
+    "llm_prompt_build_seconds",
+    "Time to build the system prompt and messages for a turn",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+)
+llm_request_start = histogram(
+    "llm_request_start_seconds",
+    "Time from sending the upstream request to the response stream opening",
+)
+llm_time_to_first_token = histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending the upstream request to the first streamed text delta",
+)
+turn_first_frame = histogram(
+    "turn_first_frame_seconds",
+    "Time from receiving response_required to the first response frame being sent",
+)
+turn_duration = histogram(
+    "turn_duration_seconds",
+    "Time from receiving response_required to the final response frame being sent",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+ws_active = gauge(
+    "ws_active_connections",
+    "Open LLM websocket connections",
+)
+ws_handler_tasks = gauge(
+    "ws_handler_tasks",
+    "Inbound websocket events being handled, across connections",
+)
+ws_backpressure_waits = counter(
+    "ws_backpressure_waits_total",
+    "Times a connection stopped reading because WS_MAX_INFLIGHT events were being handled",
+)
+ws_send_queue_depth = gauge(
+    "ws_send_queue_depth",
+    "Response frames queued for the websocket writers, across connections",
+)
+ws_stale_frames_dropped = counter(
+    "ws_stale_frames_dropped_total",
+    "Queued response frames dropped because a newer turn superseded them",
+)
+ws_heartbeat_latency = histogram(
+    "ws_heartbeat_latency_seconds",
+    "Time from receiving ping_pong to its reply being written",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+llm_streams_in_flight = gauge(
+    "llm_streams_in_flight",
+    "Upstream LLM response streams currently open",
+)
+llm_scheduler_wait = histogram(
+    "llm_scheduler_wait_seconds",
+    "Time upstream LLM requests waited for admission by the scheduler",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+llm_scheduler_rejections = counter(
+    "llm_scheduler_rejections_total",
+    "Upstream LLM requests not admitted within LLM_QUEUE_MAX_WAIT",
+)
+llm_rate_limited = counter(
+    "llm_rate_limited_total",
+    "Upstream 429/overloaded responses (each pauses admissions for its retry-after)",
+)
+llm_hedged_turns = counter(
+    "llm_hedged_turns_total",
+    "Turns streamed with a backup model armed",
+)
+llm_hedges = counter(
+    "llm_hedges_total",
+    "Backup requests fired because the primary model had no first token in time (or failed)",
+)
+llm_hedge_wins = counter(
+    "llm_hedge_wins_total",
+    "Hedged turns where the backup model produced the first token",
+)
+response_cache_hits = counter(
+    "llm_response_cache_hits_total",
+    "Turns answered from the response cache without an upstream call",
+)
+response_cache_misses = counter(
+    "llm_response_cache_misses_total",
+    "Cacheable turns that had to go upstream",
+)
+fast_path_answers = counter(
+    "llm_fast_path_answers_total",
+    "Identifier questions answered from call metadata without an upstream call",
+)
+tool_cache_hits = counter(
+    "tool_cache_hits_total",
+    "Idempotent tool calls answered from memoized results",
+)
+hold_skipped_turns = counter(
+    "llm_hold_skipped_turns_total",
+    "Turns answered locally (or silently) because the call was on hold",
+)
+holds_entered = counter(
+    "call_holds_total",
+    "Times a call was detected going on hold",
+)
+hold_duration = histogram(
+    "call_hold_duration_seconds",
+    "How long a detected hold lasted before someone picked the call back up",
+    buckets=(5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0),
+)
+event_loop_lag = histogram(
+    "event_loop_lag_seconds",
+    "How late a periodic timer fires on the event loop (time every call waits for the loop)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+async def monitor_event_loop(interval: float = 0.1):
+    """Sample event-loop lag into event_loop_lag until cancelled"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+def _pending_tasks() -> float:
+    try:
+        return len(asyncio.all_tasks())
+    except RuntimeError:
+        return 0
+
+
+pending_tasks = gauge(
+    "asyncio_pending_tasks",
+    "Unfinished asyncio tasks on the event loop",
+    fn=_pending_tasks,
+)
@@ -0,0 +1,156 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, NamedTuple, Optional, Sequence, Tuple
+from .transcript_buffer import utterance_parts
+from . import metrics
+
+# USD per million tokens: (input, output). Cache reads bill at 0.1x input,
+# cache writes at 1.25x. Matched by model-name prefix.
+MODEL_PRICES = {
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-haiku-4": (1.0, 5.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+
+
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    for prefix, price in MODEL_PRICES.items():
+        if model.startswith(prefix):
+            return price
+    return None
+
+
+def estimate_cost(model: str, uncached: int, cache_read: int, cache_write: int, output: int) -> Optional[float]:
+    price = model_price(model)
+    if price is None:
+        return None
+    input_price, output_price = price
+    billed_input = uncached + cache_read * 0.1 + cache_write * 1.25
+    return (billed_input * input_price + output * output_price) / 1_000_000
+
+
+@dataclass
+class RoutingPolicy:
+    """Which model answers a turn.
+
+    mode: off  - every turn goes to the heavy model (previous behaviour)
+          auto - simple turns go to the fast model
+          fast - every turn goes to the fast model
+    """
+
+    mode: str = "off"
+    heavy_model: str = "claude-opus-4-1"
+    fast_model: str = "claude-3-5-haiku-latest"
+    max_fast_words: int = 12
+    opening_turns: int = 2
+
+    @classmethod
+    def from_env(cls) -> "RoutingPolicy":
+        return cls(
+            mode=os.environ.get("LLM_ROUTING", cls.mode),
+            heavy_model=os.environ.get("LLM_MODEL", cls.heavy_model),
+            fast_model=os.environ.get("LLM_FAST_MODEL", cls.fast_model),
+            max_fast_words=int(os.environ.get("LLM_ROUTE_MAX_FAST_WORDS", cls.max_fast_words)),
+            opening_turns=int(os.environ.get("LLM_ROUTE_OPENING_TURNS", cls.opening_turns)),
+        )
+
+
+class Route(NamedTuple):
+    name: str
+    model: str
+    reason: str
+
+
+# Anything about the panel itself needs the heavy model to reason about.
+_HEAVY = re.compile(
+    r"\b(panel|network|closed|open(?:ing)?|wait ?list(?:ed)?|accepting|credential\w*|contract\w*|"
+    r"application|requirement\w*|eligib\w*|moratorium|denied|approved|status|why|explain|reason)\b"
+)
+_FAST = (
+    ("hold", re.compile(
+        r"\b(hold|one moment|bear with me|just a (?:moment|second|sec)|let me (?:check|pull|look|see|think))\b"
+    )),
+    ("identifier", re.compile(
+        r"\b(npi|tax id|tin|name of the|spell|phone number|zip|address|date of birth|"
+        r"provider name|group name|who am i speaking)\b"
+    )),
+    ("closing", re.compile(r"\b(anything else|have a (?:good|great|nice)|goodbye|bye)\b")),
+    ("thanks", re.compile(r"\b(thank(?:s| you)|you'?re welcome|no problem)\b")),
+    ("greeting", re.compile(r"^(?:hi|hello|hey|good (?:morning|afternoon))\b")),
+    ("confirmation", re.compile(
+        r"^(?:yes|yeah|yep|no|nope|okay|ok|sure|correct|right|got it|mm-?hmm|uh-?huh|alright|perfect)\b"
+    )),
+)
+
+
+class ModelRouter:
+    """Classifies each turn locally (last rep utterance, its length, call phase)"""
+
+    def __init__(self, policy: Optional[RoutingPolicy] = None):
+        self.policy = policy or RoutingPolicy.from_env()
+        self._turns = {
+            name: metrics.counter(f"llm_route_{name}_turns_total", f"Turns answered by the {name} model")
+            for name in ("fast", "heavy")
+        }
+
+    def route(self, transcript: Sequence[Any], interaction_type: str) -> Route:
+        """Pick the model for a turn; count() it once the answer is actually used"""
+        return self._classify(transcript, interaction_type)
+
+    def count(self, route: Route):
+        self._turns[route.name].inc()
+
+    def _fast(self, reason: str) -> Route:
+        return Route("fast", self.policy.fast_model, reason)
+
+    def _heavy(self, reason: str) -> Route:
+        return Route("heavy", self.policy.heavy_model, reason)
+
+    def _classify(self, transcript: Sequence[Any], interaction_type: str) -> Route:
+        mode = self.policy.mode
+        if mode == "fast":
+            return self._fast("forced")
+        if mode != "auto":
+            return self._heavy("routing_off")
+        if interaction_type == "reminder_required":
+            return self._fast("reminder")
+
+        # Walk back to the latest rep utterance instead of scanning the whole
+        # call; the opening check below stops counting after a few turns too.
+        text = ""
+        for raw in reversed(transcript):
+            role, content = utterance_parts(raw)
+            if role == "user":
+                text = content
+                break
+        text = text.strip().lower()
+        if not text:
+            return self._fast("no_user_turn")
+
+        if _HEAVY.search(text):
+            return self._heavy("panel_details")
+        if len(text.split()) > self.policy.max_fast_words:
+            return self._heavy("long_turn")
+        if text.count("?") > 1:
+            return self._heavy("multi_question")
+        for reason, pattern in _FAST:
+            if pattern.search(text):
+                return self._fast(reason)
+        if self._opening(transcript):
+            return self._fast("opening")
+        return self._heavy("default")
+
+    def _opening(self, transcript: Sequence[Any]) -> bool:
+        """At most `opening_turns` rep utterances so far; stops counting past that"""
+        user_turns = 0
+        for raw in transcript:
+            if utterance_parts(raw)[0] == "user":
+                user_turns += 1
+                if user_turns > self.policy.opening_turns:
+                    return False
+        return True
@@ -0,0 +1,238 @@
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+from .context_policy import estimate_tokens, message_text
+from .logging_utils import get_logger
+from . import metrics
+
+log = get_logger("providers")
+
+Message = Dict[str, Any]
+
+
+class AnthropicProvider:
+    """Streams the text of one Anthropic Messages API response"""
+
+    name = "anthropic"
+
+    def __init__(self, client, model: str, max_tokens: int = 150, on_usage: Optional[Callable[[Any], None]] = None):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.on_usage = on_usage
+
+    async def stream(self, system_blocks: List[Message], messages: List[Message]) -> AsyncIterator[str]:
+        request_start = time.perf_counter()
+        stream = await self.client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            system=system_blocks,
+            messages=messages,
+            stream=True,
+        )
+        metrics.llm_request_start.observe(time.perf_counter() - request_start)
+        metrics.llm_streams_in_flight.inc()
+
+        streamed_tokens = 0
+        completed = False
+        try:
+            async for event in stream:
+                if event.type == "message_start":
+                    if self.on_usage is not None:
+                        self.on_usage(event.message.usage)
+                elif event.type == "content_block_delta":
+                    if hasattr(event.delta, "text"):
+                        streamed_tokens += estimate_tokens(event.delta.text)
+                        yield event.delta.text
+            completed = True
+        finally:
+            metrics.llm_streams_in_flight.dec()
+            # Superseded turns and hedge losers are closed mid-stream: abort the
+            # upstream HTTP response so the model stops generating (and billing).
+            if not completed:
+                await stream.close()
+                metrics.llm_wasted_output_tokens.inc(streamed_tokens)
+
+
+_openai_client = None
+
+
+def openai_client():
+    """Process-wide AsyncOpenAI client, created on first use"""
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+
+        _openai_client = AsyncOpenAI(
+            organization=os.environ.get("OPENAI_ORGANIZATION_ID"),
+            api_key=os.environ["OPENAI_API_KEY"],
+        )
+    return _openai_client
+
+
+class OpenAIProvider:
+    """Streams the text of one OpenAI chat completion for the same prompt"""
+
+    name = "openai"
+
+    def __init__(self, model: str, max_tokens: int = 150, client=None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = openai_client()
+        return self._client
+
+    def convert_prompt(self, system_blocks: List[Message], messages: List[Message]) -> List[Message]:
+        system = "\n\n".join(block["text"] for block in system_blocks)
+        converted = [{"role": "system", "content": system}]
+        converted.extend({"role": m["role"], "content": message_text(m)} for m in messages)
+        return converted
+
+    async def stream(self, system_blocks: List[Message], messages: List[Message]) -> AsyncIterator[str]:
+        request_start = time.perf_counter()
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            messages=self.convert_prompt(system_blocks, messages),
+            stream=True,
+        )
+        metrics.llm_request_start.observe(time.perf_counter() - request_start)
+        metrics.llm_streams_in_flight.inc()
+
+        streamed_tokens = 0
+        completed = False
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = chunk.choices[0].delta.content
+                    streamed_tokens += estimate_tokens(text)
+                    yield text
+            completed = True
+        finally:
+            metrics.llm_streams_in_flight.dec()
+            if not completed:
+                await stream.close()
+                metrics.llm_wasted_output_tokens.inc(streamed_tokens)
+
+
+def build_provider(kind: str, model: str, anthropic_client=None, max_tokens: int = 150, on_usage=None):
+    if kind == "anthropic":
+        return AnthropicProvider(anthropic_client, model, max_tokens, on_usage)
+    if kind == "openai":
+        return OpenAIProvider(model, max_tokens)
+    raise ValueError(f"Unknown LLM provider: {kind}")
+
+
+@dataclass
+class HedgePolicy:
+    """When to race a backup model against a slow primary"""
+
+    hedge_after_ms: float = 0.0
+    backup_provider: str = "anthropic"
+    backup_model: str = "claude-3-5-haiku-latest"
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        return cls(
+            hedge_after_ms=float(os.environ.get("LLM_HEDGE_AFTER_MS", cls.hedge_after_ms)),
+            backup_provider=os.environ.get("LLM_BACKUP_PROVIDER", cls.backup_provider),
+            backup_model=os.environ.get("LLM_BACKUP_MODEL", cls.backup_model),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.hedge_after_ms > 0
+
+
+# Losing streams are torn down off the response path; keep them referenced.
+_discarding: Set[asyncio.Task] = set()
+
+
+async def _discard(task: asyncio.Future, iterator):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await iterator.aclose()
+
+
+def _discard_later(task: asyncio.Future, iterator):
+    cleanup = asyncio.ensure_future(_discard(task, iterator))
+    _discarding.add(cleanup)
+    cleanup.add_done_callback(_discarding.discard)
+
+
+async def hedged_stream(
+    primary,
+    backup,
+    hedge_after: float,
+    system_blocks: List[Message],
+    messages: List[Message],
+) -> AsyncIterator[str]:
+    """Stream from `primary`; if it has no first token after `hedge_after`
+    seconds (or fails before one), also start `backup` and stream whichever
+    produces a token first. The other request is cancelled.
+    """
+    metrics.llm_hedged_turns.inc()
+    pending: Dict[asyncio.Future, Any] = {}
+
+    def launch(provider):
+        iterator = provider.stream(system_blocks, messages)
+        pending[asyncio.ensure_future(iterator.__anext__())] = (provider, iterator)
+
+    launch(primary)
+    hedged = False
+    winner = None
+    first: Optional[str] = None
+    error: Optional[BaseException] = None
+    try:
+        while winner is None:
+            if hedged:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                done, _ = await asyncio.wait(pending, timeout=hedge_after)
+                if not done:
+                    log.debug("hedge.fired", primary=primary.model, backup=backup.model)
+                    metrics.llm_hedges.inc()
+                    hedged = True
+                    launch(backup)
+                    continue
+
+            for task in done:
+                provider, iterator = pending.pop(task)
+                exc = task.exception()
+                if exc is None or isinstance(exc, StopAsyncIteration):
+                    winner = (provider, iterator)
+                    first = None if exc else task.result()
+                    break
+                error = exc
+                log.warning("hedge.provider_failed", provider=provider.name, model=provider.model, error=str(exc))
+
+            if winner is None and not pending:
+                if hedged:
+                    raise error
+                # Primary failed before its first token: go straight to the backup.
+                metrics.llm_hedges.inc()
+                hedged = True
+                launch(backup)
+
+        for task, (_, iterator) in list(pending.items()):
+            _discard_later(task, iterator)
+        pending.clear()
+
+        provider, iterator = winner
+        if hedged and provider is backup:
+            metrics.llm_hedge_wins.inc()
+        if first is not None:
+            yield first
+        async for text in iterator:
+            yield text
+    finally:
+        for task, (_, iterator) in pending.items():
+            await _discard(task, iterator)
+        if winner is not None:
+            await winner[1].aclose()
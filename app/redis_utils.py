@@ -1,104 +1,199 @@
 import os
 import json
-import redis
-from typing import Dict, Optional
+import time
+import asyncio
+import redis.asyncio as aioredis
+from typing import Dict, List, Optional, Sequence, Tuple
+from .logging_utils import get_logger
+from .ttl_cache import TTLCache
+from . import metrics
+
+log = get_logger("redis")
+
+METADATA_TTL_SECONDS = int(os.environ.get("REDIS_METADATA_TTL", 3600))
+MEMORY_STORE_MAX_ENTRIES = int(os.environ.get("MEMORY_STORE_MAX_ENTRIES", 10000))
+
+
+class MetadataUnavailable(Exception):
+    """The metadata store failed to answer (as opposed to having no entry)"""
+
+
+def memory_fallback() -> TTLCache:
+    """In-process stand-in for Redis: same TTL as setex, bounded by LRU eviction"""
+    return TTLCache(maxsize=MEMORY_STORE_MAX_ENTRIES, ttl=METADATA_TTL_SECONDS)
+
+
+def metadata_key(phone_number: str) -> str:
+    """Redis key for a phone number's provider metadata"""
+    normalized_phone = ''.join(c for c in phone_number if c.isdigit() or c == '+')
+    return f"provider_metadata:{normalized_phone}"
+
+
+class AsyncRedisMetadataStore:
+    """Non-blocking provider metadata store backed by a shared redis.asyncio pool"""
 
-class RedisMetadataStore:
-    """Stores and retrieves provider metadata from Redis"""
-    
     def __init__(self):
-        redis_url = os.environ.get("REDIS_URL")
+        self.redis_url = os.environ.get("REDIS_URL")
         redis_enabled = os.environ.get("REDIS_ENABLED", "false").lower() == "true"
-        
-        print(f"\n{'='*70}")
-        print(f"🔴 REDIS INITIALIZATION")
-        print(f"{'='*70}")
-        print(f"REDIS_ENABLED: {redis_enabled}")
-        print(f"REDIS_URL exists: {bool(redis_url)}")
-        
-        self.enabled = redis_enabled and bool(redis_url)
-        
-        if self.enabled:
-            try:
-                self.client = redis.from_url(redis_url, decode_responses=True)
-                self.client.ping()
-                print(f"✅ Redis connection successful")
-                print(f"{'='*70}\n")
-            except Exception as e:
-                print(f"❌ Redis connection failed: {str(e)}")
-                print(f"Falling back to memory storage")
-                print(f"{'='*70}\n")
-                self.enabled = False
-                self.memory_store = {}
-        else:
-            print(f"⚠️  Redis disabled or not configured")
-            print(f"{'='*70}\n")
-            self.memory_store = {}
-    
-    def store_metadata(self, phone_number: str, metadata: Dict) -> bool:
+        self.max_connections = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
+        self.pool_timeout = float(os.environ.get("REDIS_POOL_TIMEOUT", "2.0"))
+        self.enabled = redis_enabled and bool(self.redis_url)
+        self.client = None
+        self.memory_store = memory_fallback()
+        self._connected = False
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Create the connection pool and verify Redis is reachable"""
+        async with self._connect_lock:
+            if self._connected:
+                return
+            log.info("redis.init", enabled=self.enabled, url_set=bool(self.redis_url))
+
+            if self.enabled:
+                try:
+                    # Commands beyond max_connections wait for a free connection
+                    # (up to pool_timeout) instead of failing outright
+                    pool = aioredis.BlockingConnectionPool.from_url(
+                        self.redis_url,
+                        decode_responses=True,
+                        max_connections=self.max_connections,
+                        timeout=self.pool_timeout,
+                    )
+                    self.client = aioredis.Redis(connection_pool=pool)
+                    await self.client.ping()
+                    log.info("redis.connected", max_connections=self.max_connections)
+                except Exception as e:
+                    log.error("redis.connect_failed", error=str(e), fallback="memory")
+                    self.enabled = False
+                    self.client = None
+            else:
+                log.warning("redis.disabled", fallback="memory")
+            self._connected = True
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        self._connected = False
+
+    async def _ready(self) -> bool:
+        if not self._connected:
+            await self.connect()
+        return self.enabled and self.client is not None
+
+    async def store_metadata(self, phone_number: str, metadata: Dict) -> bool:
         """Store provider metadata in Redis"""
         try:
-            normalized_phone = ''.join(c for c in phone_number if c.isdigit() or c == '+')
-            key = f"provider_metadata:{normalized_phone}"
-            value = json.dumps(metadata)
-            
-            if self.enabled and hasattr(self, 'client'):
-                self.client.setex(key, 3600, value)
-                print(f"✅ Redis STORE: {key} (TTL: 3600s)")
+            key = metadata_key(phone_number)
+
+            if await self._ready():
+                await self.client.setex(key, METADATA_TTL_SECONDS, json.dumps(metadata))
+                log.debug("metadata.stored", key=key, backend="redis", ttl=METADATA_TTL_SECONDS)
             else:
-                self.memory_store[key] = metadata
-                print(f"✅ MEMORY STORE: {key}")
-            
+                self.memory_store.set(key, metadata)
+                log.debug("metadata.stored", key=key, backend="memory")
+
             return True
         except Exception as e:
-            print(f"❌ Error storing metadata: {str(e)}")
+            log.exception("metadata.store_failed", error=str(e))
             return False
-    
-    def retrieve_metadata(self, phone_number: str) -> Optional[Dict]:
-        """Retrieve provider metadata from Redis"""
+
+    async def retrieve_metadata(self, phone_number: str) -> Optional[Dict]:
+        """Retrieve provider metadata from Redis; None on a miss.
+
+        Raises MetadataUnavailable when the lookup itself fails, so callers
+        can retry instead of caching the failure as a miss.
+        """
+        started = time.perf_counter()
         try:
-            normalized_phone = ''.join(c for c in phone_number if c.isdigit() or c == '+')
-            key = f"provider_metadata:{normalized_phone}"
-            
-            if self.enabled and hasattr(self, 'client'):
-                value = self.client.get(key)
+            key = metadata_key(phone_number)
+
+            if await self._ready():
+                value = await self.client.get(key)
                 if value:
                     metadata = json.loads(value)
-                    print(f"✅ Redis RETRIEVE: {key} - found {len(metadata)} fields")
+                    log.debug("metadata.retrieved", key=key, backend="redis", fields=len(metadata))
                     return metadata
-                else:
-                    print(f"⚠️  Redis RETRIEVE: {key} - not found")
-                    return None
-            else:
-                if key in self.memory_store:
-                    metadata = self.memory_store[key]
-                    print(f"✅ MEMORY RETRIEVE: {key} - found {len(metadata)} fields")
-                    return metadata
-                else:
-                    print(f"⚠️  MEMORY RETRIEVE: {key} - not found")
-                    return None
-        except Exception as e:
-            print(f"❌ Error retrieving metadata: {str(e)}")
+                log.debug("metadata.miss", key=key, backend="redis")
+                return None
+
+            metadata = self.memory_store.get(key)
+            if metadata is not None:
+                log.debug("metadata.retrieved", key=key, backend="memory", fields=len(metadata))
+                return metadata
+            log.debug("metadata.miss", key=key, backend="memory")
             return None
-    
-    def delete_metadata(self, phone_number: str) -> bool:
+        except Exception as e:
+            log.exception("metadata.retrieve_failed", error=str(e))
+            raise MetadataUnavailable(str(e)) from e
+        finally:
+            metrics.metadata_lookup.observe(time.perf_counter() - started)
+
+    async def delete_metadata(self, phone_number: str) -> bool:
         """Delete provider metadata"""
         try:
-            normalized_phone = ''.join(c for c in phone_number if c.isdigit() or c == '+')
-            key = f"provider_metadata:{normalized_phone}"
-            
-            if self.enabled and hasattr(self, 'client'):
-                self.client.delete(key)
-                print(f"✅ Redis DELETE: {key}")
-            else:
-                if key in self.memory_store:
-                    del self.memory_store[key]
-                    print(f"✅ MEMORY DELETE: {key}")
-            
+            key = metadata_key(phone_number)
+
+            if await self._ready():
+                await self.client.delete(key)
+                log.debug("metadata.deleted", key=key, backend="redis")
+            elif self.memory_store.pop(key) is not None:
+                log.debug("metadata.deleted", key=key, backend="memory")
+
             return True
         except Exception as e:
-            print(f"❌ Error deleting metadata: {str(e)}")
+            log.exception("metadata.delete_failed", error=str(e))
             return False
 
+    async def store_many(self, items: Sequence[Tuple[str, Dict]], ttl: int = METADATA_TTL_SECONDS) -> List[bool]:
+        """Store a batch of (phone_number, metadata) in one pipelined round trip"""
+        try:
+            if await self._ready():
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for phone_number, metadata in items:
+                        pipe.setex(metadata_key(phone_number), ttl, json.dumps(metadata))
+                    results = await pipe.execute(raise_on_error=False)
+                log.debug("metadata.stored_many", count=len(items), backend="redis", ttl=ttl)
+                return [not isinstance(result, Exception) for result in results]
+
+            for phone_number, metadata in items:
+                self.memory_store.set(metadata_key(phone_number), metadata, ttl)
+            log.debug("metadata.stored_many", count=len(items), backend="memory")
+            return [True] * len(items)
+        except Exception as e:
+            log.exception("metadata.store_many_failed", count=len(items), error=str(e))
+            return [False] * len(items)
+
+    async def delete_many(self, phone_numbers: Sequence[str]) -> List[bool]:
+        """Delete a batch of phone numbers' metadata in one pipelined round trip"""
+        try:
+            keys = [metadata_key(phone_number) for phone_number in phone_numbers]
+            if await self._ready():
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.delete(key)
+                    results = await pipe.execute(raise_on_error=False)
+                log.debug("metadata.deleted_many", count=len(keys), backend="redis")
+                return [not isinstance(result, Exception) for result in results]
+
+            for key in keys:
+                self.memory_store.pop(key)
+            log.debug("metadata.deleted_many", count=len(keys), backend="memory")
+            return [True] * len(keys)
+        except Exception as e:
+            log.exception("metadata.delete_many_failed", count=len(phone_numbers), error=str(e))
+            return [False] * len(phone_numbers)
+
 
-redis_store = RedisMetadataStore()
+redis_store = AsyncRedisMetadataStore()
+metrics.gauge(
+    "metadata_memory_store_entries",
+    "Metadata entries held in memory while Redis is disabled or unreachable",
+    fn=lambda: len(redis_store.memory_store),
+)
+metrics.gauge(
+    "metadata_memory_store_bytes",
+    "Approximate size of the in-memory metadata fallback",
+    fn=lambda: redis_store.memory_store.memory_bytes,
+)
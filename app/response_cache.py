@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from .redis_utils import redis_store
+from .ttl_cache import TTLCache
+from .logging_utils import get_logger
+from .transcript_buffer import utterance_parts
+from . import metrics
+
+log = get_logger("response_cache")
+
+# Per-call values that are swapped for {placeholders} in cached answers
+TEMPLATE_FIELDS = (
+    "provider_name",
+    "organization_name",
+    "npi_number",
+    "tax_id",
+    "specialty",
+    "line_of_business",
+    "payer",
+)
+# Metadata that changes what the right answer is, so it is part of the key
+KEY_FIELDS = ("scenario_type", "payer")
+
+_NON_WORD = re.compile(r"[^a-z0-9{}_]+")
+# Shorter values (e.g. "MD") are too likely to turn up in unrelated text
+MIN_TEMPLATE_CHARS = 3
+# Four or more digits, however spaced or punctuated ("1 2 3 4", "12-3456789"):
+# an identifier that templating missed, so the answer belongs to this call only
+_DIGIT_RUN = re.compile(r"\d(?:[\s.\-/]*\d){3,}")
+
+
+def _template_values(variables: Dict[str, Any]) -> List[Tuple[str, str]]:
+    values = [
+        (field, str(variables[field]).strip())
+        for field in TEMPLATE_FIELDS
+        if len(str(variables.get(field) or "").strip()) >= MIN_TEMPLATE_CHARS
+    ]
+    # Longest first so "Example Health Group" wins over "Example Health"
+    return sorted(values, key=lambda item: len(item[1]), reverse=True)
+
+
+def to_template(text: str, variables: Dict[str, Any]) -> str:
+    """Replace this call's metadata values in `text` with {field} placeholders.
+
+    Only whole-word occurrences count: "ENT" is templated, "patient" is not.
+    """
+    for field, value in _template_values(variables):
+        pattern = r"(?<!\w)" + re.escape(value) + r"(?!\w)"
+        text = re.sub(pattern, "{" + field + "}", text, flags=re.IGNORECASE)
+    return text
+
+
+def fill_template(template: str, variables: Dict[str, Any]) -> Optional[str]:
+    """Fill {field} placeholders from this call's metadata; None if one is missing"""
+    if "{" not in template:
+        return template
+    for field in TEMPLATE_FIELDS:
+        placeholder = "{" + field + "}"
+        if placeholder in template:
+            value = variables.get(field)
+            if not value:
+                return None
+            template = template.replace(placeholder, str(value))
+    return template
+
+
+@dataclass
+class ResponseCachePolicy:
+    """Which turns may be answered from the response cache, and for how long"""
+
+    enabled: bool = False
+    max_entries: int = 2048
+    ttl_seconds: float = 6 * 3600
+    context_utterances: int = 2
+    max_words: int = 24
+    shared: bool = False
+
+    @classmethod
+    def from_env(cls) -> "ResponseCachePolicy":
+        return cls(
+            enabled=os.environ.get("LLM_RESPONSE_CACHE", "false").lower() == "true",
+            max_entries=int(os.environ.get("LLM_RESPONSE_CACHE_SIZE", cls.max_entries)),
+            ttl_seconds=float(os.environ.get("LLM_RESPONSE_CACHE_TTL", cls.ttl_seconds)),
+            context_utterances=int(os.environ.get("LLM_RESPONSE_CACHE_CONTEXT", cls.context_utterances)),
+            max_words=int(os.environ.get("LLM_RESPONSE_CACHE_MAX_WORDS", cls.max_words)),
+            shared=os.environ.get("LLM_RESPONSE_CACHE_REDIS", "false").lower() == "true",
+        )
+
+
+class ResponseCache:
+    """Process-wide LRU+TTL cache of agent answers to recurring rep/IVR utterances.
+
+    The key is the last few utterances, normalized and with this call's
+    metadata values templated out, plus KEY_FIELDS. Answers are stored as
+    templates and filled with the next call's values on a hit. With
+    `shared`, entries are also written to (and read from) Redis so every
+    worker benefits.
+    """
+
+    def __init__(self, policy: Optional[ResponseCachePolicy] = None, store=None):
+        self.policy = policy or ResponseCachePolicy.from_env()
+        self.store = store or redis_store
+        self._entries = TTLCache(maxsize=self.policy.max_entries, ttl=self.policy.ttl_seconds)
+        self._writes: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, transcript: Sequence[Any], variables: Dict[str, Any]) -> Optional[str]:
+        """Cache key for answering `transcript`, or None if the turn isn't cacheable"""
+        if not self.policy.enabled or not transcript:
+            return None
+        role, content = utterance_parts(transcript[-1])
+        if role != "user" or not content or len(content.split()) > self.policy.max_words:
+            return None
+
+        parts = [f"{field}={variables.get(field) or ''}" for field in KEY_FIELDS]
+        for raw in transcript[-self.policy.context_utterances:]:
+            role, content = utterance_parts(raw)
+            text = _NON_WORD.sub(" ", to_template(content, variables).lower()).strip()
+            parts.append(f"{role}:{text}")
+        return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+    async def get(self, key: str, variables: Dict[str, Any]) -> Optional[str]:
+        template = self._get_local(key)
+        if template is None and self.policy.shared:
+            template = await self._get_shared(key)
+        if template is None:
+            metrics.response_cache_misses.inc()
+            return None
+        text = fill_template(template, variables)
+        if text is None:
+            metrics.response_cache_misses.inc()
+            return None
+        metrics.response_cache_hits.inc()
+        return text
+
+    def put(self, key: str, text: str, variables: Dict[str, Any]):
+        text = text.strip()
+        if not text:
+            return
+        template = to_template(text, variables)
+        if _DIGIT_RUN.search(template):
+            log.debug("response_cache.not_cacheable", reason="digits")
+            return
+        self._put_local(key, template)
+        client = self.store.client if self.policy.shared else None
+        if client is not None:
+            task = asyncio.ensure_future(self._put_shared(client, key, template))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    def _get_local(self, key: str) -> Optional[str]:
+        return self._entries.get(key)
+
+    def _put_local(self, key: str, template: str):
+        self._entries.set(key, template)
+
+    async def _get_shared(self, key: str) -> Optional[str]:
+        client = self.store.client
+        if client is None:
+            return None
+        try:
+            value = await client.get(f"response_cache:{key}")
+        except Exception as e:
+            log.warning("response_cache.redis_get_failed", error=str(e))
+            return None
+        if value is None:
+            return None
+        template = json.loads(value)
+        self._put_local(key, template)
+        return template
+
+    async def _put_shared(self, client, key: str, template: str):
+        try:
+            await client.set(
+                f"response_cache:{key}", json.dumps(template), ex=int(self.policy.ttl_seconds)
+            )
+        except Exception as e:
+            log.warning("response_cache.redis_put_failed", error=str(e))
+
+
+response_cache = ResponseCache()
+metrics.gauge(
+    "llm_response_cache_entries",
+    "Answers held in this worker's response cache",
+    fn=lambda: len(response_cache),
+)
@@ -1,10 +1,12 @@
 import json
 import os
+import time
 import asyncio
-import traceback
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import Optional
 from concurrent.futures import TimeoutError as ConnectionTimeoutError
 from retell import Retell
 from .custom_types import (
@@ -12,18 +14,69 @@ from .custom_types import (
     ResponseRequiredRequest,
 )
 from .llm import LlmClient
-from .redis_utils import redis_store
+from .anthropic_pool import anthropic_pool
+from .redis_utils import METADATA_TTL_SECONDS, redis_store
+from .bulk_metadata import iter_entries, metadata_from_entry, validate_entry
+from .call_session import call_sessions
+from .call_state import call_state
+from .turn_manager import TurnManager
+from .speculation import Speculator
+from .hold_detector import HoldDetector, canned_response
+from .tool_executor import tool_executor
+from .frames import FrameCoalescer, encode_frame
+from .connection import ConnectionSupervisor
+from .event_decoding import decode_event
+from .logging_utils import get_logger, setup_logging, shutdown_logging
+from . import metrics
 
 if os.path.exists('.env'):
-    print("DEBUG: Found .env file, loading environment variables...")
     load_dotenv(override=True)
-else:
-    print("DEBUG: No .env file found (expected in Heroku production)")
+setup_logging()
+log = get_logger("server")
+log.info("env.loaded", dotenv=os.path.exists('.env'))
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await redis_store.connect()
+    await call_state.start(apply_call_event)
+    await anthropic_pool.start()
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    yield
+    lag_monitor.cancel()
+    tool_executor.close()
+    await anthropic_pool.close()
+    await call_state.close()
+    await redis_store.close()
+    shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
 retell = Retell(api_key=os.environ["RETELL_API_KEY"])
 
-call_phone_numbers = {}
+
+def apply_call_event(event):
+    """Apply a call event (from any worker) to this worker's live sessions"""
+    kind = event.get("type")
+    if kind == "invalidate_phones":
+        for phone_number in event["phone_numbers"]:
+            invalidated = call_sessions.invalidate_phone(phone_number)
+            if invalidated:
+                log.info("redis_store.invalidated", phone_number=phone_number, calls=invalidated)
+    elif kind == "call_ended":
+        session = call_sessions.get(event["call_id"])
+        if session is not None:
+            session.invalidate()
+            call_sessions.close(event["call_id"])
+
+
+BULK_BATCH_SIZE = int(os.environ.get("REDIS_BULK_BATCH", "500"))
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/redis-store")
@@ -31,9 +84,6 @@ async def redis_store_metadata(request: Request):
     """Store provider metadata in Redis before making the call"""
     try:
         data = await request.json()
-        print(f"\n{'='*70}")
-        print(f"🔴 REDIS STORE ENDPOINT CALLED")
-        print(f"{'='*70}")
         
         phone_number = data.get("phone_number")
         if not phone_number:
@@ -42,27 +92,19 @@ async def redis_store_metadata(request: Request):
                 content={"error": "phone_number is required"}
             )
         
-        metadata = {
-            "provider_name": data.get("provider_name", ""),
-            "npi_number": data.get("npi_number", ""),
-            "tax_id": data.get("tax_id", ""),
-            "specialty": data.get("specialty", ""),
-            "scenario_type": data.get("scenario_type", ""),
-            "line_of_business": data.get("line_of_business", ""),
-            "payer": data.get("payer", ""),
-            "organization_name": data.get("organization_name", ""),
-        }
+        metadata = metadata_from_entry(data)
         
-        print(f"Phone number: {phone_number}")
-        print(f"Storing {len(metadata)} metadata fields:")
-        for key, value in metadata.items():
-            if value:
-                print(f"  ✓ {key}: {value}")
+        log.info(
+            "redis_store.request",
+            phone_number=phone_number,
+            fields=[key for key, value in metadata.items() if value],
+        )
         
-        success = redis_store.store_metadata(phone_number, metadata)
+        success = await redis_store.store_metadata(phone_number, metadata)
         
         if success:
-            print(f"{'='*70}\n")
+            # The live call may be on another worker
+            await call_state.publish({"type": "invalidate_phones", "phone_numbers": [phone_number]})
             return JSONResponse(
                 status_code=200,
                 content={
@@ -78,41 +120,108 @@ async def redis_store_metadata(request: Request):
             )
     
     except Exception as err:
-        print(f"❌ ERROR in redis_store_metadata: {err}")
-        print(f"TRACEBACK: {traceback.format_exc()}")
+        log.exception("redis_store.error", error=str(err))
         return JSONResponse(
             status_code=500,
             content={"error": str(err)}
         )
 
 
+async def apply_bulk(request: Request, write, allow_strings: bool = False):
+    """Stream entries from a JSON array or NDJSON body, validate each and `write`
+    valid ones in batches of BULK_BATCH_SIZE. Reports success per entry.
+    """
+    results = []
+    batch = []
+
+    async def flush():
+        written = await write(batch)
+        for (index, phone_number, _), ok in zip(batch, written):
+            result = {"index": index, "phone_number": phone_number, "ok": ok}
+            if not ok:
+                result["error"] = "redis write failed"
+            results.append(result)
+        changed = [phone_number for (_, phone_number, _), ok in zip(batch, written) if ok]
+        if changed:
+            await call_state.publish({"type": "invalidate_phones", "phone_numbers": changed})
+        batch.clear()
+
+    index = 0
+    async for entry, error in iter_entries(request.stream()):
+        phone_number = None
+        if error is None:
+            phone_number, error = validate_entry(entry, allow_strings)
+        if error is not None:
+            results.append({"index": index, "phone_number": phone_number, "ok": False, "error": error})
+        else:
+            batch.append((index, phone_number, entry))
+            if len(batch) >= BULK_BATCH_SIZE:
+                await flush()
+        index += 1
+    if batch:
+        await flush()
+
+    results.sort(key=lambda result: result["index"])
+    succeeded = sum(1 for result in results if result["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+@app.post("/redis-store/bulk")
+async def redis_store_bulk(request: Request, ttl: Optional[int] = Query(None, gt=0)):
+    """Upsert metadata for many phone numbers: a JSON array or NDJSON of /redis-store bodies"""
+    ttl = METADATA_TTL_SECONDS if ttl is None else ttl
+
+    async def write(batch):
+        return await redis_store.store_many(
+            [(phone_number, metadata_from_entry(entry)) for _, phone_number, entry in batch], ttl
+        )
+
+    try:
+        summary = await apply_bulk(request, write)
+        log.info("redis_store.bulk", succeeded=summary["succeeded"], failed=summary["failed"], ttl=ttl)
+        return JSONResponse(status_code=200, content=summary)
+    except Exception as err:
+        log.exception("redis_store.bulk_error", error=str(err))
+        return JSONResponse(status_code=500, content={"error": str(err)})
+
+
+@app.post("/redis-store/bulk-delete")
+async def redis_delete_bulk(request: Request):
+    """Delete metadata for many phone numbers: phone number strings or {"phone_number": ...} objects"""
+
+    async def write(batch):
+        return await redis_store.delete_many([phone_number for _, phone_number, _ in batch])
+
+    try:
+        summary = await apply_bulk(request, write, allow_strings=True)
+        log.info("redis_store.bulk_delete", succeeded=summary["succeeded"], failed=summary["failed"])
+        return JSONResponse(status_code=200, content=summary)
+    except Exception as err:
+        log.exception("redis_store.bulk_delete_error", error=str(err))
+        return JSONResponse(status_code=500, content={"error": str(err)})
+
+
 @app.post("/webhook")
 async def handle_webhook(request: Request):
     try:
         post_data = await request.json()
-        print(f"DEBUG WEBHOOK: Received event: {post_data.get('event', 'unknown')}")
         
         event = post_data.get("event")
         call_data = post_data.get("call", {})
         call_id = call_data.get("call_id", "unknown")
+        log.info("webhook.received", webhook_event=event or "unknown", call_id=call_id)
         
-        if event == "call_started":
-            print(f"DEBUG WEBHOOK: Call started - {call_id}")
-        elif event == "call_ended":
-            print(f"DEBUG WEBHOOK: Call ended - {call_id}")
-            if call_id in call_phone_numbers:
-                phone_info = call_phone_numbers[call_id]
-                to_number = phone_info.get("to") if isinstance(phone_info, dict) else phone_info
-                if to_number:
-                    redis_store.delete_metadata(to_number)
-                del call_phone_numbers[call_id]
-        elif event == "call_analyzed":
-            print(f"DEBUG WEBHOOK: Call analyzed - {call_id}")
+        if event == "call_ended":
+            # Whichever worker served the websocket, its numbers are in call_state
+            phone_info = await call_state.pop(call_id)
+            to_number = phone_info.get("to") if phone_info else None
+            if to_number:
+                await redis_store.delete_metadata(to_number)
+            await call_state.publish({"type": "call_ended", "call_id": call_id})
         
         return JSONResponse(status_code=200, content={"received": True})
     except Exception as err:
-        print(f"ERROR in webhook: {err}")
-        print(f"TRACEBACK: {traceback.format_exc()}")
+        log.exception("webhook.error", error=str(err))
         return JSONResponse(
             status_code=500, content={"message": "Internal Server Error"}
         )
@@ -120,10 +229,24 @@ async def handle_webhook(request: Request):
 
 @app.websocket("/llm-websocket/{call_id}")
 async def websocket_handler(websocket: WebSocket, call_id: str):
+    session = None
+    turns = None
+    speculator = None
+    llm_client = None
+    supervisor = None
+    connected = False
     try:
         await websocket.accept()
-        print(f"DEBUG WEBSOCKET: Connected - {call_id}")
+        connected = True
+        metrics.ws_active.inc()
+        log.info("ws.connected", call_id=call_id)
         llm_client = LlmClient()
+        session = call_sessions.open(call_id)
+        turns = TurnManager(call_id)
+        speculator = Speculator(llm_client)
+        hold = HoldDetector(call_id)
+        supervisor = ConnectionSupervisor(call_id, websocket.send_text, is_current=turns.is_current)
+        frames = FrameCoalescer(supervisor.send)
 
         config = ConfigResponse(
             response_type="config",
@@ -132,120 +255,134 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
                 "call_details": True,
             },
         )
-        await websocket.send_json(config.__dict__)
-        print(f"DEBUG WEBSOCKET: Sent config - {call_id}")
+        await supervisor.send(encode_frame(config.__dict__))
 
-        response_id = 0
         first_event = llm_client.draft_begin_message()
-        await websocket.send_json(first_event.__dict__)
-        print(f"DEBUG WEBSOCKET: Sent begin message - {call_id}")
+        await supervisor.send(encode_frame(first_event.__dict__))
+        log.debug("ws.begin_sent", call_id=call_id)
 
-        async def handle_message(request_json):
-            nonlocal response_id
-
-            interaction_type = request_json.get("interaction_type", "unknown")
-            print(f"DEBUG WEBSOCKET: Received {interaction_type} - {call_id}")
+        async def handle_message(event, received_at):
+            interaction_type = event.interaction_type
+            # Per-type event names so LOG_SAMPLE can thin out update_only
+            log.debug(f"ws.{interaction_type}", call_id=call_id)
             
             if interaction_type == "call_details":
-                print(f"\n{'='*70}")
-                print(f"🔍 CALL_DETAILS EVENT RECEIVED")
-                print(f"{'='*70}")
-                
-                call_obj = request_json.get("call", {})
+                call_obj = event.call
                 from_number = call_obj.get("from_number", None)
                 to_number = call_obj.get("to_number", None)
                 
-                print(f"From Number (Agent 1): {from_number}")
-                print(f"To Number (Your Phone): {to_number}")
-                
-                if from_number:
-                    call_phone_numbers[call_id] = {"from": from_number, "to": to_number}
+                call_sessions.bind_phone(session, from_number, to_number)
+                await call_state.bind(call_id, from_number, to_number)
                 
                 dynamic_variables = {}
                 if to_number:
-                    print(f"\n🔴 REDIS LOOKUP: Attempting to retrieve metadata by phone number")
-                    redis_metadata = redis_store.retrieve_metadata(to_number)
-                    if redis_metadata:
-                        dynamic_variables = redis_metadata
-                        print(f"✅ Successfully retrieved {len(dynamic_variables)} fields from Redis")
-                    else:
-                        print(f"⚠️  No metadata found in Redis for {to_number}")
-                
-                if dynamic_variables:
-                    for key, value in dynamic_variables.items():
-                        if key and value:
-                            print(f"  ✓ {key}: {value}")
-                else:
-                    print(f"⚠️  No dynamic variables available for this call")
-                
-                print(f"{'='*70}\n")
-                return
-            
-            if interaction_type == "ping_pong":
-                print(f"DEBUG WEBSOCKET: Responding to ping_pong")
-                await websocket.send_json(
-                    {
-                        "response_type": "ping_pong",
-                        "timestamp": request_json["timestamp"],
-                    }
+                    dynamic_variables = await session.get_metadata(redis_store)
+                log.info(
+                    "ws.call_details",
+                    call_id=call_id,
+                    from_number=from_number,
+                    to_number=to_number,
+                    metadata_fields=[key for key, value in dynamic_variables.items() if key and value],
                 )
+                if not dynamic_variables:
+                    log.warning("ws.no_metadata", call_id=call_id, to_number=to_number)
                 return
             
             if interaction_type == "update_only":
-                print(f"DEBUG WEBSOCKET: Ignoring update_only")
+                # Fold new utterances into the call's message buffer ahead of the next turn
+                transcript = event.transcript
+                llm_client.transcript.update(transcript)
+                if speculator.enabled and not hold.on_hold:
+                    speculator.on_update(
+                        transcript,
+                        event.turntaking,
+                        await session.get_metadata(redis_store),
+                    )
                 return
             
             if (
                 interaction_type == "response_required"
                 or interaction_type == "reminder_required"
             ):
-                response_id = request_json["response_id"]
-                
-                stored_variables = {}
+                response_id = event.response_id
+                # Cancel the superseded response (and its upstream stream) right away
+                if not turns.supersede(response_id):
+                    return
                 
-                if call_id in call_phone_numbers:
-                    phone_info = call_phone_numbers[call_id]
-                    to_number = phone_info.get("to") if isinstance(phone_info, dict) else phone_info
-                    if to_number:
-                        stored_variables = redis_store.retrieve_metadata(to_number) or {}
+                stored_variables = await session.get_metadata(redis_store)
                 
-                if not stored_variables and "retell_llm_dynamic_variables" in request_json:
-                    stored_variables = request_json.get("retell_llm_dynamic_variables", {})
+                if not stored_variables:
+                    stored_variables = event.retell_llm_dynamic_variables or {}
                 
-                print(f"\n📝 RESPONSE REQUIRED")
-                print(f"Response ID: {response_id}")
-                print(f"Using {len(stored_variables)} dynamic variables")
-                if stored_variables:
-                    for key in stored_variables.keys():
-                        if key and stored_variables[key]:
-                            print(f"  ✓ {key}")
+                log.debug(
+                    "ws.response_required",
+                    call_id=call_id,
+                    response_id=response_id,
+                    interaction_type=interaction_type,
+                    variables=len(stored_variables),
+                )
                 
-                request = ResponseRequiredRequest(
+                # The transcript is validated incrementally by the LlmClient's
+                # TranscriptBuffer, so skip re-validating every utterance here.
+                request = ResponseRequiredRequest.model_construct(
                     interaction_type=interaction_type,
                     response_id=response_id,
-                    transcript=request_json["transcript"],
+                    transcript=event.transcript,
                     retell_llm_dynamic_variables=stored_variables,
                 )
-                print(
-                    f"DEBUG WEBSOCKET: response_id={response_id}, interaction_type={interaction_type}"
-                )
-                print(f"DEBUG WEBSOCKET: retell_llm_dynamic_variables keys = {list(request.retell_llm_dynamic_variables.keys())}")
 
-                async for event in llm_client.draft_response(request):
-                    await websocket.send_json(event.__dict__)
-                    if request.response_id < response_id:
-                        break
+                # On hold: canned reply or silence, no upstream request
+                held_reply = hold.check(request.transcript, interaction_type)
+                draft = None
+                if held_reply is None:
+                    draft = speculator.claim(request.transcript, interaction_type, stored_variables)
+                else:
+                    # A draft started for this turn would only keep streaming upstream
+                    speculator.discard()
+                if held_reply is not None:
+                    events = canned_response(response_id, held_reply)
+                elif draft is not None:
+                    log.debug("ws.speculation_hit", call_id=call_id, response_id=response_id)
+                    events = draft.replay(response_id)
+                else:
+                    events = llm_client.draft_response(request, received_at)
 
-        async for data in websocket.iter_json():
-            asyncio.create_task(handle_message(data))
+                stream_response = frames.stream(events, response_id, turns.is_current, received_at)
+                if turns.start(response_id, stream_response) is None and draft is not None:
+                    draft.cancel()
+
+        async for raw in websocket.iter_text():
+            metrics.ws_messages_received.inc()
+            received_at = time.perf_counter()
+            event = decode_event(raw)
+            if event is None:
+                continue
+            if event.interaction_type == "ping_pong":
+                # Answered inline, ahead of any queued response frames
+                supervisor.send_control(
+                    encode_frame({"response_type": "ping_pong", "timestamp": event.timestamp}),
+                    received_at,
+                )
+                continue
+            await supervisor.submit(handle_message(event, received_at))
 
     except WebSocketDisconnect:
-        print(f"DEBUG WEBSOCKET: Disconnected - {call_id}")
+        log.info("ws.disconnected", call_id=call_id)
     except ConnectionTimeoutError as e:
-        print(f"DEBUG WEBSOCKET: Timeout error - {call_id}: {e}")
+        log.warning("ws.timeout", call_id=call_id, error=str(e))
     except Exception as e:
-        print(f"ERROR in LLM WebSocket: {e} for {call_id}")
-        print(f"TRACEBACK: {traceback.format_exc()}")
+        log.exception("ws.error", call_id=call_id, error=str(e))
         await websocket.close(1011, "Server error")
     finally:
-        print(f"DEBUG WEBSOCKET: Connection closed - {call_id}")
+        if connected:
+            metrics.ws_active.dec()
+        if supervisor is not None:
+            await supervisor.close()
+        if turns is not None:
+            await turns.close()
+        if speculator is not None:
+            speculator.close()
+        if llm_client is not None:
+            await llm_client.close()
+        call_sessions.close(call_id, session)
+        log.debug("ws.closed", call_id=call_id)
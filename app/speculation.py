@@ -0,0 +1,154 @@
+import os
+import re
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .custom_types import ResponseRequiredRequest, ResponseChunk
+from .context_policy import estimate_tokens
+from .transcript_buffer import utterance_parts
+from . import metrics
+
+_SENTENCE_END = re.compile(r"[.?!]\s*$")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def transcript_key(transcript: Sequence[Any]) -> Optional[Tuple[int, str]]:
+    """What a draft was written for: transcript length and the normalized last user turn"""
+    if not transcript:
+        return None
+    role, content = utterance_parts(transcript[-1])
+    if role != "user":
+        return None
+    return len(transcript), _NON_WORD.sub(" ", content.lower()).strip()
+
+
+class SpeculativeDraft:
+    """A response drafted from update_only before Retell asks for it"""
+
+    def __init__(self, llm_client, transcript: List[Any], variables: Dict[str, Any]):
+        self.key = transcript_key(transcript)
+        self.variables = variables
+        self.events: List[Any] = []
+        self.tokens = 0
+        self.done = False
+        self.claimed = False
+        self.route = None
+        self._router = llm_client.router
+        self._changed = asyncio.Event()
+        request = ResponseRequiredRequest.model_construct(
+            interaction_type="response_required",
+            response_id=-1,
+            transcript=transcript,
+            retell_llm_dynamic_variables=variables,
+        )
+        self._task = asyncio.create_task(self._run(llm_client, request))
+
+    async def _run(self, llm_client, request):
+        try:
+            async for event in llm_client.draft_response(request, on_route=self._on_route):
+                self.tokens += estimate_tokens(event.content)
+                self.events.append(event)
+                self._changed.set()
+        finally:
+            self.done = True
+            self._changed.set()
+
+    def _on_route(self, route):
+        self.route = route
+        if self.claimed:
+            self._router.count(route)
+
+    def claim(self):
+        """The draft answers a live turn: its route now counts"""
+        self.claimed = True
+        if self.route is not None:
+            self._router.count(self.route)
+
+    async def replay(self, response_id: int):
+        """Stream the draft as the response for `response_id`, buffered part first"""
+        sent = 0
+        try:
+            while True:
+                while sent < len(self.events):
+                    event = self.events[sent]
+                    sent += 1
+                    yield ResponseChunk(
+                        response_id=response_id,
+                        content=event.content,
+                        content_complete=event.content_complete,
+                        end_call=event.end_call,
+                    )
+                if self.done:
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            if not self.done:
+                self.cancel()
+
+    def cancel(self):
+        if not self._task.done():
+            self._task.cancel()
+
+
+class Speculator:
+    """Per-call speculative drafting on update_only events.
+
+    A draft starts once the live transcript looks stable (the user's turn has
+    ended, or their last utterance ends a sentence). A response_required whose
+    transcript matches the draft reuses it; anything else discards it.
+    """
+
+    enabled = os.environ.get("LLM_SPECULATION", "false").lower() == "true"
+
+    def __init__(self, llm_client, enabled: Optional[bool] = None):
+        self.llm_client = llm_client
+        if enabled is not None:
+            self.enabled = enabled
+        self.draft: Optional[SpeculativeDraft] = None
+
+    def on_update(self, transcript: List[Any], turntaking: Optional[str], variables: Dict[str, Any]):
+        if not self.enabled:
+            return
+        key = transcript_key(transcript)
+        if self.draft is not None and self.draft.key == key and self.draft.variables == variables:
+            return
+        self.discard()
+        if key is None or not key[1]:
+            return
+        _, content = utterance_parts(transcript[-1])
+        if turntaking == "agent_turn" or _SENTENCE_END.search(content):
+            self.draft = SpeculativeDraft(self.llm_client, list(transcript), variables)
+            metrics.speculation_started.inc()
+
+    def claim(self, transcript: Sequence[Any], interaction_type: str, variables: Dict[str, Any]) -> Optional[SpeculativeDraft]:
+        """Hand over the draft if it was written for this exact turn, else discard it"""
+        draft = self.draft
+        if draft is None:
+            return None
+        self.draft = None
+        if (
+            interaction_type == "response_required"
+            and draft.key == transcript_key(transcript)
+            and draft.variables == variables
+        ):
+            metrics.speculation_hits.inc()
+            draft.claim()
+            return draft
+        self._waste(draft)
+        return None
+
+    def discard(self):
+        draft = self.draft
+        self.draft = None
+        if draft is not None:
+            self._waste(draft)
+
+    def _waste(self, draft: SpeculativeDraft):
+        draft.cancel()
+        metrics.speculation_misses.inc()
+        metrics.speculation_wasted_output_tokens.inc(draft.tokens)
+
+    def close(self):
+        if self.draft is not None:
+            self.draft.cancel()
+            self.draft = None
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+from .logging_utils import get_logger
+from .ttl_cache import TTLCache
+from . import metrics
+
+log = get_logger("tools")
+
+KINDS = ("async", "thread", "process")
+_MISSING = object()
+
+
+@dataclass
+class Tool:
+    """A function the model can call.
+
+    kind: async   - coroutine function, awaited on the event loop
+          thread  - blocking function, run in the bounded thread pool
+          process - CPU-bound, picklable function, run in the process pool
+    cache_ttl > 0 marks the tool idempotent: results are memoized per arguments.
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    kind: str = "async"
+    timeout: float = 5.0
+    cache_ttl: float = 0.0
+
+
+class ToolExecutor:
+    """Runs tool calls off the hot path: blocking tools never touch the event loop"""
+
+    def __init__(self, threads: int = 8, processes: int = 2, cache_size: int = 1024, timeout: float = 5.0):
+        self.threads = threads
+        self.processes = processes
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.tools: Dict[str, Tool] = {}
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._results = TTLCache(maxsize=cache_size)
+        # Identical idempotent calls already running share one execution
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._metrics: Dict[str, Tuple[metrics.Histogram, metrics.Counter, metrics.Counter]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ToolExecutor":
+        return cls(
+            threads=int(os.environ.get("TOOL_THREADS", 8)),
+            processes=int(os.environ.get("TOOL_PROCESSES", 2)),
+            cache_size=int(os.environ.get("TOOL_CACHE_SIZE", 1024)),
+            timeout=float(os.environ.get("LLM_TOOL_TIMEOUT", 5.0)),
+        )
+
+    def register(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        kind: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cache_ttl: float = 0.0,
+    ) -> Tool:
+        if kind is None:
+            kind = "async" if asyncio.iscoroutinefunction(fn) else "thread"
+        if kind not in KINDS:
+            raise ValueError(f"Unknown tool kind: {kind}")
+        tool = Tool(name, fn, kind, timeout or self.timeout, cache_ttl)
+        self.tools[name] = tool
+        if name not in self._metrics:
+            self._metrics[name] = (
+                metrics.histogram(f"tool_{name}_duration_seconds", f"Time to run the {name} tool"),
+                metrics.counter(f"tool_{name}_timeouts_total", f"{name} calls that hit their timeout"),
+                metrics.counter(f"tool_{name}_errors_total", f"{name} calls that raised"),
+            )
+        return tool
+
+    def tool(self, name: Optional[str] = None, **options):
+        """Decorator form of register()"""
+
+        def decorator(fn):
+            self.register(name or fn.__name__, fn, **options)
+            return fn
+
+        return decorator
+
+    async def run(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Run a registered tool with keyword `arguments`.
+
+        Raises KeyError for an unknown tool and asyncio.TimeoutError past its
+        timeout. A timed-out thread/process call can't be interrupted; it
+        finishes in the pool and its result is dropped.
+        """
+        tool = self.tools[name]
+        if tool.cache_ttl <= 0:
+            return await self._timed(tool, arguments)
+
+        key = (name, json.dumps(arguments, sort_keys=True, default=str))
+        cached = self._results.get(key, _MISSING)
+        if cached is not _MISSING:
+            metrics.tool_cache_hits.inc()
+            return cached
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._timed(tool, arguments))
+            self._inflight[key] = future
+            future.add_done_callback(functools.partial(self._store, tool, key))
+        # Shielded: one caller giving up must not cancel the shared call
+        return await asyncio.shield(future)
+
+    def _store(self, tool: Tool, key: Tuple[str, str], future: asyncio.Future):
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._results.set(key, future.result(), tool.cache_ttl)
+
+    async def _timed(self, tool: Tool, arguments: Dict[str, Any]) -> Any:
+        duration, timeouts, errors = self._metrics[tool.name]
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self._call(tool, arguments), tool.timeout)
+        except asyncio.TimeoutError:
+            timeouts.inc()
+            raise
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+
+    def _call(self, tool: Tool, arguments: Dict[str, Any]):
+        if tool.kind == "async":
+            return tool.fn(**arguments)
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._pool(tool.kind), functools.partial(tool.fn, **arguments))
+
+    def _pool(self, kind: str) -> Executor:
+        if kind == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="tool")
+        return self._thread_pool
+
+    def close(self):
+        for future in self._inflight.values():
+            future.cancel()
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+
+tool_executor = ToolExecutor.from_env()
@@ -0,0 +1,92 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from .custom_types import Utterance
+
+Message = Dict[str, Any]
+
+
+def utterance_parts(raw: Any) -> Tuple[str, str]:
+    """(role, content) of a transcript entry, whether a dict or an Utterance"""
+    if isinstance(raw, dict):
+        return raw.get("role", ""), raw.get("content", "")
+    return raw.role, raw.content
+
+
+def append_utterance(messages: List[Message], role: str, content: str):
+    """One message per utterance: agent -> assistant, everyone else -> user"""
+    if role == "agent":
+        messages.append({"role": "assistant", "content": content})
+    else:
+        messages.append({"role": "user", "content": content})
+
+
+class TranscriptBuffer:
+    """Incrementally maintained message list for one call's transcript.
+
+    Retell resends the whole transcript on every event, but only the tail
+    ever changes. update() compares the last `tail_window` known utterances,
+    rolls back to the first one that differs and converts only what is new,
+    so each turn costs O(new utterances) instead of O(transcript).
+
+    `append` turns one utterance into messages; it may append a message or
+    replace the last one (to merge consecutive turns) but must never mutate a
+    message dict in place, because the list is handed out to requests.
+    """
+
+    def __init__(
+        self,
+        append: Callable[[List[Message], str, str], None] = append_utterance,
+        initial_messages: Optional[Sequence[Message]] = None,
+        tail_window: int = 2,
+    ):
+        self._append = append
+        self._initial = list(initial_messages or [])
+        self.tail_window = tail_window
+        self.messages: List[Message] = list(self._initial)
+        self._utterances: List[Tuple[str, str]] = []
+        # Message-list state after each utterance, so we can roll back to it:
+        # (len(messages), messages[-1] or None)
+        self._checkpoints: List[Tuple[int, Optional[Message]]] = []
+
+    def __len__(self) -> int:
+        return len(self._utterances)
+
+    def update(self, transcript: Sequence[Any]) -> List[Message]:
+        """Sync with the latest full transcript and return the message list"""
+        known = len(self._utterances)
+        shared = min(known, len(transcript))
+        first_changed = shared
+        for index in range(max(0, shared - self.tail_window), shared):
+            if utterance_parts(transcript[index]) != self._utterances[index]:
+                first_changed = index
+                break
+
+        if first_changed < known:
+            self._rollback(first_changed)
+
+        for raw in transcript[first_changed:]:
+            utterance = raw if isinstance(raw, Utterance) else Utterance.model_validate(raw)
+            self._append(self.messages, utterance.role, utterance.content)
+            self._utterances.append((utterance.role, utterance.content))
+            self._checkpoints.append(
+                (len(self.messages), self.messages[-1] if self.messages else None)
+            )
+        return self.messages
+
+    def reset(self):
+        self.messages = list(self._initial)
+        self._utterances.clear()
+        self._checkpoints.clear()
+
+    def _rollback(self, count: int):
+        """Restore the message list to its state after the first `count` utterances"""
+        del self._utterances[count:]
+        del self._checkpoints[count:]
+        if count == 0:
+            self.messages = list(self._initial)
+            return
+        length, last = self._checkpoints[-1]
+        # Copy instead of truncating in place: earlier requests may still hold the list.
+        messages = self.messages[:length]
+        if last is not None:
+            messages[-1] = last
+        self.messages = messages
@@ -0,0 +1,115 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+_MISSING = object()
+
+
+def approx_size(value: Any) -> int:
+    """Rough deep size in bytes of JSON-like values (dicts, lists, strings, numbers)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+
+class TTLCache:
+    """Bounded in-process key/value store with per-key TTL and LRU eviction.
+
+    Expired entries are dropped when read, and by a full sweep at most every
+    `sweep_interval` seconds, run by the next write (or by calling sweep()).
+    Memory use is tracked incrementally with approx_size().
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 3600.0,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        # key -> (expires_at, value, size); order is least- to most-recently used
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._next_sweep = clock() + sweep_interval
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[Hashable]:
+        now = self._clock()
+        return iter([key for key, entry in self._entries.items() if entry[0] > now])
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        now = self._clock()
+        if now >= self._next_sweep:
+            self.sweep()
+        if key in self._entries:
+            self._remove(key)
+        size = approx_size(key) + approx_size(value)
+        self._entries[key] = (now + (self.ttl if ttl is None else ttl), value, size)
+        self._bytes += size
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._remove(key)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def sweep(self) -> int:
+        """Drop every expired entry; returns how many were dropped"""
+        now = self._clock()
+        self._next_sweep = now + self.sweep_interval
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
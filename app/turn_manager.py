@@ -0,0 +1,66 @@
+import asyncio
+import time
+from typing import Coroutine, Optional
+from . import metrics
+from .logging_utils import get_logger
+
+log = get_logger("turns")
+
+
+class TurnManager:
+    """Owns the in-flight response task for one call; a newer turn cancels the older one"""
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.response_id = -1
+        self._task: Optional[asyncio.Task] = None
+
+    def is_current(self, response_id: int) -> bool:
+        return response_id >= self.response_id
+
+    def supersede(self, response_id: int) -> bool:
+        """Record a newer response_id and cancel any older in-flight response.
+
+        Returns False if `response_id` is itself already stale.
+        """
+        if response_id < self.response_id:
+            return False
+        self.response_id = response_id
+        self.cancel()
+        return True
+
+    def start(self, response_id: int, coro: Coroutine) -> Optional[asyncio.Task]:
+        """Run `coro` as the response for `response_id`, replacing any older one"""
+        if not self.supersede(response_id):
+            coro.close()
+            return None
+        task = asyncio.create_task(coro)
+        task.add_done_callback(self._on_done)
+        self._task = task
+        return task
+
+    def cancel(self):
+        task = self._task
+        self._task = None
+        if task is None or task.done():
+            return
+        cancelled_at = time.perf_counter()
+        task.add_done_callback(
+            lambda _: metrics.turn_cancel_latency.observe(time.perf_counter() - cancelled_at)
+        )
+        task.cancel()
+        metrics.turns_cancelled.inc()
+
+    async def close(self):
+        """Cancel the in-flight response and wait for it to tear down"""
+        task = self._task
+        self.cancel()
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def _on_done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            log.error("turn.failed", exc_info=exc, call_id=self.call_id)
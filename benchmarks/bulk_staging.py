@@ -0,0 +1,66 @@
+"""Staging metadata for a campaign: one /redis-store request per number vs /redis-store/bulk.
+
+Runs one app worker against a local fake Redis with a per-command latency
+(a network round trip to the Redis host), stages `--records` numbers through
+the bulk endpoint as NDJSON, and times `--sequential` single-number requests
+for comparison (extrapolated to the full record count).
+
+    python -m benchmarks.bulk_staging --records 10000 --latency-ms 1
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.load_test import METADATA, _free_port, start_worker
+
+
+def records(count: int, offset: int = 0):
+    for n in range(offset, offset + count):
+        yield {**METADATA, "phone_number": f"+1555{n:07d}"}
+
+
+async def main(http_url: str, args) -> None:
+    async with httpx.AsyncClient(timeout=600) as client:
+        start = time.perf_counter()
+        for record in records(args.sequential, offset=args.records):
+            await client.post(f"{http_url}/redis-store", json=record)
+        sequential = time.perf_counter() - start
+
+        async def ndjson():
+            for record in records(args.records):
+                yield (json.dumps(record) + "\n").encode()
+
+        start = time.perf_counter()
+        response = await client.post(
+            f"{http_url}/redis-store/bulk", content=ndjson(), headers={"content-type": "application/x-ndjson"}
+        )
+        bulk = time.perf_counter() - start
+        summary = response.json()
+
+    per_record = sequential / max(args.sequential, 1)
+    print(f"sequential /redis-store: {args.sequential} records in {sequential:.2f}s "
+          f"({per_record * 1000:.2f} ms each, ~{per_record * args.records:.1f}s for {args.records})")
+    print(f"bulk NDJSON:             {args.records} records in {bulk:.2f}s "
+          f"({summary['succeeded']} stored, {summary['failed']} failed)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--sequential", type=int, default=500, help="single-number requests to time")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="fake Redis per-command latency")
+    args = parser.parse_args()
+
+    redis = FakeRedisServer(latency_ms=args.latency_ms).start()
+    port = _free_port()
+    worker = start_worker(port, "http://127.0.0.1:9", REDIS_ENABLED="true", REDIS_URL=redis.url)
+    try:
+        asyncio.run(main(f"http://127.0.0.1:{port}", args))
+    finally:
+        worker.terminate()
+        worker.wait(timeout=10)
+        redis.stop()
@@ -0,0 +1,60 @@
+"""Inbound frame decoding cost per event vs transcript size.
+
+For each transcript size, times decoding one frame of each kind with:
+  stdlib    - json.loads of the whole frame, then dict dispatch (the old path)
+  validated - the precompiled discriminated-union validator (validate_json)
+  decoder   - app.event_decoding.decode_event (peek, then the cheapest path)
+
+    python -m benchmarks.event_decoding --sizes 0,10,50,100,250,500
+"""
+import argparse
+import json
+import timeit
+
+from app.event_decoding import decode_event, request_adapter
+
+
+def _transcript(count: int):
+    words = " ".join(f"word{n}" for n in range(12))
+    return [{"role": "agent" if i % 2 else "user", "content": f"{i} {words}"} for i in range(count)]
+
+
+def frames(size: int):
+    transcript = _transcript(size)
+    return {
+        "ping_pong": json.dumps({"interaction_type": "ping_pong", "timestamp": 1712345678901}),
+        "update_only": json.dumps({"interaction_type": "update_only", "transcript": transcript, "turntaking": "user_turn"}),
+        "response_required": json.dumps(
+            {"interaction_type": "response_required", "response_id": size, "transcript": transcript}
+        ),
+        # Event types we don't handle still carry the transcript
+        "ignored": json.dumps({"interaction_type": "agent_interrupt", "transcript": transcript}),
+    }
+
+
+def stdlib(raw: str):
+    data = json.loads(raw)
+    return data.get("interaction_type")
+
+
+def validated(raw: str):
+    try:
+        return request_adapter.validate_json(raw)
+    except ValueError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="0,10,50,100,250,500", help="transcript lengths (utterances)")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'utterances':>10} {'event':<18} {'bytes':>8} {'stdlib':>10} {'validated':>10} {'decoder':>10}  (us/event)")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for kind, raw in frames(size).items():
+            timings = [
+                timeit.timeit(lambda: fn(raw), number=args.number) / args.number * 1e6
+                for fn in (stdlib, validated, decode_event)
+            ]
+            print(f"{size:>10} {kind:<18} {len(raw):>8} " + " ".join(f"{t:>10.1f}" for t in timings))
@@ -0,0 +1,250 @@
+"""Minimal local stand-in for the Anthropic Messages API.
+
+Serves `POST /v1/messages` over HTTP/1.1 keep-alive: streamed requests get the
+usual SSE event sequence with a configurable time-to-first-token and
+inter-token delay, non-streamed requests (e.g. context summaries) a single
+JSON message. With `max_concurrent`, streamed requests past that many open
+streams get a 429 with a retry-after header, like a rate-limited API tier. Like FakeRedisServer it runs on its own thread and event loop.
+
+    python -m benchmarks.fake_anthropic --port 8089 --ttft-ms 300 --token-ms 25
+
+then point the app at it with ANTHROPIC_BASE_URL=http://127.0.0.1:8089.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from typing import List, Optional
+
+DEFAULT_REPLY = (
+    "Thanks for checking. I'm calling to confirm whether the panel is open "
+    "for new providers, and if so what the next steps are."
+)
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _chunk(data: bytes) -> bytes:
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+class FakeAnthropicServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        ttft_ms: float = 300.0,
+        token_ms: float = 25.0,
+        reply: str = DEFAULT_REPLY,
+        slow_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        max_concurrent: int = 0,
+        retry_after: float = 1.0,
+    ):
+        self.host = host
+        self.port = port
+        self.ttft = ttft_ms / 1000.0
+        self.token_delay = token_ms / 1000.0
+        # A `slow_rate` fraction of streamed requests waits `slow_ms` for its
+        # first token instead, to mimic upstream tail latency.
+        self.slow_rate = slow_rate
+        self.slow = slow_ms / 1000.0
+        self.tokens: List[str] = [word + " " for word in reply.split()]
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.open_streams = 0
+        self.rate_limited = 0
+        self.requests = 0
+        self.cancelled = 0
+        self.last_payload: Optional[dict] = None
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeAnthropicServer":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            # Drop connections still waiting out a (slow) first token.
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method == "POST" and path.split("?")[0].endswith("/v1/messages"):
+                    self.requests += 1
+                    payload = json.loads(body or b"{}")
+                    self.last_payload = payload
+                    if payload.get("stream") and self.max_concurrent and self.open_streams >= self.max_concurrent:
+                        await self._rate_limit(writer)
+                    elif payload.get("stream"):
+                        await self._stream(writer, payload)
+                    else:
+                        await self._complete(writer, payload)
+                else:
+                    # HEAD/GET from connection pre-warming
+                    writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 0\r\n\r\n")
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _message(self, payload: dict, content: list, output_tokens: int) -> dict:
+        return {
+            "id": f"msg_fake_{next(self._ids)}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "fake"),
+            "content": content,
+            "stop_reason": "end_turn" if content else None,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": len(json.dumps(payload.get("messages", []))) // 4,
+                "output_tokens": output_tokens,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
+            },
+        }
+
+    async def _complete(self, writer: asyncio.StreamWriter, payload: dict):
+        await asyncio.sleep(self.ttft + self.token_delay * len(self.tokens))
+        body = json.dumps(
+            self._message(payload, [{"type": "text", "text": "".join(self.tokens).strip()}], len(self.tokens))
+        ).encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\ncontent-length: %d\r\n\r\n%s"
+            % (len(body), body)
+        )
+        await writer.drain()
+
+    async def _rate_limit(self, writer: asyncio.StreamWriter):
+        self.rate_limited += 1
+        body = json.dumps({
+            "type": "error",
+            "error": {"type": "rate_limit_error", "message": "Number of concurrent connections exceeded"},
+        }).encode()
+        writer.write(
+            b"HTTP/1.1 429 Too Many Requests\r\ncontent-type: application/json\r\n"
+            b"retry-after: %s\r\ncontent-length: %d\r\n\r\n%s"
+            % (str(self.retry_after).encode(), len(body), body)
+        )
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, payload: dict):
+        self.open_streams += 1
+        try:
+            await self._stream_events(writer, payload)
+        finally:
+            self.open_streams -= 1
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, payload: dict):
+        limit = int(payload.get("max_tokens", len(self.tokens)))
+        tokens = self.tokens[:limit]
+        writer.write(
+            b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\n"
+            b"cache-control: no-cache\r\ntransfer-encoding: chunked\r\n\r\n"
+        )
+        try:
+            slow = self.slow_rate and random.random() < self.slow_rate
+            await asyncio.sleep(self.slow if slow else self.ttft)
+            writer.write(_chunk(
+                _sse("message_start", {"type": "message_start", "message": self._message(payload, [], 1)})
+                + _sse("content_block_start", {
+                    "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+                })
+            ))
+            for index, token in enumerate(tokens):
+                if index:
+                    await asyncio.sleep(self.token_delay)
+                writer.write(_chunk(_sse("content_block_delta", {
+                    "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token},
+                })))
+                await writer.drain()
+            writer.write(_chunk(
+                _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+                + _sse("message_delta", {
+                    "type": "message_delta",
+                    "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": len(tokens)},
+                })
+                + _sse("message_stop", {"type": "message_stop"})
+            ))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            # The client closed the stream (superseded turn)
+            self.cancelled += 1
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=25.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(
+        args.host, args.port, args.ttft_ms, args.token_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms
+    ).start()
+    print(f"Fake Anthropic API listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,239 @@
+"""Minimal in-process RESP server used as a local Redis stand-in.
+
+Supports the handful of commands the app uses (strings with TTL, hashes,
+MULTI/EXEC pipelines, PUBLISH/SUBSCRIBE) and can inject a fixed latency per
+round trip to mimic the network. It runs on its own thread and event loop so
+that a blocking client on the main loop really does stall while it waits.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class FakeRedisServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000.0
+        self.data: Dict[str, Tuple[object, Optional[float]]] = {}
+        # channel -> subscribed connections (writer, speaks RESP3)
+        self.channels: Dict[str, Set[Tuple[asyncio.StreamWriter, bool]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    def start(self) -> "FakeRedisServer":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            # Hang up on clients still connected and let their handlers finish
+            # before the loop closes, so nothing fails at interpreter exit
+            for writer in list(self._writers):
+                writer.close()
+            handlers = asyncio.all_tasks(self._loop)
+            if handlers:
+                self._loop.run_until_complete(asyncio.gather(*handlers, return_exceptions=True))
+            self._loop.close()
+
+    def _push(self, writer: asyncio.StreamWriter, resp3: bool, items: list):
+        if not resp3:
+            writer.write(self._encode(items))
+            return
+        writer.write(b">%d\r\n" % len(items) + b"".join(self._encode(v, resp3) for v in items))
+
+    def _unsubscribe(self, writer: asyncio.StreamWriter, resp3: bool, channels: List[str]) -> int:
+        for channel in channels:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard((writer, resp3))
+                if not subscribers:
+                    del self.channels[channel]
+        return sum(1 for subscribers in self.channels.values() if (writer, resp3) in subscribers)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        queued: Optional[List[List[str]]] = None
+        resp3 = False
+        subscribed: Set[str] = set()
+        self._writers.add(writer)
+        try:
+            while True:
+                # One round trip per flight of commands: pipelined commands that
+                # arrived together with this one don't pay the latency again.
+                in_flight = bool(reader._buffer)
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                if self.latency and not in_flight:
+                    await asyncio.sleep(self.latency)
+                name = command[0].upper()
+                if name == "HELLO":
+                    resp3 = len(command) > 1 and command[1] == "3"
+                    writer.write(self._encode(
+                        {"server": "fake-redis", "version": "7.2.0", "proto": 3 if resp3 else 2,
+                         "id": 1, "mode": "standalone", "role": "master", "modules": []},
+                        resp3,
+                    ))
+                elif name == "SUBSCRIBE":
+                    for channel in command[1:]:
+                        subscribed.add(channel)
+                        self.channels.setdefault(channel, set()).add((writer, resp3))
+                        self._push(writer, resp3, ["subscribe", channel, len(subscribed)])
+                elif name == "UNSUBSCRIBE":
+                    for channel in command[1:] or sorted(subscribed):
+                        subscribed.discard(channel)
+                        self._unsubscribe(writer, resp3, [channel])
+                        self._push(writer, resp3, ["unsubscribe", channel, len(subscribed)])
+                elif name == "PUBLISH" and queued is None:
+                    subscribers = list(self.channels.get(command[1], ()))
+                    for subscriber, subscriber_resp3 in subscribers:
+                        self._push(subscriber, subscriber_resp3, ["message", command[1], command[2]])
+                    writer.write(self._encode(len(subscribers), resp3))
+                elif name == "MULTI":
+                    queued = []
+                    writer.write(b"+OK\r\n")
+                elif name == "EXEC" and queued is not None:
+                    results = [self._execute(c) for c in queued]
+                    queued = None
+                    writer.write(b"*%d\r\n" % len(results) + b"".join(self._encode(r, resp3) for r in results))
+                elif name == "DISCARD":
+                    queued = None
+                    writer.write(b"+OK\r\n")
+                elif queued is not None:
+                    queued.append(command)
+                    writer.write(b"+QUEUED\r\n")
+                else:
+                    writer.write(self._encode(self._execute(command), resp3))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._unsubscribe(writer, resp3, list(subscribed))
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[str]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.decode().split()
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2].decode())
+        return args
+
+    def _encode(self, value, resp3: bool = False) -> bytes:
+        if isinstance(value, Exception):
+            return f"-ERR {value}\r\n".encode()
+        if value is True:
+            return b"+OK\r\n"
+        if value is None:
+            return b"_\r\n" if resp3 else b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._encode(v, resp3) for v in value)
+        if isinstance(value, dict):
+            if not resp3:
+                flat = [item for pair in value.items() for item in pair]
+                return self._encode(flat)
+            return b"%%%d\r\n" % len(value) + b"".join(
+                self._encode(k, resp3) + self._encode(v, resp3) for k, v in value.items()
+            )
+        data = str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _live(self, key: str):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _execute(self, command: List[str]):
+        name, args = command[0].upper(), command[1:]
+        try:
+            if name == "PING":
+                return "PONG"
+            if name in ("CLIENT", "SELECT"):
+                return True
+            if name == "GET":
+                return self._live(args[0])
+            if name == "MGET":
+                return [self._live(k) for k in args]
+            if name == "SET":
+                ttl = None
+                if len(args) >= 4 and args[2].upper() == "EX":
+                    ttl = time.monotonic() + int(args[3])
+                self.data[args[0]] = (args[1], ttl)
+                return True
+            if name == "SETEX":
+                self.data[args[0]] = (args[2], time.monotonic() + int(args[1]))
+                return True
+            if name == "DEL":
+                return sum(1 for k in args if self.data.pop(k, None) is not None)
+            if name == "EXISTS":
+                return sum(1 for k in args if self._live(k) is not None)
+            if name == "EXPIRE":
+                value = self._live(args[0])
+                if value is None:
+                    return 0
+                self.data[args[0]] = (value, time.monotonic() + int(args[1]))
+                return 1
+            if name == "HSET":
+                current = self._live(args[0]) or {}
+                added = 0
+                for field, value in zip(args[1::2], args[2::2]):
+                    added += field not in current
+                    current[field] = value
+                ttl = self.data.get(args[0], (None, None))[1]
+                self.data[args[0]] = (current, ttl)
+                return added
+            if name == "HGET":
+                return (self._live(args[0]) or {}).get(args[1])
+            if name == "HGETALL":
+                return dict(self._live(args[0]) or {})
+            if name == "HDEL":
+                current = self._live(args[0]) or {}
+                return sum(1 for f in args[1:] if current.pop(f, None) is not None)
+            return Exception(f"unknown command '{name}'")
+        except (IndexError, ValueError) as e:
+            return Exception(str(e))
@@ -0,0 +1,69 @@
+"""Outbound frames per second per core for the streamed-token send path.
+
+Compares the old path (validated ResponseResponse + stdlib json of __dict__,
+one frame per token) with ResponseChunk + the fast encoder, and with the
+FrameCoalescer in token/time/phrase mode over a fake websocket.
+
+    python -m benchmarks.frame_throughput --tokens 200000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.custom_types import ResponseChunk, ResponseResponse
+from app.frames import FlushPolicy, FrameCoalescer, encode_response
+
+TOKENS = ["Sure", ",", " the", " NPI", " is", " one", " two", " three", ".", " Thanks", "!"]
+
+
+def old_path(count: int) -> float:
+    start = time.perf_counter()
+    for index in range(count):
+        event = ResponseResponse(
+            response_id=1, content=TOKENS[index % len(TOKENS)], content_complete=False, end_call=False
+        )
+        json.dumps(event.__dict__)
+    return time.perf_counter() - start
+
+
+def fast_path(count: int) -> float:
+    start = time.perf_counter()
+    for index in range(count):
+        event = ResponseChunk(1, TOKENS[index % len(TOKENS)])
+        encode_response(event.response_id, event.content, event.content_complete, event.end_call)
+    return time.perf_counter() - start
+
+
+async def coalesced(count: int, mode: str):
+    frames = 0
+
+    async def send_text(_, response_id=None):
+        nonlocal frames
+        frames += 1
+
+    async def events():
+        for index in range(count):
+            yield ResponseChunk(1, TOKENS[index % len(TOKENS)])
+        yield ResponseChunk(1, "", content_complete=True)
+
+    coalescer = FrameCoalescer(send_text, FlushPolicy(mode=mode, window_ms=20))
+    start = time.perf_counter()
+    await coalescer.stream(events(), 1, lambda _: True)
+    return time.perf_counter() - start, frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=200000)
+    args = parser.parse_args()
+
+    for label, fn in (("old", old_path), ("fast", fast_path)):
+        elapsed = fn(args.tokens)
+        print(f"{label:<7} tokens={args.tokens} frames/s={args.tokens / elapsed:12,.0f}")
+    for mode in ("token", "time", "phrase"):
+        elapsed, frames = asyncio.run(coalesced(args.tokens, mode))
+        print(
+            f"{mode:<7} tokens={args.tokens} frames={frames} tokens/s={args.tokens / elapsed:12,.0f} "
+            f"frames_saved={1 - frames / (args.tokens + 1):.0%}"
+        )
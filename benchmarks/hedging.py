@@ -0,0 +1,93 @@
+"""Time-to-first-token with and without hedging against a slow-tailed primary.
+
+Two local fake Anthropic APIs stand in for the primary and backup models. The
+primary is occasionally slow (`--slow-rate` of requests take `--slow-ms` to
+the first token); with hedging, a backup request fires after `--hedge-ms`.
+
+    python -m benchmarks.hedging --turns 200 --slow-rate 0.1 --slow-ms 2500 --hedge-ms 600
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from anthropic import AsyncAnthropic
+
+from benchmarks.fake_anthropic import FakeAnthropicServer
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(label: str, primary_url: str, backup_url: str, args, hedge_ms: float):
+    from app import metrics
+    from app.custom_types import ResponseRequiredRequest
+    from app.llm import LlmClient
+    from app.providers import AnthropicProvider, HedgePolicy
+
+    primary = AsyncAnthropic(api_key="bench", base_url=primary_url, max_retries=0)
+    backup = AsyncAnthropic(api_key="bench", base_url=backup_url, max_retries=0)
+    hedged_before, hedges_before, wins_before = (
+        metrics.llm_hedged_turns.value, metrics.llm_hedges.value, metrics.llm_hedge_wins.value
+    )
+    ttft = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def turn(index: int):
+        async with semaphore:
+            client = LlmClient(
+                client=primary,
+                hedge_policy=HedgePolicy(hedge_after_ms=hedge_ms),
+                backup=AnthropicProvider(backup, "backup-model"),
+            )
+            request = ResponseRequiredRequest.model_construct(
+                interaction_type="response_required",
+                response_id=index,
+                transcript=[{"role": "user", "content": "Is the panel open for new providers?"}],
+                retell_llm_dynamic_variables={"provider_name": "Example Health", "payer": "Acme"},
+            )
+            start = time.perf_counter()
+            first = None
+            async for event in client.draft_response(request):
+                if first is None:
+                    first = time.perf_counter() - start
+            ttft.append(first * 1000)
+            await client.close()
+
+    await asyncio.gather(*(turn(i) for i in range(args.turns)))
+    await primary.close()
+    await backup.close()
+    hedged = metrics.llm_hedged_turns.value - hedged_before
+    hedges = metrics.llm_hedges.value - hedges_before
+    wins = metrics.llm_hedge_wins.value - wins_before
+    print(
+        f"{label:<10} ttft ms p50={percentile(ttft, 0.5):7.1f} p95={percentile(ttft, 0.95):7.1f} "
+        f"p99={percentile(ttft, 0.99):7.1f} max={max(ttft):7.1f}"
+        + (f"  hedge rate={hedges / hedged:.1%} backup wins={wins / max(hedges, 1):.1%}" if hedged else "")
+    )
+
+
+async def main(args, primary_url: str, backup_url: str):
+    await run("primary", primary_url, backup_url, args, 0)
+    await run("hedged", primary_url, backup_url, args, args.hedge_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ttft-ms", type=float, default=400.0)
+    parser.add_argument("--backup-ttft-ms", type=float, default=250.0)
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--slow-ms", type=float, default=2500.0)
+    parser.add_argument("--hedge-ms", type=float, default=600.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    primary = FakeAnthropicServer(ttft_ms=args.ttft_ms, token_ms=5, slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    backup = FakeAnthropicServer(ttft_ms=args.backup_ttft_ms, token_ms=5)
+    with primary, backup:
+        asyncio.run(main(args, primary.url, backup.url))
+        print(f"requests: primary={primary.requests} backup={backup.requests} cancelled={primary.cancelled + backup.cancelled}")
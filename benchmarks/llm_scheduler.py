@@ -0,0 +1,96 @@
+"""Turns against a rate-limited upstream, with and without the LLM scheduler.
+
+A local fake Anthropic API answers 429 (with retry-after) once more than
+`--upstream-limit` streams are open. Turns arrive at `--rate` per second.
+Without the scheduler every 429 becomes the apology fallback. With it
+(LLM_MAX_CONCURRENT = the upstream limit) turns queue, oldest first.
+
+    python -m benchmarks.llm_scheduler --turns 300 --rate 40 --upstream-limit 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from anthropic import AsyncAnthropic
+
+from benchmarks.fake_anthropic import FakeAnthropicServer
+from benchmarks.hedging import percentile
+
+
+async def run(label: str, url: str, args, policy):
+    import app.llm
+    from app import metrics
+    from app.custom_types import ResponseRequiredRequest
+    from app.llm import LlmClient
+    from app.llm_scheduler import LlmScheduler
+
+    app.llm.llm_scheduler = LlmScheduler(policy)
+    client = AsyncAnthropic(api_key="bench", base_url=url, max_retries=0)
+    rejected_before = metrics.llm_scheduler_rejections.value
+    first_frame, apologies = [], 0
+
+    async def turn(index: int):
+        nonlocal apologies
+        llm = LlmClient(client=client)
+        request = ResponseRequiredRequest.model_construct(
+            interaction_type="response_required",
+            response_id=index,
+            transcript=[{"role": "user", "content": f"Is the panel open for provider {index}?"}],
+            retell_llm_dynamic_variables={"provider_name": "Example Health", "payer": "Acme"},
+        )
+        received_at = time.perf_counter()
+        first = None
+        async for event in llm.draft_response(request, received_at):
+            if first is None and event.content:
+                first = event.content
+                first_frame.append((time.perf_counter() - received_at) * 1000)
+        if first and first.startswith("I apologize"):
+            apologies += 1
+        await llm.close()
+
+    rng = random.Random(7)
+    tasks = []
+    for index in range(args.turns):
+        tasks.append(asyncio.create_task(turn(index)))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    await client.close()
+    rejected = metrics.llm_scheduler_rejections.value - rejected_before
+    print(
+        f"{label:<12} apologies={apologies:4d} ({apologies / args.turns:.1%}) rejected={int(rejected):4d}  "
+        f"first frame ms p50={percentile(first_frame, 0.5):7.1f} p95={percentile(first_frame, 0.95):7.1f} "
+        f"max={max(first_frame):7.1f}"
+    )
+
+
+async def main(args, url: str):
+    from app.llm_scheduler import SchedulerPolicy
+
+    await run("unscheduled", url, args, SchedulerPolicy())
+    await run("scheduled", url, args, SchedulerPolicy(
+        enabled=True, max_concurrent=args.upstream_limit, max_wait=args.max_wait,
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=40.0, help="turns arriving per second")
+    parser.add_argument("--upstream-limit", type=int, default=8, help="concurrent streams before the fake API 429s")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--token-ms", type=float, default=5.0)
+    parser.add_argument("--max-wait", type=float, default=8.0, help="LLM_QUEUE_MAX_WAIT for the scheduled run")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ.setdefault("LLM_RESPONSE_CACHE", "false")
+    upstream = FakeAnthropicServer(
+        ttft_ms=args.ttft_ms, token_ms=args.token_ms,
+        max_concurrent=args.upstream_limit, retry_after=args.retry_after,
+    )
+    with upstream:
+        asyncio.run(main(args, upstream.url))
+        print(f"upstream: requests={upstream.requests} rate_limited={upstream.rate_limited}")
@@ -0,0 +1,341 @@
+"""Concurrent-call load test: N simulated Retell calls against one worker.
+
+Each call opens `/llm-websocket/{call_id}`, sends `call_details`, answers the
+begin message, keeps a `ping_pong` heartbeat going and replays a scripted rep
+transcript: `update_only` events while the rep is "speaking", then
+`response_required`, waiting for the agent's full response before the next
+turn. By default the app runs as a uvicorn subprocess (one worker) against
+a local fake Anthropic API, so the whole thing runs offline.
+
+    python -m benchmarks.load_test --calls 50 --turns 6
+    python -m benchmarks.load_test --ramp 10,25,50,100,200 --ttft-ms 300 --token-ms 25
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --calls 20
+
+Reports p50/p95/p99 time-to-first-frame (response_required sent -> first
+response frame received), ping_pong round trip and the worker's event-loop
+lag (from its /metrics), and with --ramp the largest stage that met the SLOs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.fake_anthropic import FakeAnthropicServer
+
+SCRIPT = [
+    "Thank you for calling provider services, this is Dana, how can I help you?",
+    "Sure, I can check that. What's the name of the provider or group?",
+    "Okay. And can I get the NPI or tax ID for that group?",
+    "Thank you. Let me pull that up, one moment please.",
+    "Alright, so for that line of business the panel is currently closed in this area.",
+    "You can submit a request to be added to the waitlist through the provider portal.",
+    "Your reference number for this call is REF 48213.",
+    "Is there anything else I can help you with today?",
+]
+
+TO_NUMBER = "+15551230000"
+METADATA = {
+    "phone_number": TO_NUMBER,
+    "provider_name": "Example Health",
+    "npi_number": "1234567890",
+    "tax_id": "12-3456789",
+    "specialty": "Cardiology",
+    "scenario_type": "New State",
+    "line_of_business": "Commercial",
+    "payer": "Acme",
+}
+
+LAG_METRIC = "event_loop_lag_seconds"
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def load_script(path: str) -> List[str]:
+    """Rep utterances from a JSON list of strings or of Retell transcript utterances"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("transcript", [])
+    return [item if isinstance(item, str) else item["content"] for item in data
+            if isinstance(item, str) or item.get("role") == "user"]
+
+
+class CallStats:
+    def __init__(self):
+        self.first_frame_ms: List[float] = []
+        self.ping_ms: List[float] = []
+        self.turns = 0
+        self.errors: List[str] = []
+
+
+async def simulate_call(ws_url: str, call_id: str, script: List[str], args, stats: CallStats):
+    transcript: List[Dict[str, str]] = []
+    pings: Dict[int, float] = {}
+    turn = {"response_id": 0, "sent_at": 0.0, "first": True, "text": [], "done": asyncio.Event()}
+
+    async with connect(f"{ws_url}/llm-websocket/{call_id}", max_size=None) as ws:
+
+        async def reader():
+            async for raw in ws:
+                frame = json.loads(raw)
+                kind = frame.get("response_type")
+                if kind == "ping_pong":
+                    sent = pings.pop(frame.get("timestamp"), None)
+                    if sent is not None:
+                        stats.ping_ms.append((time.perf_counter() - sent) * 1000)
+                elif kind == "response" and frame.get("response_id") == turn["response_id"]:
+                    if turn["first"] and turn["response_id"]:
+                        stats.first_frame_ms.append((time.perf_counter() - turn["sent_at"]) * 1000)
+                    turn["first"] = False
+                    turn["text"].append(frame.get("content", ""))
+                    if frame.get("content_complete") or frame.get("end_call"):
+                        turn["done"].set()
+
+        async def heartbeat():
+            sequence = 0
+            while True:
+                await asyncio.sleep(args.ping_interval)
+                sequence += 1
+                timestamp = int(time.time() * 1000) * 1000 + sequence % 1000
+                pings[timestamp] = time.perf_counter()
+                await ws.send(json.dumps({"interaction_type": "ping_pong", "timestamp": timestamp}))
+
+        async def wait_turn() -> bool:
+            try:
+                await asyncio.wait_for(turn["done"].wait(), args.turn_timeout)
+            except asyncio.TimeoutError:
+                stats.errors.append(f"{call_id}: response {turn['response_id']} timed out")
+                return False
+            transcript.append({"role": "agent", "content": "".join(turn["text"]).strip()})
+            return True
+
+        background = [asyncio.create_task(reader()), asyncio.create_task(heartbeat())]
+        try:
+            await ws.send(json.dumps({
+                "interaction_type": "call_details",
+                "call": {"call_id": call_id, "from_number": "+15550000000", "to_number": TO_NUMBER},
+            }))
+            # Begin message (response_id 0)
+            if not await wait_turn():
+                return
+
+            word_delay = args.word_ms / 1000.0
+            for index in range(args.turns):
+                words = script[index % len(script)].split()
+                for end in range(args.words_per_update, len(words), args.words_per_update):
+                    await asyncio.sleep(word_delay * args.words_per_update)
+                    await ws.send(json.dumps({
+                        "interaction_type": "update_only",
+                        "transcript": transcript + [{"role": "user", "content": " ".join(words[:end])}],
+                        "turntaking": "user_turn",
+                    }))
+                await asyncio.sleep(word_delay * (len(words) % args.words_per_update or args.words_per_update))
+                transcript.append({"role": "user", "content": " ".join(words)})
+                await ws.send(json.dumps({
+                    "interaction_type": "update_only",
+                    "transcript": transcript,
+                    "turntaking": "agent_turn",
+                }))
+
+                turn.update(response_id=index + 1, first=True, text=[], done=asyncio.Event())
+                turn["sent_at"] = time.perf_counter()
+                await ws.send(json.dumps({
+                    "interaction_type": "response_required",
+                    "response_id": index + 1,
+                    "transcript": transcript,
+                }))
+                if not await wait_turn():
+                    return
+                stats.turns += 1
+                await asyncio.sleep(args.pause_ms / 1000.0)
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+
+async def run_stage(ws_url: str, calls: int, script: List[str], args) -> CallStats:
+    stats = CallStats()
+    stagger = args.ramp_up_s / max(1, calls)
+
+    async def one(index: int):
+        await asyncio.sleep(index * stagger)
+        try:
+            await simulate_call(ws_url, f"load-{calls}-{index}", script, args, stats)
+        except Exception as e:
+            stats.errors.append(f"load-{calls}-{index}: {type(e).__name__}: {e}")
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return stats
+
+
+def scrape_lag(http_url: str) -> Optional[Dict[float, float]]:
+    """Cumulative event_loop_lag_seconds buckets from the worker's /metrics"""
+    try:
+        text = httpx.get(f"{http_url}/metrics", timeout=5).text
+    except httpx.HTTPError:
+        return None
+    buckets = {}
+    prefix = f'{LAG_METRIC}_bucket{{le="'
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            bound, _, count = line[len(prefix):].partition('"} ')
+            buckets[float(bound)] = float(count)
+    return buckets or None
+
+
+def bucket_quantile(before: Dict[float, float], after: Dict[float, float], q: float) -> float:
+    """Estimate a quantile of the samples observed between two scrapes"""
+    bounds = sorted(after)
+    counts = [after[b] - before.get(b, 0.0) for b in bounds]
+    total = counts[-1]
+    if not total:
+        return float("nan")
+    rank = q * total
+    lower, previous = 0.0, 0.0
+    for bound, count in zip(bounds, counts):
+        if count >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * (rank - previous) / max(count - previous, 1e-9)
+        lower, previous = bound, count
+    return lower
+
+
+def start_worker(port: int, llm_url: str, **env_overrides: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        ANTHROPIC_BASE_URL=llm_url,
+        ANTHROPIC_API_KEY=os.environ.get("ANTHROPIC_API_KEY", "load-test"),
+        RETELL_API_KEY=os.environ.get("RETELL_API_KEY", "load-test"),
+        REDIS_ENABLED=os.environ.get("REDIS_ENABLED", "false"),
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+    )
+    env.update(env_overrides)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.server:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=root,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("app worker exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("app worker did not become ready")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _ms(values: List[float]) -> str:
+    return " ".join(f"{label}={percentile(values, q):7.1f}" for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)))
+
+
+def report(calls: int, stats: CallStats, lag: Optional[List[float]], elapsed: float, args) -> bool:
+    print(f"\n== {calls} concurrent calls: {stats.turns} turns in {elapsed:.1f}s, {len(stats.errors)} errors")
+    print(f"time-to-first-frame ms  {_ms(stats.first_frame_ms)}")
+    print(f"ping_pong round trip ms {_ms(stats.ping_ms)}")
+    if lag is not None:
+        print(f"event-loop lag ms       p50={lag[0]:7.1f} p95={lag[1]:7.1f} p99={lag[2]:7.1f}")
+    for error in stats.errors[:5]:
+        print(f"  ! {error}")
+
+    first_frame_slo = args.first_frame_slo_ms
+    if first_frame_slo is None:
+        first_frame_slo = args.ttft_ms + 250
+    return (
+        not stats.errors
+        and percentile(stats.first_frame_ms, 0.95) <= first_frame_slo
+        and percentile(stats.ping_ms, 0.99) <= args.ping_slo_ms
+        and (lag is None or lag[2] <= args.lag_slo_ms)
+    )
+
+
+async def main(args, http_url: str):
+    script = load_script(args.script) if args.script else SCRIPT
+    ws_url = "ws" + http_url[len("http"):]
+    stages = [int(n) for n in args.ramp.split(",")] if args.ramp else [args.calls]
+    sustainable = 0
+
+    async with httpx.AsyncClient() as client:
+        await client.post(f"{http_url}/redis-store", json=METADATA)
+    # One short call first so connection setup and prompt building aren't in stage 1.
+    warmup = argparse.Namespace(**{**vars(args), "turns": 1})
+    await run_stage(ws_url, 1, script, warmup)
+
+    for calls in stages:
+        before = await asyncio.to_thread(scrape_lag, http_url)
+        start = time.perf_counter()
+        stats = await run_stage(ws_url, calls, script, args)
+        elapsed = time.perf_counter() - start
+        after = await asyncio.to_thread(scrape_lag, http_url)
+        lag = None
+        if before is not None and after is not None:
+            lag = [bucket_quantile(before, after, q) * 1000 for q in (0.5, 0.95, 0.99)]
+        if report(calls, stats, lag, elapsed, args):
+            sustainable = calls
+        elif args.ramp:
+            break
+    if args.ramp:
+        print(f"\nmax sustainable calls per worker: {sustainable or f'< {stages[0]}'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--ramp", default=None, help="comma-separated concurrency stages, e.g. 10,25,50,100")
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--script", default=None, help="JSON transcript to replay (rep utterances are used)")
+    parser.add_argument("--url", default=None, help="existing server; default starts a worker + fake LLM")
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=25.0)
+    parser.add_argument("--word-ms", type=float, default=250.0, help="rep speaking rate")
+    parser.add_argument("--words-per-update", type=int, default=3)
+    parser.add_argument("--pause-ms", type=float, default=400.0)
+    parser.add_argument("--ping-interval", type=float, default=2.0)
+    parser.add_argument("--ramp-up-s", type=float, default=2.0)
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--first-frame-slo-ms", type=float, default=None, help="default: ttft + 250")
+    parser.add_argument("--ping-slo-ms", type=float, default=100.0)
+    parser.add_argument("--lag-slo-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    llm = worker = None
+    http_url = args.url
+    if http_url is None:
+        llm = FakeAnthropicServer(ttft_ms=args.ttft_ms, token_ms=args.token_ms).start()
+        port = _free_port()
+        worker = start_worker(port, llm.url)
+        http_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(main(args, http_url.rstrip("/")))
+    finally:
+        if worker is not None:
+            worker.terminate()
+            worker.wait(timeout=10)
+        if llm is not None:
+            llm.stop()
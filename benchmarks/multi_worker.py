@@ -0,0 +1,106 @@
+"""Multi-worker check: websocket, metadata updates and call_ended on different workers.
+
+Starts a local fake Redis, a fake Anthropic API and two app workers sharing
+that Redis (as with `uvicorn --workers 2` or two dynos), then:
+
+  1. stages metadata through worker A and runs a call's websocket on worker B,
+  2. updates the metadata through worker A and checks that B's live call uses it,
+  3. sends `call_ended` to worker A and checks the call's metadata and
+     call state are cleaned up.
+
+    python -m benchmarks.multi_worker
+
+Exits non-zero if any check fails. tests/test_multi_worker.py runs it with
+the test suite.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.fake_anthropic import FakeAnthropicServer
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.load_test import METADATA, TO_NUMBER, _free_port, start_worker
+
+CALL_ID = "multi-worker-call"
+
+
+async def respond(ws, response_id: int, transcript: list):
+    await ws.send(json.dumps({
+        "interaction_type": "response_required",
+        "response_id": response_id,
+        "transcript": transcript,
+    }))
+    async for raw in ws:
+        frame = json.loads(raw)
+        if frame.get("response_id") == response_id and frame.get("content_complete"):
+            return
+
+
+async def main(worker_a: str, worker_b: str, redis: FakeRedisServer, llm: FakeAnthropicServer) -> bool:
+    results = []
+
+    def check(name: str, ok: bool):
+        results.append(ok)
+        print(f"{'PASS' if ok else 'FAIL'}  {name}")
+
+    def system_prompt() -> str:
+        payload = llm.last_payload or {}
+        return " ".join(block.get("text", "") for block in payload.get("system", []))
+
+    transcript = [{"role": "user", "content": "Provider services, how can I help?"}]
+    async with httpx.AsyncClient() as client:
+        await client.post(f"{worker_a}/redis-store", json=METADATA)
+
+        ws_url = "ws" + worker_b[len("http"):]
+        async with connect(f"{ws_url}/llm-websocket/{CALL_ID}") as ws:
+            await ws.send(json.dumps({
+                "interaction_type": "call_details",
+                "call": {"call_id": CALL_ID, "from_number": "+15550000000", "to_number": TO_NUMBER},
+            }))
+            await respond(ws, 1, transcript)
+            check("worker B reads metadata staged on worker A", METADATA["provider_name"] in system_prompt())
+            check("call state is shared", bool(redis.data.get(f"call_state:{CALL_ID}")))
+
+            await client.post(f"{worker_a}/redis-store", json={**METADATA, "provider_name": "Renamed Health"})
+            await asyncio.sleep(0.3)
+            await respond(ws, 2, transcript)
+            check("metadata update on A reaches B's live call", "Renamed Health" in system_prompt())
+
+        response = await client.post(
+            f"{worker_a}/webhook", json={"event": "call_ended", "call": {"call_id": CALL_ID}}
+        )
+        check("call_ended on worker A is accepted", response.status_code == 200)
+        check("call_ended on A deletes the call's metadata", not any(k.startswith("provider_metadata:") for k in redis.data))
+        check("call_ended on A deletes the call state", f"call_state:{CALL_ID}" not in redis.data)
+    return all(results)
+
+
+def run() -> bool:
+    """Start the fake services and two workers, run the checks, tear everything down"""
+    redis = FakeRedisServer().start()
+    llm = FakeAnthropicServer(ttft_ms=20, token_ms=1).start()
+    env = {"REDIS_ENABLED": "true", "REDIS_URL": redis.url}
+    workers = []
+    try:
+        urls = []
+        for _ in range(2):
+            port = _free_port()
+            workers.append(start_worker(port, llm.url, **env))
+            urls.append(f"http://127.0.0.1:{port}")
+        return asyncio.run(main(urls[0], urls[1], redis, llm))
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait(timeout=10)
+        llm.stop()
+        redis.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,147 @@
+"""Event-loop lag with N concurrent calls: sync vs asyncio metadata store.
+
+Each simulated call retrieves provider metadata once per turn, the way the
+websocket handler does. A monitor task measures how late the loop wakes it,
+which is the delay every other call on the worker experiences.
+
+    python -m benchmarks.redis_event_loop_lag --calls 100 --turns 20 --latency-ms 1
+
+Without --redis-url a local fake Redis with the given round-trip latency is used.
+Every lookup must find the metadata it stored; the run exits non-zero otherwise.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import redis
+
+from benchmarks.fake_redis import FakeRedisServer
+
+METADATA = {
+    "provider_name": "Example Health",
+    "npi_number": "1234567890",
+    "tax_id": "12-3456789",
+    "specialty": "Cardiology",
+    "scenario_type": "New State",
+    "line_of_business": "Commercial",
+    "payer": "Acme",
+    "organization_name": "Example Health",
+}
+
+
+class SyncMetadataStore:
+    """The baseline: the old blocking store, a sync redis client on the event loop"""
+
+    def __init__(self, url: str):
+        self.client = redis.from_url(url, decode_responses=True)
+
+    def store_metadata(self, phone_number: str, metadata):
+        from app.redis_utils import METADATA_TTL_SECONDS, metadata_key
+
+        self.client.set(metadata_key(phone_number), json.dumps(metadata), ex=METADATA_TTL_SECONDS)
+
+    def retrieve_metadata(self, phone_number: str):
+        from app.redis_utils import metadata_key
+
+        value = self.client.get(metadata_key(phone_number))
+        return json.loads(value) if value else None
+
+    def close(self):
+        self.client.close()
+
+
+async def _monitor(stop: asyncio.Event, interval: float, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def _run(store, is_async: bool, calls: int, turns: int):
+    phones = [f"+1555{n:07d}" for n in range(calls)]
+    for phone in phones:
+        if is_async:
+            await store.store_metadata(phone, METADATA)
+        else:
+            store.store_metadata(phone, METADATA)
+
+    failed = 0
+
+    async def call(phone):
+        nonlocal failed
+        for _ in range(turns):
+            try:
+                if is_async:
+                    metadata = await store.retrieve_metadata(phone)
+                else:
+                    metadata = store.retrieve_metadata(phone)
+            except Exception:
+                metadata = None
+            if metadata != METADATA:
+                failed += 1
+            await asyncio.sleep(0)
+
+    lags: list = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor(stop, 0.005, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(call(p) for p in phones))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    return elapsed, lags, failed
+
+
+def _report(label: str, elapsed: float, lags: list, lookups: int, failed: int):
+    lags = sorted(lags) or [0.0]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(
+        f"{label:<6} lookups={lookups:<6} failed={failed:<6} wall={elapsed:7.3f}s "
+        f"lag mean={statistics.mean(lags):7.2f}ms p99={p99:7.2f}ms max={lags[-1]:7.2f}ms"
+    )
+
+
+async def main(args) -> int:
+    """Returns the number of failed lookups across both stores"""
+    from app import redis_utils
+
+    lookups = args.calls * args.turns
+    sync_store = SyncMetadataStore(args.redis_url)
+    elapsed, lags, sync_failed = await _run(sync_store, False, args.calls, args.turns)
+    _report("sync", elapsed, lags, lookups, sync_failed)
+    sync_store.close()
+
+    async_store = redis_utils.AsyncRedisMetadataStore()
+    await async_store.connect()
+    elapsed, lags, async_failed = await _run(async_store, True, args.calls, args.turns)
+    _report("async", elapsed, lags, lookups, async_failed)
+    await async_store.close()
+    return sync_failed + async_failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    server = None
+    if args.redis_url is None:
+        server = FakeRedisServer(latency_ms=args.latency_ms).start()
+        args.redis_url = server.url
+    os.environ["REDIS_URL"] = args.redis_url
+    os.environ["REDIS_ENABLED"] = "true"
+    try:
+        failed = asyncio.run(main(args))
+    finally:
+        if server is not None:
+            server.stop()
+    if failed:
+        print(f"FAIL  {failed} lookups did not return the stored metadata", file=sys.stderr)
+        sys.exit(1)
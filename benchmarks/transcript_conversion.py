@@ -0,0 +1,70 @@
+"""Per-turn transcript handling cost: full rebuild vs TranscriptBuffer.
+
+Replays a call of --utterances utterances. At every turn the old path
+validates the whole transcript into ResponseRequiredRequest and converts it
+to messages; the new path feeds the raw transcript to a TranscriptBuffer.
+
+    python -m benchmarks.transcript_conversion --utterances 250
+"""
+import argparse
+import time
+
+from app.custom_types import ResponseRequiredRequest
+from app.llm import LlmClient
+from app.transcript_buffer import TranscriptBuffer
+
+
+def _transcripts(count: int):
+    transcript = []
+    for index in range(count):
+        role = "agent" if index % 2 else "user"
+        words = " ".join(f"word{n}" for n in range(12))
+        transcript.append({"role": role, "content": f"{index} {words}"})
+        yield list(transcript)
+
+
+def full_rebuild(count: int) -> float:
+    convert = LlmClient.convert_transcript_to_anthropic_messages
+    start = time.perf_counter()
+    for transcript in _transcripts(count):
+        request = ResponseRequiredRequest(
+            interaction_type="response_required",
+            response_id=len(transcript),
+            transcript=transcript,
+            retell_llm_dynamic_variables={},
+        )
+        convert(None, request.transcript)
+    return time.perf_counter() - start
+
+
+def incremental(count: int) -> float:
+    buffer = TranscriptBuffer()
+    start = time.perf_counter()
+    for transcript in _transcripts(count):
+        request = ResponseRequiredRequest.model_construct(
+            interaction_type="response_required",
+            response_id=len(transcript),
+            transcript=transcript,
+            retell_llm_dynamic_variables={},
+        )
+        buffer.update(request.transcript)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utterances", type=int, default=250)
+    args = parser.parse_args()
+
+    # Transcript generation is shared by both paths; measure it separately.
+    start = time.perf_counter()
+    for _ in _transcripts(args.utterances):
+        pass
+    baseline = time.perf_counter() - start
+
+    for label, fn in (("full", full_rebuild), ("buffer", incremental)):
+        elapsed = fn(args.utterances) - baseline
+        print(
+            f"{label:<7} utterances={args.utterances} total={elapsed * 1000:8.2f}ms "
+            f"per_turn={elapsed / args.utterances * 1e6:8.1f}us"
+        )
@@ -0,0 +1,41 @@
+import os
+
+os.environ.setdefault("RETELL_API_KEY", "test")
+
+from fastapi.testclient import TestClient
+
+from app.redis_utils import METADATA_TTL_SECONDS, redis_store
+from app.server import app
+
+client = TestClient(app)
+
+
+def stored_with(monkeypatch, query: str):
+    ttls = []
+
+    async def store_many(items, ttl):
+        ttls.append(ttl)
+        return [True] * len(items)
+
+    monkeypatch.setattr(redis_store, "store_many", store_many)
+    response = client.post(f"/redis-store/bulk{query}", content=b'[{"phone_number": "+15550000001"}]')
+    return response, ttls
+
+
+def test_missing_ttl_uses_the_default(monkeypatch):
+    response, ttls = stored_with(monkeypatch, "")
+    assert response.status_code == 200
+    assert ttls == [METADATA_TTL_SECONDS]
+
+
+def test_explicit_ttl_is_used(monkeypatch):
+    response, ttls = stored_with(monkeypatch, "?ttl=60")
+    assert response.status_code == 200
+    assert ttls == [60]
+
+
+def test_non_positive_ttl_is_rejected(monkeypatch):
+    for ttl in ("0", "-5"):
+        response, ttls = stored_with(monkeypatch, f"?ttl={ttl}")
+        assert response.status_code == 422
+        assert ttls == []
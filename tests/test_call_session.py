@@ -0,0 +1,49 @@
+import asyncio
+
+from app.call_session import CallSessionRegistry
+from app.redis_utils import MetadataUnavailable
+
+METADATA = {"provider_name": "Example Health"}
+
+
+class FlakyStore:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.lookups = 0
+
+    async def retrieve_metadata(self, phone_number):
+        self.lookups += 1
+        if self.failures:
+            self.failures -= 1
+            raise MetadataUnavailable("connection reset")
+        return METADATA
+
+
+def test_failed_lookup_is_retried_on_the_next_turn():
+    async def scenario():
+        registry = CallSessionRegistry()
+        session = registry.open("call")
+        registry.bind_phone(session, "+15550000000", "+15551234567")
+        store = FlakyStore(failures=1)
+        first = await session.get_metadata(store)
+        second = await session.get_metadata(store)
+        third = await session.get_metadata(store)
+        return first, second, third, store.lookups
+
+    first, second, third, lookups = asyncio.run(scenario())
+    assert first == {}
+    assert second == third == METADATA
+    assert lookups == 2
+
+
+def test_reconnect_without_call_details_leaves_no_stale_index():
+    registry = CallSessionRegistry()
+    old = registry.open("call")
+    registry.bind_phone(old, "+15550000000", "+15551234567")
+    new = registry.open("call")  # reconnect; the new socket never sends call_details
+
+    assert registry.invalidate_phone("+15551234567") == 0
+    registry.close("call", old)
+    assert registry.get("call") is new
+    registry.close("call", new)
+    assert registry.invalidate_phone("+15551234567") == 0
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from app.connection import ConnectionPolicy, ConnectionSupervisor
+from app.turn_manager import TurnManager
+
+
+def frame(response_id, n):
+    return json.dumps({"response_id": response_id, "n": n})
+
+
+def test_superseded_frames_are_dropped_on_a_slow_socket():
+    async def scenario():
+        sent = []
+
+        async def slow_send(text):
+            sent.append(json.loads(text))
+            await asyncio.sleep(0.005)
+
+        turns = TurnManager("call")
+        turns.supersede(1)
+        supervisor = ConnectionSupervisor("call", slow_send, ConnectionPolicy(send_queue=64), turns.is_current)
+        for n in range(40):
+            await supervisor.send(frame(1, n), 1)
+        await asyncio.sleep(0.012)  # a couple of frames reach the socket
+
+        turns.supersede(2)
+        await supervisor.send(frame(1, 40), 1)  # the old stream, still running
+        for n in range(3):
+            await supervisor.send(frame(2, n), 2)
+        await asyncio.sleep(0.1)
+        await supervisor.close()
+        return sent
+
+    sent = asyncio.run(scenario())
+    first_new = next(i for i, f in enumerate(sent) if f["response_id"] == 2)
+    # Only frames already on the wire (at most one mid-write) precede the new turn
+    assert first_new <= 4
+    assert [f for f in sent[first_new:] if f["response_id"] == 1] == []
+    assert [f["n"] for f in sent if f["response_id"] == 2] == [0, 1, 2]
+
+
+def test_ping_pong_jumps_the_queue():
+    async def scenario():
+        sent = []
+
+        async def send(text):
+            sent.append(text)
+            await asyncio.sleep(0.001)
+
+        supervisor = ConnectionSupervisor("call", send)
+        for n in range(5):
+            await supervisor.send(frame(1, n))
+        await asyncio.sleep(0)
+        supervisor.send_control("ping")
+        await asyncio.sleep(0.05)
+        await supervisor.close()
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent.index("ping") <= 1
@@ -0,0 +1,72 @@
+import pytest
+
+from app.context_policy import ContextPolicy, PinnedFacts, RollingContext
+
+
+def facts(*utterances):
+    pinned = PinnedFacts()
+    pinned.scan([{"role": "user", "content": text} for text in utterances])
+    return pinned.facts
+
+
+@pytest.mark.parametrize("text", [
+    "Is the panel open?",
+    "So is the network accepting providers right now?",
+    "I think the panel is open, but let me confirm.",
+    "The panel might be closed for that county.",
+])
+def test_questions_and_hedges_are_not_pinned(text):
+    assert "Panel status" not in facts(text)
+
+
+def test_panel_statements_are_pinned():
+    assert facts("Yes, the panel is open.")["Panel status"] == "OPEN"
+    assert facts("We are not accepting new providers.")["Panel status"] == "CLOSED"
+
+
+def test_statement_after_a_question_in_the_same_turn():
+    assert facts("Is that for Texas? The panel is closed there.")["Panel status"] == "CLOSED"
+
+
+def test_reference_number_is_one_token():
+    found = facts("Your reference number is 12345 and the effective date is June 1.")
+    assert found["Reference number"] == "12345"
+    assert facts("Confirmation number: REF-20931.")["Reference number"] == "REF-20931"
+
+
+def test_summaries_are_off_by_default(monkeypatch):
+    monkeypatch.delenv("LLM_CONTEXT_SUMMARY", raising=False)
+    assert not ContextPolicy.from_env().enabled
+    monkeypatch.setenv("LLM_CONTEXT_SUMMARY", "true")
+    assert ContextPolicy.from_env().enabled
+
+
+def test_opening_hours_are_not_panel_status():
+    assert "Panel status" not in facts("Our network is open Monday through Friday.")
+    assert "Panel status" not in facts("The office is closed from noon to one.")
+
+
+def test_rep_name_at_the_start_of_a_sentence():
+    assert facts("This is Dana.")["Representative"] == "Dana"
+    assert facts("Hi, my name is Luis. How can I help?")["Representative"] == "Luis"
+
+
+def context(**policy):
+    return RollingContext(ContextPolicy(**policy), client=None)
+
+
+def test_no_pinned_facts_when_summaries_are_off():
+    messages = [{"role": "user", "content": "Yes, the panel is open."}]
+    assert context(enabled=False).apply(messages) == ("", messages)
+
+
+def test_pinned_facts_only_once_turns_leave_the_window():
+    messages = [{"role": "user", "content": "Yes, the panel is open."}] + [
+        {"role": "assistant" if n % 2 else "user", "content": "Okay."} for n in range(5)
+    ]
+    kept = context(enabled=True, max_verbatim_turns=24, max_input_tokens=None)
+    assert kept.apply(messages) == ("", messages)
+
+    text, window = context(enabled=True, max_verbatim_turns=24, max_input_tokens=40).apply(messages)
+    assert len(window) < len(messages)
+    assert "Panel status: OPEN" in text
@@ -0,0 +1,33 @@
+import pytest
+
+from app.fast_path import FastPath, FastPathPolicy
+
+VARIABLES = {"npi_number": "1234567890", "tax_id": "123456789", "provider_name": "Example Health"}
+
+
+def answer(text):
+    fast_path = FastPath(FastPathPolicy(enabled=True))
+    return fast_path.answer([{"role": "user", "content": text}], VARIABLES)
+
+
+@pytest.mark.parametrize("text", [
+    "What's the NPI?",
+    "Can you give me the NPI?",
+    "Do you have the NPI number?",
+    "Okay, could you read me the NPI please?",
+])
+def test_npi_requests_are_read_back(text):
+    assert answer(text) == "Sure. The NPI is 1 2 3, 4 5 6, 7 8 9 0."
+
+
+@pytest.mark.parametrize("text", [
+    "Is the NPI under the group or individual?",
+    "Is that NPI registered in Texas?",
+    "Does the provider have a tax ID?",
+    "Okay, is the NPI active?",
+    "Was the tax ID the same last year?",
+    "Group NPI or individual NPI?",
+    "Is the NPI 1234567890?",
+])
+def test_yes_no_and_choice_questions_go_to_the_model(text):
+    assert answer(text) is None
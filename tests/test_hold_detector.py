@@ -0,0 +1,46 @@
+from app.hold_detector import HoldDetector, HoldPolicy
+
+
+def detector():
+    return HoldDetector("call", HoldPolicy(enabled=True))
+
+
+def check(hold, text):
+    transcript = [{"role": "agent", "content": "Is the panel open?"}, {"role": "user", "content": text}]
+    return hold.check(transcript, "response_required")
+
+
+def test_bare_hold_request_enters_hold():
+    for text in ("One moment, please.", "Okay, let me check on that for you.", "Hold on a second."):
+        hold = detector()
+        assert check(hold, text) == "Sure, take your time."
+        assert hold.on_hold
+
+
+def test_hold_phrase_followed_by_an_answer_goes_to_the_model():
+    for text in (
+        "One moment. Okay, yes the panel is open.",
+        "Let me check — we are accepting new providers.",
+        "Hold on, the NPI you gave me is not on file.",
+    ):
+        hold = detector()
+        assert check(hold, text) is None
+        assert not hold.on_hold
+
+
+def test_hold_phrase_in_a_question_goes_to_the_model():
+    for text in (
+        "Can you hold for one moment?",
+        "Can you please hold?",
+        "Could you please hold while I transfer you?",
+        "Would you please stay on the line",
+    ):
+        hold = detector()
+        assert check(hold, text) is None
+        assert not hold.on_hold
+
+
+def test_hold_announcement_is_met_with_silence():
+    hold = detector()
+    assert check(hold, "Your call is important to us. Please continue to hold.") == ""
+    assert hold.on_hold
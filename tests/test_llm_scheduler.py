@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from app.llm_scheduler import LlmScheduler, SchedulerPolicy
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+def run(scheduler, failures):
+    calls = []
+
+    async def upstream():
+        calls.append(time.perf_counter())
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        yield "ok"
+
+    async def scenario():
+        return [item async for item in scheduler.stream(upstream, lambda: 10, time.perf_counter())]
+
+    return asyncio.run(scenario()), calls
+
+
+def test_rate_limit_honours_retry_after_for_everyone():
+    scheduler = LlmScheduler(SchedulerPolicy(enabled=True, max_wait=2))
+    items, calls = run(scheduler, [UpstreamError(429, "0.2")])
+    assert items == ["ok"]
+    assert calls[1] - calls[0] >= 0.2
+    assert scheduler._paused_until > 0
+    assert (scheduler.running, scheduler.waiting) == (0, 0)
+
+
+def test_server_errors_back_off_without_pausing_admissions():
+    scheduler = LlmScheduler(SchedulerPolicy(enabled=True, max_wait=2, backoff=0.05))
+    items, calls = run(scheduler, [UpstreamError(500), UpstreamError(503)])
+    assert items == ["ok"]
+    assert len(calls) == 3
+    assert scheduler._paused_until == 0.0
+
+
+def test_client_errors_are_not_retried():
+    scheduler = LlmScheduler(SchedulerPolicy(enabled=True))
+    try:
+        run(scheduler, [UpstreamError(400)])
+    except UpstreamError:
+        pass
+    else:
+        raise AssertionError("expected the 400 to propagate")
+    assert scheduler.running == 0
@@ -0,0 +1,26 @@
+from app.model_router import ModelRouter, RoutingPolicy
+
+
+def router():
+    return ModelRouter(RoutingPolicy(mode="auto", opening_turns=2))
+
+
+def call(*user_turns):
+    transcript = []
+    for text in user_turns:
+        transcript.append({"role": "user", "content": text})
+        transcript.append({"role": "agent", "content": "Okay."})
+    return transcript
+
+
+def test_classifies_the_latest_user_utterance():
+    transcript = call("Why was the application denied?", "Thank you")
+    transcript.append({"role": "agent", "content": "One more thing."})
+    assert router().route(transcript, "response_required").reason == "thanks"
+
+
+def test_opening_turns_counted_up_to_the_limit():
+    plain = "Which doctor is this for"
+    assert router().route(call("Hi there", plain), "response_required").reason == "opening"
+    assert router().route(call("Hi there", "Good", plain), "response_required").reason == "default"
+    assert router().route(call(*["Good"] * 500, plain), "response_required").reason == "default"
@@ -0,0 +1,5 @@
+from benchmarks import multi_worker
+
+
+def test_calls_span_workers_through_redis():
+    assert multi_worker.run()
@@ -0,0 +1,50 @@
+import asyncio
+
+from app.response_cache import ResponseCache, ResponseCachePolicy, fill_template, to_template
+
+
+class NoStore:
+    client = None
+
+
+VARIABLES = {"specialty": "ENT", "provider_name": "Example Health", "npi_number": "1234567890"}
+
+
+def test_value_inside_another_word_is_left_alone():
+    text = "The credentialing documents for each patient are ready."
+    assert to_template(text, VARIABLES) == text
+
+
+def test_whole_word_values_are_templated():
+    template = to_template("Example Health is an ENT practice, NPI 1234567890.", VARIABLES)
+    assert template == "{provider_name} is an {specialty} practice, NPI {npi_number}."
+
+
+def test_short_values_are_not_templated():
+    assert to_template("MD office hours", {"specialty": "MD"}) == "MD office hours"
+
+
+def test_round_trip_into_another_call():
+    template = to_template("Credentialing for ENT starts today.", VARIABLES)
+    assert fill_template(template, {"specialty": "Cardiology"}) == "Credentialing for Cardiology starts today."
+
+
+CALL_A = {"npi_number": "1234567890", "tax_id": "12-3456789", "payer": "Acme"}
+CALL_B = {"npi_number": "5555555555", "tax_id": "98-7654321", "payer": "Acme"}
+
+
+def test_answers_with_untemplated_identifiers_are_not_cached():
+    cache = ResponseCache(ResponseCachePolicy(enabled=True), store=NoStore())
+    transcript = [{"role": "user", "content": "What's the NPI?"}]
+    key = cache.key(transcript, CALL_A)
+    for answer in ("Sure, the NPI is 1 2 3 4 5 6 7 8 9 0.", "The tax ID is 123456789."):
+        cache.put(key, answer, CALL_A)
+        assert asyncio.run(cache.get(key, CALL_B)) is None
+
+
+def test_templated_identifiers_are_cached():
+    cache = ResponseCache(ResponseCachePolicy(enabled=True), store=NoStore())
+    transcript = [{"role": "user", "content": "What's the NPI?"}]
+    key = cache.key(transcript, CALL_A)
+    cache.put(key, "Sure, the NPI is 1234567890.", CALL_A)
+    assert asyncio.run(cache.get(key, CALL_B)) == "Sure, the NPI is 5555555555."
@@ -0,0 +1,43 @@
+import asyncio
+
+from app.custom_types import ResponseResponse
+from app.model_router import ModelRouter, RoutingPolicy
+from app.speculation import Speculator
+
+
+class FakeLlm:
+    def __init__(self):
+        self.router = ModelRouter(RoutingPolicy(mode="auto"))
+
+    async def draft_response(self, request, waiting_since=None, on_route=None):
+        route = self.router.route(request.transcript, request.interaction_type)
+        (on_route or self.router.count)(route)
+        yield ResponseResponse(response_id=-1, content="Thanks.", content_complete=True)
+
+
+def turns(router):
+    return {name: counter.value for name, counter in router._turns.items()}
+
+
+def run(claim_with):
+    async def scenario():
+        llm = FakeLlm()
+        speculator = Speculator(llm, enabled=True)
+        transcript = [{"role": "user", "content": "The panel is open."}]
+        before = turns(llm.router)
+        speculator.on_update(transcript, "agent_turn", {})
+        await asyncio.sleep(0.01)  # the draft has been routed
+        speculator.claim(claim_with(transcript), "response_required", {})
+        after = turns(llm.router)
+        return sum(after.values()) - sum(before.values())
+
+    return asyncio.run(scenario())
+
+
+def test_claimed_draft_counts_its_route():
+    assert run(lambda transcript: transcript) == 1
+
+
+def test_discarded_draft_does_not_count_its_route():
+    changed = lambda transcript: transcript + [{"role": "user", "content": "Actually, wait."}]
+    assert run(changed) == 0